@@ -0,0 +1,474 @@
+"""
+Database maintenance and benchmark commands.
+
+Usage:
+    python db_tools.py bench-connections [--rows 10000]
+    python db_tools.py bench-pragmas [--commits 300] [--lookups 3000]
+    python db_tools.py check-plans
+    python db_tools.py query-stats [--rows 2000]
+    python db_tools.py export-csv {receivers,senders,addresses} FILE [--db app_database.db]
+    python db_tools.py import-csv {receivers,senders} FILE [--db app_database.db] [--dry-run]
+
+check-plans exits with status 1 when a filtered query in src/db walks a whole table or index
+instead of seeking a range (see INTENDED_INDEX_SCANS for the walks that are meant to be), so it
+can gate CI; tests/test_query_plans.py runs the same check under pytest.
+
+Benchmarks always run against a throw-away database in a temporary directory,
+never against app_database.db. export-csv and import-csv work on the live database; a FILE ending
+in .tsv or .txt is tab-separated, anything else comma-separated. `export-csv addresses` writes the
+gazetteer the app reads, or with --db the thai_addresses stored in that file (e.g. --db gazetteer.db).
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+from src.db import (
+    connection, instrumentation, address_queries, config_queries, delivery_by_queries, path_config_queries,
+    receiver_queries, sender_queries, user_queries, zone_queries
+)
+from src.db.migrations import run_migrations
+from src.db.receiver_queries import (
+    add_receiver_identity, find_exact_address, add_receiver_address,
+    get_addresses_for_receiver, staged_merge_receivers
+)
+
+
+def make_receiver_rows(count):
+    """Generates `count` import rows shaped like the receiver Excel sheet (about 4 addresses per receiver)."""
+    rows = []
+    for i in range(count):
+        rows.append({
+            'name': f"Receiver {i // 4:06d}",
+            'tel': f"08{i // 4:08d}",
+            'inventory_code': "PHK",
+            'address_detail': f"{i}/1 Moo {i % 12} Soi {i % 40}",
+            'sub_district': "เชิงทะเล",
+            'district': "ถลาง",
+            'province': "ภูเก็ต",
+            'post_code': "83110",
+            'delivery_by': "Kerry",
+            'zone': "",
+            'note': "",
+        })
+    return rows
+
+
+def _address_data(row):
+    return {k: v for k, v in row.items() if k not in ('name', 'tel')}
+
+
+def _import_per_call(path, rows):
+    """The pre-connection-manager pattern: every query opens (and drops) its own connection."""
+    for row in rows:
+        with sqlite3.connect(path) as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("INSERT INTO receiver_identities (name, tel) VALUES (?, ?)", (row['name'], row['tel']))
+                conn.commit()
+                receiver_id = cursor.lastrowid
+            except sqlite3.IntegrityError:
+                cursor.execute("SELECT id FROM receiver_identities WHERE name = ?", (row['name'],))
+                receiver_id = cursor.fetchone()[0]
+
+        with sqlite3.connect(path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT * FROM receiver_addresses
+                WHERE receiver_identity_id = ? AND address_detail = ? AND post_code = ?
+            """, (receiver_id, row['address_detail'], row['post_code']))
+            existing = cursor.fetchone()
+
+        if existing is None:
+            data = _address_data(row)
+            with sqlite3.connect(path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO receiver_addresses (
+                        receiver_identity_id, inventory_code, address_detail, sub_district,
+                        district, province, post_code, delivery_by, zone, note
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    receiver_id, data['inventory_code'], data['address_detail'], data['sub_district'],
+                    data['district'], data['province'], data['post_code'], data['delivery_by'], data['zone'], data['note']
+                ))
+                conn.commit()
+
+
+def _import_pooled(rows):
+    """The same import loop going through the query modules and the shared per-thread connection."""
+    for row in rows:
+        receiver_id, _ = add_receiver_identity(row['name'], row['tel'])
+        data = _address_data(row)
+        if find_exact_address(receiver_id, data['address_detail'], data['post_code']) is None:
+            add_receiver_address(receiver_id, data)
+
+
+def _fresh_database(directory, label):
+    path = os.path.join(directory, f"{label}.db")
+    connection.set_database_path(path)
+    run_migrations()
+    connection.close_connection()
+    return path
+
+
+def bench_connections(rows_count):
+    rows = make_receiver_rows(rows_count)
+    with tempfile.TemporaryDirectory() as directory:
+        path = _fresh_database(directory, "per_call")
+        start = time.perf_counter()
+        _import_per_call(path, rows)
+        per_call = time.perf_counter() - start
+
+        _fresh_database(directory, "pooled")
+        start = time.perf_counter()
+        _import_pooled(rows)
+        pooled = time.perf_counter() - start
+
+        _fresh_database(directory, "staged")
+        start = time.perf_counter()
+        staged_merge_receivers(rows)
+        staged = time.perf_counter() - start
+        connection.close_connection()
+
+    print(f"Receiver import of {rows_count} rows")
+    print(f"  per-call connections: {per_call:8.2f} s  ({rows_count / per_call:10.0f} rows/s)")
+    print(f"  pooled connection:    {pooled:8.2f} s  ({rows_count / pooled:10.0f} rows/s)")
+    print(f"  staged merge:         {staged:8.2f} s  ({rows_count / staged:10.0f} rows/s)")
+    print(f"  speed-up (pooled):    {per_call / pooled:8.2f}x")
+    print(f"  speed-up (staged):    {per_call / staged:8.2f}x")
+
+
+def _latency_summary(samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return f"mean {statistics.mean(samples) * 1000:7.3f} ms  p50 {statistics.median(samples) * 1000:7.3f} ms  p95 {p95 * 1000:7.3f} ms"
+
+
+def bench_pragmas(commits, lookups, seed_rows=20000):
+    """Measurement mode: commit latency and lookup latency under each PRAGMA profile."""
+    rows = make_receiver_rows(seed_rows)
+    receiver_ids = []
+    with tempfile.TemporaryDirectory() as directory:
+        for profile in connection.PRAGMA_PROFILES:
+            connection.set_pragma_profile(profile)
+            _fresh_database(directory, profile)
+
+            conn = connection.get_connection()
+            with conn:
+                for row in rows[::4]:
+                    receiver_ids.append(add_receiver_identity(row['name'], row['tel'])[0])
+                conn.executemany("""
+                    INSERT INTO receiver_addresses (
+                        receiver_identity_id, inventory_code, address_detail, sub_district,
+                        district, province, post_code, delivery_by
+                    ) SELECT id, ?, ?, ?, ?, ?, ?, ? FROM receiver_identities WHERE name = ?
+                """, [(r['inventory_code'], r['address_detail'], r['sub_district'], r['district'],
+                       r['province'], r['post_code'], r['delivery_by'], r['name']) for r in rows])
+
+            commit_samples = []
+            for i in range(commits):
+                row = rows[i]
+                data = dict(_address_data(row), address_detail=f"bench {i}")
+                start = time.perf_counter()
+                add_receiver_address(receiver_ids[i % len(receiver_ids)], data)
+                commit_samples.append(time.perf_counter() - start)
+
+            lookup_samples = []
+            for i in range(lookups):
+                start = time.perf_counter()
+                get_addresses_for_receiver(receiver_ids[(i * 7919) % len(receiver_ids)])
+                lookup_samples.append(time.perf_counter() - start)
+
+            active = connection.get_active_pragmas()
+            print(f"[{profile}] " + ", ".join(f"{k}={v}" for k, v in active.items()))
+            print(f"  commit ({commits}):  {_latency_summary(commit_samples)}")
+            print(f"  lookup ({lookups}): {_latency_summary(lookup_samples)}")
+            receiver_ids.clear()
+            connection.close_connection()
+    connection.set_pragma_profile()
+
+
+def _query_plan_workload():
+    """Calls every query function in src/db once so its SQL can be captured and explained."""
+    conn = connection.get_connection()
+    with conn:
+        conn.executemany(
+            "INSERT INTO thai_addresses (id, sub_district, district, province, zipcode) VALUES (?, ?, ?, ?, ?)",
+            [(1, "เชิงทะเล", "ถลาง", "ภูเก็ต", "83110"), (2, "บางรัก", "บางรัก", "กรุงเทพมหานคร", "10500")]
+        )
+    address_queries.get_provinces()
+    address_queries.get_districts("ภูเก็ต")
+    address_queries.get_sub_districts("ภูเก็ต", "ถลาง")
+    address_queries.get_zipcode("ภูเก็ต", "ถลาง", "เชิงทะเล")
+    address_queries.get_addresses_by_zipcode("83110")
+    list(address_queries.iter_thai_addresses())
+
+    config_queries.save_config("default_delivery_by", "Kerry")
+    config_queries.get_config("default_delivery_by")
+
+    delivery_by_queries.add_delivery_option("Lalamove")
+    delivery_by_queries.get_all_delivery_options()
+    delivery_by_queries.update_delivery_option("Lalamove", "Grab")
+    delivery_by_queries.delete_delivery_option("Grab")
+
+    path_config_queries.add_path_config("PHK", "C:/templates")
+    path_config_queries.update_path_config("PHK", "C:/templates/phk")
+    path_config_queries.get_all_path_configs()
+    path_config_queries.delete_path_config("PHK")
+
+    row = make_receiver_rows(1)[0]
+    data = _address_data(row)
+    receiver_id, _ = receiver_queries.add_receiver_identity(row['name'], row['tel'])
+    receiver_queries.add_receiver_identity(row['name'], row['tel'])
+    receiver_queries.add_receiver_address(receiver_id, data)
+    receiver_queries.get_all_receiver_identities()
+    receiver_queries.get_receiver_identities_page((row['name'], receiver_id), 50)
+    receiver_queries.get_receiver_identities_page(None, 50, search="Receiver")
+    receiver_queries.search_receivers("เชิงทะเล")
+    receiver_queries.search_receivers("08")
+    address = receiver_queries.find_exact_address(receiver_id, data['address_detail'], data['post_code'])
+    receiver_queries.get_addresses_for_receiver(receiver_id)
+    receiver_queries.get_receiver_address_by_id(address['id'])
+    receiver_queries.get_receiver_identity_by_id(receiver_id)
+    receiver_queries.update_receiver_identity(receiver_id, row['name'], "0812345678")
+    receiver_queries.update_receiver_address(address['id'], data)
+    receiver_queries.set_default_address(receiver_id, address['id'])
+    receiver_queries.get_all_receiver_addresses()
+    list(receiver_queries.iter_all_receiver_addresses())
+    receiver_queries.delete_receiver_address(address['id'])
+    receiver_queries.delete_receiver_identity(receiver_id)
+    bulk_rows = make_receiver_rows(8)
+    receiver_queries.staged_merge_receivers(bulk_rows)
+    bulk_rows[0]['note'] = "Call first"
+    receiver_queries.staged_merge_receivers(bulk_rows + bulk_rows[:2])
+    receiver_queries.staged_merge_receivers(bulk_rows, dry_run=True)
+    receiver_queries.staged_merge_receivers(bulk_rows[:1] + bulk_rows, dry_run=True, keep_staged=True)
+    receiver_queries.merge_staged_receivers()
+    receiver_queries.discard_staged_receivers()
+
+    sender_queries.add_sender("PHK", "Sender", "1/1", "เชิงทะเล", "ถลาง", "ภูเก็ต", "83110", "076000000")
+    sender_id = sender_queries.get_all_senders()[0]['id']
+    sender_queries.update_sender(sender_id, "PHK", "Sender", "1/2", "เชิงทะเล", "ถลาง", "ภูเก็ต", "83110", "076000000")
+    sender_queries.get_distinct_inventory_codes()
+    list(sender_queries.iter_all_senders())
+    sender_queries.import_senders([
+        {'inventory_code': "PHK", 'name': "Sender", 'address_detail': "1/3", 'sub_district': "เชิงทะเล",
+         'district': "ถลาง", 'province': "ภูเก็ต", 'post_code': "83110", 'tel': "076000000"},
+        {'inventory_code': "PHK", 'name': "Sender 2", 'address_detail': "2/1", 'sub_district': "เชิงทะเล",
+         'district': "ถลาง", 'province': "ภูเก็ต", 'post_code': "83110", 'tel': "076000001"},
+    ])
+    sender_queries.delete_sender(sender_id)
+
+    zone_queries.add_zone_rule("South", province="ภูเก็ต")
+    zone_queries.add_zone_rule("BKK-1", post_code_from="10100", post_code_to="10500")
+    rule_id = zone_queries.get_all_zone_rules()[0]['id']
+    zone_queries.update_zone_rule(rule_id, "Andaman", province="ภูเก็ต", district="ถลาง")
+    zone_queries.assign_zones(overwrite=True)
+    zone_queries.delete_zone_rule(rule_id)
+
+    user_queries.add_user("planner", "secret", email="planner@example.com")
+    user_queries.get_user_details("planner")
+    user_queries.verify_user("planner", "secret")
+    user_queries.get_user_role("planner")
+    user_id = user_queries.get_all_users()[0]['id']
+    user_queries.update_user(user_id, email="planner@example.org")
+    user_queries.delete_user(user_id)
+
+
+# Index walks with a filter that are meant to be there, as (index, fragment of the statement): why.
+INTENDED_INDEX_SCANS = {
+    ("sqlite_autoindex_receiver_identities_1", "ri.name LIKE"):
+        "A substring LIKE cannot seek, so the name index is walked in page order and stops once the page "
+        "is full; it serves searches shorter than a trigram and databases without FTS5.",
+}
+
+
+def _is_unbounded_scan(detail, sql):
+    # "SEARCH t USING ... (a=? AND b>?)" seeks a bounded range and is always fine. "SCAN t" walks the whole
+    # table and "SCAN t USING [COVERING] INDEX i" the whole of an index, which is no cheaper for a filtered
+    # query; those count unless listed in INTENDED_INDEX_SCANS. "SCAN t VIRTUAL TABLE INDEX n:M..." is an FTS5
+    # MATCH answered from its own index, the schema tables (of the main, temp or attached gazetteer database)
+    # are a handful of rows, and the import staging table only holds the rows being imported.
+    if not detail.startswith("SCAN ") or " VIRTUAL TABLE INDEX " in detail:
+        return False
+    table = detail.split()[1].split(".")[-1]
+    if table in ("sqlite_master", "sqlite_temp_master", receiver_queries.IMPORT_STAGING_TABLE):
+        return False
+    if " INDEX " in detail:
+        index = detail.split()[-1]
+        return not any(index == name and fragment in sql for name, fragment in INTENDED_INDEX_SCANS)
+    return True
+
+
+def _is_whole_table_read(sql):
+    # Listings and exports with no WHERE clause read every row by definition.
+    return " WHERE " not in " ".join(sql.upper().split())
+
+
+def explain_query_plans():
+    """
+    Runs every query function in src/db once against a scratch database and explains each distinct
+    statement. Returns (sql, plan details, unbounded scans) per statement; a statement with scans fails.
+    """
+    statements = []
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        _fresh_database(directory, "plans")
+        conn = connection.get_connection()
+        conn.set_trace_callback(statements.append)
+        _query_plan_workload()
+        conn.set_trace_callback(None)
+
+        seen = set()
+        for sql in statements:
+            sql = " ".join(sql.split())
+            if sql in seen or not sql.upper().startswith(("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")):
+                continue
+            seen.add(sql)
+            plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+            # Subqueries and CTEs are computed once ("MATERIALIZE x", "CO-ROUTINE x"); scanning their result is fine.
+            derived = {detail.split()[-1] for detail in plan if detail.startswith(("MATERIALIZE ", "CO-ROUTINE "))}
+            scans = [] if _is_whole_table_read(sql) else [
+                detail for detail in plan if _is_unbounded_scan(detail, sql) and detail[len("SCAN "):] not in derived
+            ]
+            results.append((sql, plan, scans))
+        connection.close_connection()
+    return results
+
+
+def check_query_plans():
+    """Prints the plan of every statement issued by src/db and reports filtered queries that scan a table or index."""
+    results = explain_query_plans()
+    failures = 0
+    for sql, plan, scans in results:
+        failures += bool(scans)
+        print(f"{'FAIL' if scans else 'ok  '} {sql[:110]}")
+        for detail in plan:
+            print(f"       {detail}")
+
+    print(f"\n{len(results)} statements checked, {failures} unbounded scan(s).")
+    return failures == 0
+
+
+def query_stats(rows_count):
+    """Runs the receiver import with instrumentation off and on, then prints the per-function counters."""
+    rows = make_receiver_rows(rows_count)
+    with tempfile.TemporaryDirectory() as directory:
+        _fresh_database(directory, "plain")
+        start = time.perf_counter()
+        _import_pooled(rows)
+        plain = time.perf_counter() - start
+
+        _fresh_database(directory, "instrumented")
+        instrumentation.reset_query_stats()
+        instrumentation.enable_instrumentation(log_path=None)
+        start = time.perf_counter()
+        _import_pooled(rows)
+        instrumented = time.perf_counter() - start
+        instrumentation.disable_instrumentation()
+        connection.close_connection()
+
+    instrumentation.dump_query_stats()
+    print(f"\nReceiver import of {rows_count} rows")
+    print(f"  instrumentation off: {plain:8.2f} s")
+    print(f"  instrumentation on:  {instrumented:8.2f} s  ({(instrumented / plain - 1) * 100:+.1f}%)")
+
+
+def export_csv(table, file_path, db_path=None):
+    # The table helpers import the spreadsheet import, and with it Qt and openpyxl; only these commands need them.
+    from src.utils.table_transfer import export_gazetteer_file_csv, export_table_csv
+
+    start = time.perf_counter()
+    if table == "addresses" and db_path is not None:
+        # The rows of that very file, not those of the gazetteer attached in front of it.
+        try:
+            count = export_gazetteer_file_csv(db_path, file_path)
+        except sqlite3.Error as e:
+            print(f"ERROR: Could not read thai_addresses from {db_path}: {e}")
+            return False
+    else:
+        connection.set_database_path(db_path or connection.DATABASE_NAME)
+        run_migrations()
+        count = export_table_csv(table, file_path)
+    print(f"Wrote {count} {table} rows to {file_path} in {time.perf_counter() - start:.2f} s.")
+    return True
+
+
+def import_csv(table, file_path, db_path, dry_run):
+    from src.utils.receiver_import import run_receiver_import
+    from src.utils.table_transfer import import_senders_csv
+
+    connection.set_database_path(db_path)
+    run_migrations()
+    start = time.perf_counter()
+    try:
+        if table == "receivers":
+            outcome = run_receiver_import(file_path, dry_run=dry_run)
+            counts, message = outcome['counts'], outcome['message']
+        else:
+            counts, message = import_senders_csv(file_path, dry_run=dry_run)
+    except FileNotFoundError:
+        print(f"ERROR: The file {file_path} was not found.")
+        return False
+    elapsed = time.perf_counter() - start
+    if counts is None:
+        print(f"ERROR: Import failed, nothing was changed: {message}")
+        return False
+    print(f"{message} Read {file_path} in {elapsed:.2f} s.")
+    print(f"  {table}: added {counts['added']}, updated {counts['updated']}, unchanged {counts['unchanged']}, "
+          f"skipped {counts['skipped']}")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Database maintenance and benchmark commands.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    connections_parser = subparsers.add_parser("bench-connections", help="Compare per-call, pooled and staged receiver imports.")
+    connections_parser.add_argument("--rows", type=int, default=10000)
+
+    pragmas_parser = subparsers.add_parser("bench-pragmas", help="Report commit and lookup latency per PRAGMA profile.")
+    pragmas_parser.add_argument("--commits", type=int, default=300)
+    pragmas_parser.add_argument("--lookups", type=int, default=3000)
+
+    subparsers.add_parser("check-plans", help="Fail if any filtered src/db query scans a whole table or index.")
+
+    stats_parser = subparsers.add_parser("query-stats", help="Show per-function query counters for a sample import.")
+    stats_parser.add_argument("--rows", type=int, default=2000)
+
+    export_parser = subparsers.add_parser("export-csv", help="Stream a table to a UTF-8 (with BOM) CSV or TSV file.")
+    export_parser.add_argument("table", choices=("receivers", "senders", "addresses"))
+    export_parser.add_argument("file")
+    export_parser.add_argument(
+        "--db", help=f"Database to read (default {connection.DATABASE_NAME}). For addresses, export the "
+                     f"thai_addresses stored in this file, e.g. {connection.GAZETTEER_DATABASE_NAME}, instead of "
+                     f"the gazetteer the app reads."
+    )
+
+    import_parser = subparsers.add_parser("import-csv", help="Merge a CSV or TSV file into the receivers or senders.")
+    import_parser.add_argument("table", choices=("receivers", "senders"))
+    import_parser.add_argument("file")
+    import_parser.add_argument("--db", default=connection.DATABASE_NAME)
+    import_parser.add_argument("--dry-run", action="store_true", help="Only report what the import would change.")
+
+    args = parser.parse_args()
+    if args.command == "bench-connections":
+        bench_connections(args.rows)
+    elif args.command == "bench-pragmas":
+        bench_pragmas(args.commits, args.lookups)
+    elif args.command == "check-plans":
+        sys.exit(0 if check_query_plans() else 1)
+    elif args.command == "query-stats":
+        query_stats(args.rows)
+    elif args.command == "export-csv":
+        sys.exit(0 if export_csv(args.table, args.file, args.db) else 1)
+    elif args.command == "import-csv":
+        sys.exit(0 if import_csv(args.table, args.file, args.db, args.dry_run) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,82 +1,334 @@
-import sqlite3
+"""
+Builds the read-only Thai address gazetteer file from a phpMyAdmin dump of the `tambons` table.
+
+Usage:
+    python import_tambons.py [--file tambons.sql] [--gazetteer gazetteer.db]
+    python import_tambons.py --db app_database.db [--file tambons.sql] [--prune]
+
+The dump is read line by line and its INSERT ... VALUES tuples are tokenised properly, so quoted
+commas, parentheses and escaped quotes survive. A .csv or .tsv --file is read as an "addresses" export
+(python db_tools.py export-csv addresses), with the thai_addresses column names (or the dump's) as its
+header; everything else works the same.
+
+By default the rows go to the gazetteer file the app attaches (GAZETTEER_DATABASE_NAME in
+src/db/connection.py), never to the user database. The file is rebuilt from scratch in id order and
+vacuumed, so the same dump and SQLite version always give the same bytes. Rebuild it while the app is
+closed: it is opened immutable.
+
+--db instead imports into thai_addresses of that database, for installs without a gazetteer file.
+Rows are compared with what is already stored: new ids are inserted and changed rows updated with
+executemany, all in one transaction, so running the import again only writes the differences. --prune
+also deletes stored rows the file no longer has. The rows always go to the database's own table, also
+while a gazetteer file exists; the app reads them whenever the file is missing.
+"""
+import argparse
+import os
 import re
+import sqlite3
+import time
+
+from src.db import changes, connection
+from src.db.connection import get_connection
+from src.db.migrations import run_migrations
+from src.utils.csv_io import is_csv_path, iter_csv_rows
 
-DATABASE_NAME = "app_database.db"
 SQL_FILE_PATH = "tambons.sql"
+SOURCE_TABLE = "tambons"
+
+# thai_addresses columns, in statement order, and the dump columns they come from.
+COLUMNS = ("id", "sub_district", "district", "province", "zipcode", "sub_district_code", "district_code", "province_code")
+SOURCE_COLUMNS = {
+    "id": "id", "tambon": "sub_district", "amphoe": "district", "province": "province", "zipcode": "zipcode",
+    "tambon_code": "sub_district_code", "amphoe_code": "district_code", "province_code": "province_code",
+}
+# Written to PRAGMA user_version of built gazetteer files; bump when their layout changes.
+GAZETTEER_FORMAT_VERSION = 1
+# Rows written per executemany call; the whole import is still one transaction.
+BATCH_SIZE = 1000
+
+_INSERT_RE = re.compile(r"\s*INSERT\s+INTO\s+`?(\w+)`?\s*(?:\(([^)]*)\))?\s*VALUES\s*(.*)", re.IGNORECASE | re.DOTALL)
+# One parenthesised tuple, optionally preceded by the comma separating it from the previous one.
+# Quoted strings may contain commas, parentheses and escaped quotes.
+_TUPLE_RE = re.compile(r"\s*,?\s*\(((?:'(?:[^'\\]|\\.|'')*'|[^'()])*)\)", re.DOTALL)
+_FIELD_RE = re.compile(r"\s*(?:'((?:[^'\\]|\\.|'')*)'|([^\s,']+))\s*(?:,|$)", re.DOTALL)
+_END_RE = re.compile(r"\s*;")
+_ESCAPE_RE = re.compile(r"\\(.)|''", re.DOTALL)
+_ESCAPES = {"0": "\0", "b": "\b", "n": "\n", "r": "\r", "t": "\t", "Z": "\x1a"}
+# A tuple larger than this without a closing parenthesis means the file is not what we expect.
+_MAX_PENDING = 1024 * 1024
+
+
+def _unescape(match):
+    if match.group(0) == "''":
+        return "'"
+    char = match.group(1)
+    return _ESCAPES.get(char, char)
+
+
+def _parse_fields(text):
+    values = []
+    for match in _FIELD_RE.finditer(text):
+        quoted, bare = match.groups()
+        if quoted is not None:
+            values.append(_ESCAPE_RE.sub(_unescape, quoted) if "\\" in quoted or "''" in quoted else quoted)
+        elif bare.upper() == "NULL":
+            values.append(None)
+        else:
+            values.append(int(bare) if bare.lstrip("-").isdigit() else bare)
+    return values
+
+
+def iter_value_tuples(lines, table=SOURCE_TABLE):
+    """
+    Yields (column_names, values) for every tuple of every `INSERT INTO table` statement in `lines`
+    (any iterable of text lines, e.g. an open file). column_names is None when the statement has no
+    column list. Other statements and comments are skipped.
+    """
+    lines = iter(lines)
+    for line in lines:
+        match = _INSERT_RE.match(line)
+        if not match or match.group(1) != table:
+            continue
+        column_names = None
+        if match.group(2):
+            column_names = [name.strip().strip("`") for name in match.group(2).split(",")]
+        buffer, position = match.group(3), 0
+        while True:
+            tuple_match = _TUPLE_RE.match(buffer, position)
+            if tuple_match:
+                yield column_names, _parse_fields(tuple_match.group(1))
+                position = tuple_match.end()
+                continue
+            if _END_RE.match(buffer, position):
+                break
+            # The next tuple (or the closing semicolon) is not complete yet: read on.
+            line = next(lines, None)
+            if line is None or len(buffer) - position > _MAX_PENDING:
+                raise ValueError(f"Unterminated INSERT INTO `{table}` statement.")
+            buffer, position = buffer[position:] + line, 0
+
+
+def iter_tambon_rows(lines):
+    """Yields thai_addresses rows as tuples in COLUMNS order."""
+    positions = None
+    last_names = ()
+    for column_names, values in iter_value_tuples(lines):
+        # Every tuple of a statement shares its column list, so the mapping is worked out once per statement.
+        if column_names is not last_names:
+            last_names = column_names
+            names = column_names or list(SOURCE_COLUMNS)
+            index = {SOURCE_COLUMNS.get(name, name): i for i, name in enumerate(names)}
+            missing = [column for column in COLUMNS if column not in index]
+            if missing:
+                raise ValueError(f"The dump has no column for {', '.join(missing)}.")
+            positions = [index[column] for column in COLUMNS]
+        if len(values) <= max(positions):
+            print(f"Skipping a tuple with {len(values)} values: {values}")
+            continue
+        row = [values[i] for i in positions]
+        # Codes are stored as text, as the original importer did.
+        yield (int(row[0]),) + tuple(None if value is None else str(value) for value in row[1:])
+
+
+# Columns that may be NULL; an empty cell in them reads as NULL, elsewhere as empty text.
+_NULLABLE_COLUMNS = ("sub_district_code", "district_code", "province_code")
+
 
-def create_table(cursor):
-    """Creates the thai_addresses table."""
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS thai_addresses (
-            id INTEGER PRIMARY KEY,
-            sub_district TEXT NOT NULL,
-            district TEXT NOT NULL,
-            province TEXT NOT NULL,
-            zipcode TEXT NOT NULL,
-            sub_district_code TEXT,
-            district_code TEXT,
-            province_code TEXT
+def iter_csv_tambon_rows(csv_path):
+    """Yields thai_addresses rows as tuples in COLUMNS order from a CSV/TSV file with a header row."""
+    header_checked = False
+    for line_number, row_data in enumerate(iter_csv_rows(csv_path), 2):
+        row_data = {SOURCE_COLUMNS.get(name, name): value for name, value in row_data.items()}
+        if not header_checked:
+            missing = [column for column in COLUMNS if column not in row_data and column not in _NULLABLE_COLUMNS]
+            if missing:
+                raise ValueError(f"The file has no column for {', '.join(missing)}.")
+            header_checked = True
+        if not any(row_data.values()):
+            continue
+        if not (row_data.get("id") or "").strip().isdigit():
+            raise ValueError(f"Line {line_number} has no numeric id.")
+        yield (int(row_data["id"]),) + tuple(
+            (row_data.get(column) or None) if column in _NULLABLE_COLUMNS else (row_data.get(column) or "")
+            for column in COLUMNS[1:]
         )
-    """)
-    print("Table 'thai_addresses' created or already exists.")
 
-def import_data():
-    """Parses the tambons.sql file and inserts data into the SQLite database."""
-    conn = sqlite3.connect(DATABASE_NAME)
-    cursor = conn.cursor()
-    
-    create_table(cursor)
 
-    print(f"Reading data from {SQL_FILE_PATH}...")
-    try:
-        with open(SQL_FILE_PATH, 'r', encoding='utf-8') as f:
-            content = f.read()
-    except FileNotFoundError:
-        print(f"ERROR: The file {SQL_FILE_PATH} was not found in the project directory.")
-        print("Please make sure you have saved the SQL file with that name.")
+def iter_source_rows(path):
+    """Yields thai_addresses rows from a SQL dump or, by its extension, a CSV/TSV file."""
+    if is_csv_path(path):
+        yield from iter_csv_tambon_rows(path)
         return
+    with open(path, "r", encoding="utf-8") as f:
+        yield from iter_tambon_rows(f)
+
+
+def import_data(sql_path=SQL_FILE_PATH, prune=False):
+    """
+    Streams `sql_path` into the thai_addresses table of the main database, never an attached gazetteer,
+    writing only new and changed rows in one transaction.
+    Returns a dict of counts: read, inserted, updated, unchanged, deleted.
+    """
+    start = time.perf_counter()
+    conn = get_connection()
+    run_migrations(conn)
+
+    existing = {row[0]: tuple(row) for row in conn.execute(f"SELECT {', '.join(COLUMNS)} FROM main.thai_addresses")}
+    seen = set()
+    inserts, updates = [], []
+    counts = {"read": 0, "inserted": 0, "updated": 0, "unchanged": 0, "deleted": 0}
+    insert_sql = f"INSERT INTO main.thai_addresses ({', '.join(COLUMNS)}) VALUES ({', '.join('?' for _ in COLUMNS)})"
+    update_sql = f"UPDATE main.thai_addresses SET {', '.join(f'{column} = ?' for column in COLUMNS[1:])} WHERE id = ?"
+
+    def flush():
+        if inserts:
+            cursor.executemany(insert_sql, inserts)
+            inserts.clear()
+        if updates:
+            cursor.executemany(update_sql, updates)
+            updates.clear()
+
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        for row in iter_source_rows(sql_path):
+            counts["read"] += 1
+            row_id = row[0]
+            if row_id in seen:
+                print(f"Skipping duplicate id {row_id}.")
+                continue
+            seen.add(row_id)
+            stored = existing.get(row_id)
+            if stored is None:
+                inserts.append(row)
+                counts["inserted"] += 1
+            elif stored != row:
+                updates.append(row[1:] + (row_id,))
+                counts["updated"] += 1
+            else:
+                counts["unchanged"] += 1
+            if len(inserts) + len(updates) >= BATCH_SIZE:
+                flush()
+        flush()
+        if prune:
+            stale = [(row_id,) for row_id in existing if row_id not in seen]
+            cursor.executemany("DELETE FROM main.thai_addresses WHERE id = ?", stale)
+            counts["deleted"] = len(stale)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
 
-    # Use regex to find all INSERT statements and their values
-    # This is more robust than splitting by lines
-    insert_regex = re.compile(r"INSERT INTO `tambons` .*? VALUES\s*(.*?);", re.DOTALL)
-    values_regex = re.compile(r"\((.*?)\)")
+    if counts["inserted"] or counts["updated"] or counts["deleted"]:
+        changes.notify_changed("thai_addresses", changes.UPDATE)
+    elapsed = time.perf_counter() - start
+    counts["seconds"] = elapsed
+    return counts
 
-    total_inserted = 0
-    matches = insert_regex.findall(content)
 
-    if not matches:
-        print("No INSERT statements found in the SQL file. Nothing to import.")
+def build_gazetteer_db(sql_path=SQL_FILE_PATH, out_path=connection.GAZETTEER_DATABASE_NAME):
+    """
+    Writes the dump to a new read-only gazetteer file at `out_path`, replacing any existing one only
+    once the new file is complete. Returns the number of rows written.
+    """
+    rows = {}
+    for row in iter_source_rows(sql_path):
+        if row[0] in rows:
+            print(f"Skipping duplicate id {row[0]}.")
+            continue
+        rows[row[0]] = row
+
+    temp_path = out_path + ".tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    conn = sqlite3.connect(temp_path)
+    try:
+        conn.execute("PRAGMA page_size = 4096")
+        conn.execute("PRAGMA journal_mode = DELETE")
+        with conn:
+            conn.execute("""
+                CREATE TABLE thai_addresses (
+                    id INTEGER PRIMARY KEY,
+                    sub_district TEXT NOT NULL,
+                    district TEXT NOT NULL,
+                    province TEXT NOT NULL,
+                    zipcode TEXT NOT NULL,
+                    sub_district_code TEXT,
+                    district_code TEXT,
+                    province_code TEXT
+                )
+            """)
+            conn.executemany(
+                f"INSERT INTO thai_addresses ({', '.join(COLUMNS)}) VALUES ({', '.join('?' for _ in COLUMNS)})",
+                [rows[row_id] for row_id in sorted(rows)]
+            )
+            # The same covering indexes as the main database, so lookups never touch the table itself.
+            conn.execute("""
+                CREATE INDEX idx_thai_addresses_location
+                ON thai_addresses (province, district, sub_district, zipcode)
+            """)
+            conn.execute("""
+                CREATE INDEX idx_thai_addresses_zipcode
+                ON thai_addresses (zipcode, province, district, sub_district)
+            """)
+            conn.execute(f"PRAGMA user_version = {GAZETTEER_FORMAT_VERSION}")
+        conn.execute("ANALYZE")
+        conn.execute("VACUUM")
+    finally:
         conn.close()
+    os.replace(temp_path, out_path)
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the Thai address gazetteer from the tambons.sql dump.")
+    parser.add_argument(
+        "--file", default=SQL_FILE_PATH, help=f"SQL dump, or .csv/.tsv export, to read (default {SQL_FILE_PATH})."
+    )
+    parser.add_argument(
+        "--gazetteer", default=connection.GAZETTEER_DATABASE_NAME,
+        help=f"Gazetteer file to build (default {connection.GAZETTEER_DATABASE_NAME})."
+    )
+    parser.add_argument("--db", help="Import into thai_addresses of this database instead of building the gazetteer file.")
+    parser.add_argument("--prune", action="store_true", help="With --db, delete stored rows that are not in the file.")
+    args = parser.parse_args()
+
+    if args.db is None:
+        if args.prune:
+            parser.error("--prune only applies to --db; the gazetteer file is always rebuilt from scratch.")
+        print(f"Building {args.gazetteer} from {args.file}...")
+        start = time.perf_counter()
+        try:
+            count = build_gazetteer_db(args.file, args.gazetteer)
+        except FileNotFoundError:
+            print(f"ERROR: The file {args.file} was not found.")
+            return
+        except (ValueError, sqlite3.Error) as e:
+            print(f"ERROR: Build failed, {args.gazetteer} was not changed: {e}")
+            return
+        print(f"Wrote {count} rows to {args.gazetteer} in {time.perf_counter() - start:.2f} s.")
         return
 
-    print(f"Found {len(matches)} INSERT blocks. Processing...")
-
-    for values_block in matches:
-        value_tuples = values_regex.findall(values_block)
-        for value_tuple_str in value_tuples:
-            try:
-                # Split and clean up values
-                values = [v.strip().strip("'" ) for v in value_tuple_str.split(',')]
-                # The SQL file has 8 columns, we map them to our table
-                if len(values) == 8:
-                    cursor.execute("""
-                        INSERT INTO thai_addresses (id, sub_district, district, province, zipcode, sub_district_code, district_code, province_code)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    """, tuple(values))
-                    total_inserted += 1
-            except sqlite3.IntegrityError:
-                # This will catch errors if we try to insert a duplicate primary key (id)
-                # We can safely ignore them if we run the script multiple times
-                pass
-            except Exception as e:
-                print(f"Skipping a row due to error: {e} -> {value_tuple_str}")
-
-    conn.commit()
-    conn.close()
+    connection.set_database_path(args.db)
+    if os.path.exists(args.gazetteer):
+        print(f"Note: the app reads addresses from {args.gazetteer} while it exists; "
+              f"the rows imported here are used when it is missing.")
+    print(f"Reading data from {args.file}...")
+    try:
+        counts = import_data(args.file, prune=args.prune)
+    except FileNotFoundError:
+        print(f"ERROR: The file {args.file} was not found.")
+        return
+    except (ValueError, sqlite3.Error) as e:
+        print(f"ERROR: Import failed, nothing was changed: {e}")
+        return
 
+    rate = counts["read"] / counts["seconds"] if counts["seconds"] else 0
     print("\n--- Import Complete ---")
-    print(f"Successfully inserted {total_inserted} records into the 'thai_addresses' table.")
-    print("You can now delete the import_tambons.py and tambons.sql files if you wish.")
+    print(f"Read {counts['read']} rows in {counts['seconds']:.2f} s ({rate:,.0f} rows/s).")
+    print(f"Inserted {counts['inserted']}, updated {counts['updated']}, unchanged {counts['unchanged']}, "
+          f"deleted {counts['deleted']}.")
+
 
 if __name__ == "__main__":
-    import_data()
+    main()
@@ -1,11 +1,16 @@
 import sys
 import os
+import atexit
 from dotenv import load_dotenv
 from PySide6.QtWidgets import QApplication, QMainWindow, QDialog
-from PySide6.QtGui import QFontDatabase, QFont
+from PySide6.QtGui import QFontDatabase, QFont, QShortcut, QKeySequence
 from src.app.layout import MainLayout
 from src.styles.theme_manager import ThemeManager
-from src.db.user_queries import initialize_db, add_user
+from src.db.user_queries import add_user
+from src.db.migrations import run_migrations
+from src.db.async_dao import submit
+from src.db.gazetteer import preload_gazetteer
+from src.db import instrumentation
 from src.auth_dialog import LoginDialog
 from src.user_manager import UserManager
 
@@ -27,6 +32,10 @@ class MainWindow(QMainWindow):
         self.user_manager.user_logged_out.connect(self.close)
         self.setCentralWidget(self.main_layout_widget)
 
+        # With DB_QUERY_STATS enabled, Ctrl+Shift+Q prints the per-function query counters.
+        if instrumentation.is_enabled():
+            QShortcut(QKeySequence("Ctrl+Shift+Q"), self, activated=instrumentation.dump_query_stats)
+
         # Navigate to intended destination if set from a previous session
         if self.user_manager.intended_destination:
             self.main_layout_widget.switch_page(self.user_manager.intended_destination)
@@ -38,7 +47,12 @@ def main():
     app.setFont(QFont("Tahoma", 10))
 
     load_dotenv()
-    initialize_db()
+    instrumentation.configure_from_env()
+    if instrumentation.is_enabled():
+        atexit.register(instrumentation.dump_query_stats)
+    run_migrations()
+    # Build the in-memory address gazetteer on a pool thread while the login dialog is up.
+    submit(preload_gazetteer)
 
     # Create managers
     user_manager = UserManager()
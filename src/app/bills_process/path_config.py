@@ -9,7 +9,7 @@ import qtawesome as qta
 
 # Import new DB queries for path configs and the global config functions
 from src.db.path_config_queries import (
-    initialize_path_config_db, add_path_config, get_all_path_configs, 
+    add_path_config, get_all_path_configs, 
     update_path_config, delete_path_config
 )
 from src.db.config_queries import save_config, get_config
@@ -18,7 +18,6 @@ class PathConfig(QWidget):
     def __init__(self):
         super().__init__()
         self.current_inventory_code = None # To track which item is being edited
-        initialize_path_config_db()
         self.setup_ui()
         self.load_configs_to_table()
         self.clear_form()
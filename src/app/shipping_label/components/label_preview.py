@@ -2,14 +2,18 @@ from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QFrame
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QPixmap
 from src.db.config_queries import get_config
+from src.components.db_change_bus import get_change_bus
 import os
 
+ASSET_CONFIG_KEYS = ("asset_sender_logo", "asset_receiver_logo")
+
 class LabelPreview(QFrame):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setObjectName("LabelPreview")
         self._setup_ui()
         self.load_and_display_assets()
+        get_change_bus().table_changed.connect(self._on_table_changed)
 
     def _setup_ui(self):
         display_width = 591
@@ -134,6 +138,11 @@ class LabelPreview(QFrame):
     def refresh_assets(self):
         self.load_and_display_assets()
 
+    def _on_table_changed(self, table, operation, ids):
+        # app_config changes carry the saved keys as their ids.
+        if table == "app_config" and (ids is None or not ids.isdisjoint(ASSET_CONFIG_KEYS)):
+            self.load_and_display_assets()
+
     def update_sender_info(self, address, tel):
         self.sender_address_label.setText(f"<b>ที่อยู่:</b> {address or ''}")
         self.sender_tel_label.setText(f"โทร: {tel or 'N/A'}")
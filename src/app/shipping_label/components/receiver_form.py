@@ -5,13 +5,17 @@ from PySide6.QtWidgets import (
 from PySide6.QtCore import Signal
 import qtawesome as qta
 
-from src.db.address_queries import get_provinces, get_districts, get_sub_districts, get_zipcode, get_addresses_by_zipcode
+from src.db.address_queries import get_zipcode, get_addresses_by_zipcode
 from src.db.config_queries import get_config
 from src.db.path_config_queries import get_all_path_configs
 from src.db.delivery_by_queries import get_all_delivery_options
 from src.components.validated_line_edit import ValidatedLineEdit
+from src.components.address_completer import AddressCompleter
+from src.components.address_models import (
+    AddressCombosMixin, PlaceListModel, province_model, district_model, sub_district_model
+)
 
-class ReceiverForm(QWidget):
+class ReceiverForm(AddressCombosMixin, QWidget):
     """
     A form widget for creating and editing a single receiver address.
     """
@@ -86,8 +90,10 @@ class ReceiverForm(QWidget):
 
     def _create_postcode_lookup(self):
         self.postcode_input = QLineEdit()
-        self.postcode_input.setPlaceholderText("Enter 5-digit post code")
+        self.postcode_input.setPlaceholderText("Post code, sub-district or district")
         self.postcode_input.returnPressed.connect(self.on_find_by_zipcode_clicked)
+        self.postcode_completer = AddressCompleter(self.postcode_input, self)
+        self.postcode_completer.location_chosen.connect(self.on_location_chosen)
         find_zip_button = QPushButton(qta.icon('fa5s.search', color='white'), " Find")
         find_zip_button.clicked.connect(self.on_find_by_zipcode_clicked)
         postcode_layout = QHBoxLayout()
@@ -148,46 +154,38 @@ class ReceiverForm(QWidget):
         self.delivery_by_combo.blockSignals(False)
 
     def initialize_address_dropdowns(self):
-        self.province_combo.blockSignals(True)
-        self.province_combo.clear()
-        self.province_combo.addItem("Select Province...")
-        provinces = get_provinces()
-        if provinces:
-            self.province_combo.addItems(provinces)
-        self.province_combo.blockSignals(False)
+        for combo in (self.province_combo, self.district_combo, self.sub_district_combo):
+            combo.blockSignals(True)
+        self.province_combo.setModel(province_model())
+        self.province_combo.setCurrentIndex(0)
+        self.district_combo.setModel(district_model(None))
+        self.sub_district_combo.setModel(sub_district_model(None, None))
+        for combo in (self.province_combo, self.district_combo, self.sub_district_combo):
+            combo.blockSignals(False)
         self.district_combo.setEnabled(False)
         self.sub_district_combo.setEnabled(False)
 
     # --- Address Logic ---
     def on_province_changed(self, province):
         self.district_combo.blockSignals(True)
-        self.district_combo.clear()
-        self.district_combo.addItem("Select District...")
-        self.sub_district_combo.clear()
+        self.sub_district_combo.blockSignals(True)
+        districts = district_model(province)
+        self.district_combo.setModel(districts)
+        self.district_combo.setCurrentIndex(0)
+        self.sub_district_combo.setModel(sub_district_model(None, None))
         self.postcode_input.clear()
-        if province and province != "Select Province...":
-            districts = get_districts(province)
-            if districts:
-                self.district_combo.addItems(districts)
-                self.district_combo.setEnabled(True)
-        else:
-            self.district_combo.setEnabled(False)
+        self.district_combo.setEnabled(districts.place_count() > 0)
         self.sub_district_combo.setEnabled(False)
         self.district_combo.blockSignals(False)
+        self.sub_district_combo.blockSignals(False)
 
     def on_district_changed(self, district):
         self.sub_district_combo.blockSignals(True)
-        self.sub_district_combo.clear()
-        self.sub_district_combo.addItem("Select Sub-district...")
+        sub_districts = sub_district_model(self.province_combo.currentText(), district)
+        self.sub_district_combo.setModel(sub_districts)
+        self.sub_district_combo.setCurrentIndex(0)
         self.postcode_input.clear()
-        province = self.province_combo.currentText()
-        if district and district != "Select District...":
-            sub_districts = get_sub_districts(province, district)
-            if sub_districts:
-                self.sub_district_combo.addItems(sub_districts)
-                self.sub_district_combo.setEnabled(True)
-        else:
-            self.sub_district_combo.setEnabled(False)
+        self.sub_district_combo.setEnabled(sub_districts.place_count() > 0)
         self.sub_district_combo.blockSignals(False)
 
     def on_sub_district_changed(self, sub_district):
@@ -216,11 +214,13 @@ class ReceiverForm(QWidget):
         province = results[0]['province']
         self.province_combo.setCurrentText(province)
         
+        # The post code narrows the lists below what any shared model holds, so these models are
+        # one-offs owned by their combo and deleted by Qt when the combo switches back.
         districts = sorted(list(set(row['district'] for row in results)))
-        self.district_combo.clear(); self.district_combo.addItems(districts); self.district_combo.setEnabled(True)
+        self.district_combo.setModel(PlaceListModel(districts, parent=self.district_combo)); self.district_combo.setEnabled(True)
         
         sub_districts = sorted(list(set(row['sub_district'] for row in results)))
-        self.sub_district_combo.clear(); self.sub_district_combo.addItems(sub_districts); self.sub_district_combo.setEnabled(True)
+        self.sub_district_combo.setModel(PlaceListModel(sub_districts, parent=self.sub_district_combo)); self.sub_district_combo.setEnabled(True)
 
         self.province_combo.blockSignals(False)
         self.district_combo.blockSignals(False)
@@ -254,40 +254,15 @@ class ReceiverForm(QWidget):
         self.form_groupbox.setTitle(f'Edit Address')
         self.delete_button.setVisible(True)
 
-        self.province_combo.blockSignals(True)
-        self.district_combo.blockSignals(True)
-        self.sub_district_combo.blockSignals(True)
-
         self.inventory_combo.setCurrentText(address_data.get("inventory_code", ""))
         self.address_detail_input.line_edit.setText(address_data.get("address_detail", ""))
         self.postcode_input.setText(address_data.get("post_code", ""))
         self.delivery_by_combo.setCurrentText(address_data.get("delivery_by", ""))
         self.zone_input.setText(address_data.get("zone", ""))
         self.note_input.setText(address_data.get("note", ""))
-
-        province = address_data.get("province", "")
-        self.initialize_address_dropdowns()
-        self.province_combo.setCurrentText(province)
-        
-        district = address_data.get("district", "")
-        if province:
-            districts = get_districts(province)
-            if districts:
-                self.district_combo.addItems(districts)
-                self.district_combo.setEnabled(True)
-        self.district_combo.setCurrentText(district)
-
-        sub_district = address_data.get("sub_district", "")
-        if province and district:
-            sub_districts = get_sub_districts(province, district)
-            if sub_districts:
-                self.sub_district_combo.addItems(sub_districts)
-                self.sub_district_combo.setEnabled(True)
-        self.sub_district_combo.setCurrentText(sub_district)
-
-        self.province_combo.blockSignals(False)
-        self.district_combo.blockSignals(False)
-        self.sub_district_combo.blockSignals(False)
+        self._select_address(
+            address_data.get("province", ""), address_data.get("district", ""), address_data.get("sub_district", "")
+        )
 
         self.show()
 
@@ -2,13 +2,21 @@ from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QTableWidget, QTableWidgetItem, QHeaderView,
     QAbstractItemView, QHBoxLayout, QLineEdit, QPushButton, QLabel
 )
-from PySide6.QtCore import Signal, Qt
+from PySide6.QtCore import Signal, Qt, QTimer
 import qtawesome as qta
 
+from src.db import changes
+from src.db.receiver_queries import (
+    get_receiver_identities_page, get_receiver_identity_by_id, get_receiver_identities_by_ids,
+    search_receivers, RECEIVER_PAGE_SIZE
+)
+
 class ReceiverTableView(QWidget):
     """
     A widget that displays a filterable table of receiver identities.
     It handles the table UI, filtering, and emits signals for user actions.
+    Receivers are loaded a page at a time as the table is scrolled, and the search runs in the database
+    over names, phone numbers and addresses.
     """
     add_receiver_requested = Signal()
     receiver_selected = Signal(int)  # Emits receiver identity ID
@@ -16,6 +24,9 @@ class ReceiverTableView(QWidget):
     def __init__(self, parent=None, show_add_button=True):
         super().__init__(parent)
         self.show_add_button = show_add_button
+        self._last_key = None       # (name, id) of the last loaded row; the next page starts after it
+        self._exhausted = True
+        self._search_text = ""
         self.setup_ui()
 
     def setup_ui(self):
@@ -23,6 +34,12 @@ class ReceiverTableView(QWidget):
         layout.setContentsMargins(0, 0, 0, 0)
         layout.setSpacing(10)
 
+        # Wait for a pause in typing before searching, instead of querying on every keystroke.
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(250)
+        self.search_timer.timeout.connect(self.filter_table)
+
         header_layout = self._create_header_layout()
         layout.addLayout(header_layout)
 
@@ -33,8 +50,8 @@ class ReceiverTableView(QWidget):
         header_layout = QHBoxLayout()
         
         self.search_input = QLineEdit()
-        self.search_input.setPlaceholderText("Search by name...")
-        self.search_input.textChanged.connect(self.filter_table)
+        self.search_input.setPlaceholderText("Search by name, phone or address...")
+        self.search_input.textChanged.connect(lambda: self.search_timer.start())
         header_layout.addWidget(self.search_input)
 
         if self.show_add_button:
@@ -61,8 +78,15 @@ class ReceiverTableView(QWidget):
         table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         
         table.itemSelectionChanged.connect(self._on_selection_changed)
+        table.verticalScrollBar().valueChanged.connect(self._on_scrolled)
         return table
 
+    def _on_scrolled(self, value):
+        # Pull the next page once the user is within a few screens of the bottom.
+        scroll_bar = self.table.verticalScrollBar()
+        if not self._exhausted and value >= scroll_bar.maximum() - scroll_bar.pageStep() * 2:
+            self.fetch_more()
+
     def _on_selection_changed(self):
         selected_items = self.table.selectedItems()
         if selected_items:
@@ -71,40 +95,121 @@ class ReceiverTableView(QWidget):
         else:
             self.receiver_selected.emit(-1)
 
-    def populate_table(self, receivers):
+    def load_receivers(self):
+        """Clears the search and reloads the table from the first page."""
+        self.search_timer.stop()
+        self.search_input.blockSignals(True)
+        self.search_input.clear()
+        self.search_input.blockSignals(False)
+        self._reload("")
+
+    def _reload(self, search_text):
+        self._search_text = search_text
+        self._last_key = None
+        self._exhausted = False
         self.table.setRowCount(0)
+        self.clear_selection()
+        self.fetch_more()
+
+    def fetch_more(self):
+        """Appends the next page of receivers to the table. Returns False once everything is loaded."""
+        if self._exhausted:
+            return False
+        if self._search_text:
+            # Search results come best match first, so they are paged by position rather than by name.
+            page = search_receivers(self._search_text, RECEIVER_PAGE_SIZE, self.table.rowCount())
+        else:
+            page = get_receiver_identities_page(self._last_key, RECEIVER_PAGE_SIZE)
+        self._append_rows(page)
+        self._exhausted = len(page) < RECEIVER_PAGE_SIZE
+        if page:
+            self._last_key = (page[-1]["name"], page[-1]["id"])
+        # A short first page may not fill the viewport, which means no scrolling and no further fetches.
+        if not self._exhausted and self.table.verticalScrollBar().maximum() == 0:
+            QTimer.singleShot(0, self.fetch_more)
+        return bool(page)
+
+    def _append_rows(self, receivers):
+        self.table.setUpdatesEnabled(False)
+        row_position = self.table.rowCount()
+        self.table.setRowCount(row_position + len(receivers))
         for receiver in receivers:
-            row_position = self.table.rowCount()
-            self.table.insertRow(row_position)
             self.table.setItem(row_position, 0, QTableWidgetItem(str(receiver["id"])))
             self.table.setItem(row_position, 1, QTableWidgetItem(receiver["name"]))
-            
+
             count_item = QTableWidgetItem(str(receiver.get("address_count", 0)))
             count_item.setTextAlignment(Qt.AlignCenter)
             self.table.setItem(row_position, 2, count_item)
+            row_position += 1
+        self.table.setUpdatesEnabled(True)
+
+    def apply_change(self, operation, ids):
+        """
+        Brings the loaded rows in line with a receiver_identities change. Updated and deleted receivers
+        are patched in place; new receivers (or an unknown set of changes) reload the list, since
+        where they belong depends on the order.
+        """
+        if ids is None or operation == changes.INSERT:
+            self._reload(self._search_text)
+            return
+        loaded = {}
+        for row in range(self.table.rowCount()):
+            item = self.table.item(row, 0)
+            if item:
+                loaded[int(item.text())] = row
+        affected = [receiver_id for receiver_id in ids if receiver_id in loaded]
+        if not affected:
+            return
+
+        fresh = {}
+        if operation != changes.DELETE:
+            fresh = {receiver["id"]: receiver for receiver in get_receiver_identities_by_ids(affected)}
+        # Bottom-up, so removing a row does not shift the rows still to be visited.
+        for receiver_id in sorted(affected, key=loaded.get, reverse=True):
+            row = loaded[receiver_id]
+            receiver = fresh.get(receiver_id)
+            if receiver is None:
+                self.table.removeRow(row)
+                continue
+            self.table.item(row, 1).setText(receiver["name"])
+            self.table.item(row, 2).setText(str(receiver.get("address_count", 0)))
 
+    def populate_table(self, receivers):
+        """Shows an already fetched list of receivers; no further pages are loaded."""
+        self.search_timer.stop()
+        self.table.setRowCount(0)
+        self._append_rows(receivers)
+        self._exhausted = True
         self.clear_selection()
+        self.search_input.blockSignals(True)
         self.search_input.clear()
+        self.search_input.blockSignals(False)
 
     def filter_table(self):
-        search_text = self.search_input.text().lower()
-
-        for row in range(self.table.rowCount()):
-            name_item = self.table.item(row, 1)
-            
-            name_match = search_text in name_item.text().lower() if name_item and name_item.text() else False
-            
-            self.table.setRowHidden(row, not name_match)
+        self._reload(self.search_input.text().strip())
 
     def clear_selection(self):
         self.table.clearSelection()
 
+    def _find_row(self, receiver_id):
+        for row in range(self.table.rowCount()):
+            item = self.table.item(row, 0)
+            if item and int(item.text()) == receiver_id:
+                return row
+        return None
+
     def select_row_by_id(self, receiver_id):
         if receiver_id is None:
             self.clear_selection()
             return
-        for row in range(self.table.rowCount()):
-            item = self.table.item(row, 0)
-            if item and int(item.text()) == receiver_id:
-                self.table.selectRow(row)
-                return
+        row = self._find_row(receiver_id)
+        if row is None and not self._exhausted and not self._search_text:
+            # The receiver sits further down than what is loaded; fetch pages until its position is reached.
+            receiver = get_receiver_identity_by_id(receiver_id)
+            if receiver:
+                target = (receiver["name"], receiver_id)
+                while not self._exhausted and (self._last_key is None or self._last_key < target):
+                    self.fetch_more()
+                row = self._find_row(receiver_id)
+        if row is not None:
+            self.table.selectRow(row)
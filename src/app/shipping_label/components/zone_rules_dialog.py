@@ -0,0 +1,149 @@
+from PySide6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QCheckBox,
+    QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView, QMessageBox, QDialogButtonBox
+)
+from PySide6.QtCore import QThreadPool
+import qtawesome as qta
+
+from src.components.async_worker import Worker
+from src.db.zone_queries import get_all_zone_rules, add_zone_rule, delete_zone_rule, assign_zones
+
+class ZoneRulesDialog(QDialog):
+    """
+    Lists the zone rules, adds and deletes them, and applies them to every stored receiver address.
+    A rule matches a post-code range, a district (with its province) or a province; new and imported
+    addresses with a blank zone are filled from the rules automatically.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Zone Rules")
+        self.resize(720, 480)
+        self.setup_ui()
+        self.load_rules()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        layout.addWidget(QLabel("Fill either a post-code range, a district with its province, or a province. "
+                                "District rules win over post-code ranges, which win over provinces."))
+
+        add_layout = QHBoxLayout()
+        self.zone_input = QLineEdit()
+        self.zone_input.setPlaceholderText("Zone")
+        self.post_code_from_input = QLineEdit()
+        self.post_code_from_input.setPlaceholderText("Post code from")
+        self.post_code_to_input = QLineEdit()
+        self.post_code_to_input.setPlaceholderText("Post code to")
+        self.province_input = QLineEdit()
+        self.province_input.setPlaceholderText("Province")
+        self.district_input = QLineEdit()
+        self.district_input.setPlaceholderText("District")
+        for line_edit in (self.zone_input, self.post_code_from_input, self.post_code_to_input,
+                          self.province_input, self.district_input):
+            line_edit.returnPressed.connect(self.add_rule)
+            add_layout.addWidget(line_edit)
+        self.add_button = QPushButton(qta.icon('fa5s.plus', color='white'), " Add Rule")
+        self.add_button.setObjectName("AddUserButton")
+        self.add_button.clicked.connect(self.add_rule)
+        add_layout.addWidget(self.add_button)
+        layout.addLayout(add_layout)
+
+        self.rules_table = QTableWidget()
+        self.rules_table.setAlternatingRowColors(True)
+        self.rules_table.setColumnCount(5)
+        self.rules_table.setHorizontalHeaderLabels(["ID", "Zone", "Post Codes", "Province", "District"])
+        self.rules_table.setColumnHidden(0, True)
+        self.rules_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.rules_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.rules_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.rules_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.rules_table.itemSelectionChanged.connect(
+            lambda: self.delete_button.setEnabled(bool(self.rules_table.selectedItems()))
+        )
+        layout.addWidget(self.rules_table)
+
+        action_layout = QHBoxLayout()
+        self.overwrite_checkbox = QCheckBox("Replace zones that were typed in by hand")
+        action_layout.addWidget(self.overwrite_checkbox)
+        action_layout.addStretch()
+        self.apply_button = QPushButton(qta.icon('fa5s.magic', color='white'), " Apply to All Addresses")
+        self.apply_button.clicked.connect(self.apply_rules)
+        action_layout.addWidget(self.apply_button)
+        self.delete_button = QPushButton(qta.icon('fa5s.trash-alt', color='white'), " Delete Selected")
+        self.delete_button.setObjectName("DeleteUserButton")
+        self.delete_button.setEnabled(False)
+        self.delete_button.clicked.connect(self.delete_selected_rule)
+        action_layout.addWidget(self.delete_button)
+        layout.addLayout(action_layout)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Close)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+    def load_rules(self):
+        self.rules_table.setRowCount(0)
+        for rule in get_all_zone_rules():
+            row = self.rules_table.rowCount()
+            self.rules_table.insertRow(row)
+            post_codes = ""
+            if rule['post_code_from']:
+                post_codes = rule['post_code_from']
+                if rule['post_code_to'] != rule['post_code_from']:
+                    post_codes += f" - {rule['post_code_to']}"
+            values = [str(rule['id']), rule['zone'], post_codes, rule['province'] or "", rule['district'] or ""]
+            for column, value in enumerate(values):
+                self.rules_table.setItem(row, column, QTableWidgetItem(value))
+        self.delete_button.setEnabled(False)
+
+    def add_rule(self):
+        success, msg = add_zone_rule(
+            self.zone_input.text(), self.province_input.text(), self.district_input.text(),
+            self.post_code_from_input.text(), self.post_code_to_input.text()
+        )
+        if not success:
+            QMessageBox.warning(self, "Input Error", msg)
+            return
+        for line_edit in (self.post_code_from_input, self.post_code_to_input, self.province_input, self.district_input):
+            line_edit.clear()
+        self.load_rules()
+
+    def delete_selected_rule(self):
+        selected = self.rules_table.selectedItems()
+        if not selected:
+            return
+        rule_id = int(self.rules_table.item(selected[0].row(), 0).text())
+        success, msg = delete_zone_rule(rule_id)
+        if success:
+            self.load_rules()
+        else:
+            QMessageBox.warning(self, "Error", msg)
+
+    def apply_rules(self):
+        # Every address is read and rewritten in one transaction, so the pass runs on the thread pool.
+        self.apply_button.setEnabled(False)
+        self.apply_button.setText(" Applying...")
+        overwrite = self.overwrite_checkbox.isChecked()
+
+        def _assign_task(**kwargs):  # Worker adds progress_callback
+            return assign_zones(overwrite=overwrite)
+
+        worker = Worker(_assign_task)
+        worker.signals.result.connect(self._on_rules_applied)
+        worker.signals.error.connect(self._on_apply_failed)
+        QThreadPool.globalInstance().start(worker)
+
+    def _end_apply(self):
+        self.apply_button.setText(" Apply to All Addresses")
+        self.apply_button.setEnabled(True)
+
+    def _on_rules_applied(self, outcome):
+        self._end_apply()
+        changed, msg = outcome
+        if changed is None:
+            QMessageBox.warning(self, "Error", msg)
+        else:
+            QMessageBox.information(self, "Zones Assigned", msg)
+
+    def _on_apply_failed(self, error):
+        self._end_apply()
+        QMessageBox.warning(self, "Error", f"Zones could not be assigned: {error[1]}")
@@ -7,10 +7,11 @@ from PySide6.QtCore import Qt
 import qtawesome as qta
 
 from src.db.delivery_by_queries import (
-    initialize_delivery_db, get_all_delivery_options, add_delivery_option, 
+    get_all_delivery_options, add_delivery_option, 
     update_delivery_option, delete_delivery_option
 )
 from src.db.config_queries import save_config, get_config
+from src.db.changes import VersionTracker
 
 class EditDialog(QDialog):
     """A simple dialog for editing a delivery option name."""
@@ -36,15 +37,14 @@ class EditDialog(QDialog):
 class DeliveryManagement(QWidget):
     def __init__(self):
         super().__init__()
-        initialize_delivery_db()
+        self.versions = VersionTracker("delivery_options", "app_config")
         self.setup_ui()
         self.load_options_to_table()
 
     def showEvent(self, event):
         """Override showEvent to refresh data when the widget is shown."""
         super().showEvent(event)
-        if self.isVisible():
-            print("DeliveryManagement showEvent triggered") # Debug print
+        if self.isVisible() and self.versions.changed_since_last_check():
             self.load_options_to_table()
 
     def setup_ui(self):
@@ -103,6 +103,7 @@ class DeliveryManagement(QWidget):
         main_layout.addLayout(action_layout)
 
     def load_options_to_table(self):
+        self.versions.mark_seen()
         self.options_table.setRowCount(0)
         options = get_all_delivery_options()
         default_option = get_config("default_delivery_by")
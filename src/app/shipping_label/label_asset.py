@@ -7,10 +7,12 @@ import qtawesome as qta
 
 # Import DB queries for saving/loading config
 from src.db.config_queries import save_config, get_config
+from src.db.changes import VersionTracker
 
 class LabelAsset(QWidget):
     def __init__(self):
         super().__init__()
+        self.versions = VersionTracker("app_config")
         self.setup_ui()
         self.load_saved_assets()
 
@@ -92,6 +94,7 @@ class LabelAsset(QWidget):
             self.receiver_asset_input.setText(file_path)
 
     def load_saved_assets(self):
+        self.versions.mark_seen()
         sender_logo_path = get_config("asset_sender_logo", "")
         receiver_logo_path = get_config("asset_receiver_logo", "")
         self.sender_asset_input.setText(sender_logo_path)
@@ -109,5 +112,5 @@ class LabelAsset(QWidget):
     def showEvent(self, event):
         """Override showEvent to refresh data when the widget is shown."""
         super().showEvent(event)
-        if self.isVisible():
+        if self.isVisible() and self.versions.changed_since_last_check():
             self.load_saved_assets()
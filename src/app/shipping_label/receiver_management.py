@@ -1,30 +1,38 @@
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QHBoxLayout, QMessageBox, QTableWidget, 
     QTableWidgetItem, QHeaderView, QAbstractItemView, QPushButton, QGroupBox,
-    QDialog, QDialogButtonBox, QLineEdit, QFormLayout, QFileDialog
+    QDialog, QDialogButtonBox, QLineEdit, QFormLayout, QFileDialog, QProgressDialog
 )
-from PySide6.QtCore import Qt, QSettings, QStandardPaths
+from PySide6.QtCore import Qt, QSettings, QStandardPaths, QThreadPool
 import qtawesome as qta
 import openpyxl
 from datetime import datetime
 import os
+import threading
 
 # Utility Imports
-from src.utils.excel_importer import read_excel_to_dict_list
+from src.utils.csv_io import CSV_FILE_FILTER, is_csv_path
+from src.utils.excel_importer import select_excel_file
+from src.utils.receiver_import import RECEIVER_SHEET_COLUMNS, confirm_receiver_import, run_receiver_import
+from src.utils.table_transfer import export_table_csv
 
 # Refactored Component Imports
 from .components.receiver_table_view import ReceiverTableView
 from .components.receiver_form import ReceiverForm
+from .components.zone_rules_dialog import ZoneRulesDialog
 
 # Database Imports
 from src.db.receiver_queries import (
-    initialize_receiver_db, get_all_receiver_identities, get_addresses_for_receiver,
+    discard_staged_receivers,
+    get_addresses_for_receiver,
     add_receiver_identity, add_receiver_address, update_receiver_identity, 
     update_receiver_address, delete_receiver_identity, delete_receiver_address,
-    get_receiver_address_by_id, find_exact_address, get_all_receiver_addresses,
-    set_default_address
+    get_receiver_address_by_id, get_all_receiver_addresses, get_receiver_identities_page, set_default_address
 )
-from src.db.delivery_by_queries import initialize_delivery_db, get_all_delivery_options, add_delivery_option
+from src.db.async_dao import AsyncQuery
+from src.components.async_worker import Worker
+from src.db.changes import VersionTracker
+from src.components.db_change_bus import get_change_bus
 
 class ReceiverIdentityDialog(QDialog):
     """Dialog for adding or editing a receiver's name and telephone."""
@@ -52,9 +60,21 @@ class ReceiverManagement(QWidget):
         self.current_receiver_id = None
         self.current_address_id = None
 
-        initialize_receiver_db()
-        initialize_delivery_db()
-        
+        # Addresses load off the GUI thread; clicking through receivers only shows the last one clicked.
+        self.addresses_query = AsyncQuery(get_addresses_for_receiver, self)
+        self.addresses_query.result.connect(self._fill_address_table)
+
+        # Reload on show only when these tables changed while the page was hidden.
+        self.receiver_versions = VersionTracker("receiver_identities")
+        self.form_versions = VersionTracker("delivery_options", "inventory_path_configs", "app_config")
+        get_change_bus().table_changed.connect(self._on_table_changed)
+
+        # Imports run on a thread of their own that never expires, so the rows a preview staged (a TEMP
+        # table on that thread's connection) are still there when the user confirms it.
+        self.import_pool = QThreadPool(self)
+        self.import_pool.setMaxThreadCount(1)
+        self.import_pool.setExpiryTimeout(-1)
+
         self.setup_ui()
         self.connect_signals()
         self.load_receivers_to_table()
@@ -64,9 +84,26 @@ class ReceiverManagement(QWidget):
     def showEvent(self, event):
         super().showEvent(event)
         if self.isVisible():
-            self.load_receivers_to_table()
+            if self.receiver_versions.changed_since_last_check():
+                self.load_receivers_to_table()
+            if self.form_versions.changed_since_last_check():
+                self.address_form_widget.populate_delivery_dropdown()
+                self.address_form_widget.populate_inventory_dropdown()
+
+    def _on_table_changed(self, table, operation, ids):
+        # While hidden, showEvent catches up through the version trackers instead.
+        if not self.isVisible():
+            return
+        if table == "receiver_identities":
+            self.receivers_table_widget.apply_change(operation, ids)
+            self.receiver_versions.mark_seen()
+            # Address writes report their receiver as updated, so this also covers the address table.
+            if self.current_receiver_id and self.current_receiver_id > 0 and (ids is None or self.current_receiver_id in ids):
+                self.populate_address_table(self.current_receiver_id)
+        elif table in self.form_versions.tables:
             self.address_form_widget.populate_delivery_dropdown()
             self.address_form_widget.populate_inventory_dropdown()
+            self.form_versions.mark_seen()
 
     def setup_ui(self):
         main_layout = QVBoxLayout(self)
@@ -83,7 +120,9 @@ class ReceiverManagement(QWidget):
         self.import_button.setObjectName("EditUserButton")
         self.export_button = QPushButton(qta.icon('fa5s.file-export', color='white'), " Export Excel")
         self.export_button.setObjectName("ExportButton")
+        self.zone_rules_button = QPushButton(qta.icon('fa5s.map-marked-alt', color='#64748b'), " Zone Rules")
         
+        title_layout.addWidget(self.zone_rules_button)
         title_layout.addWidget(self.import_button)
         title_layout.addWidget(self.export_button)
         main_layout.addLayout(title_layout)
@@ -150,6 +189,7 @@ class ReceiverManagement(QWidget):
 
         self.import_button.clicked.connect(self.import_from_excel)
         self.export_button.clicked.connect(self.export_all_receivers_data)
+        self.zone_rules_button.clicked.connect(lambda: ZoneRulesDialog(self).exec())
 
         self.edit_receiver_button.clicked.connect(self.edit_receiver)
         self.delete_receiver_button.clicked.connect(self.delete_receiver)
@@ -162,8 +202,8 @@ class ReceiverManagement(QWidget):
         self.address_form_widget.cancel_requested.connect(lambda: self.address_form_widget.hide())
 
     def load_receivers_to_table(self):
-        receivers = get_all_receiver_identities()
-        self.receivers_table_widget.populate_table(receivers)
+        self.receiver_versions.mark_seen()
+        self.receivers_table_widget.load_receivers()
 
     def on_receiver_selected(self, receiver_id):
         self.address_form_widget.hide()
@@ -183,9 +223,13 @@ class ReceiverManagement(QWidget):
 
     def populate_address_table(self, receiver_id):
         self.address_table.setRowCount(0)
-        if receiver_id < 0: return
+        if receiver_id < 0:
+            self.addresses_query.cancel()
+            return
+        self.addresses_query.request(receiver_id)
 
-        addresses = get_addresses_for_receiver(receiver_id)
+    def _fill_address_table(self, addresses):
+        self.address_table.setRowCount(0)
         for addr in addresses:
             row = self.address_table.rowCount()
             self.address_table.insertRow(row)
@@ -229,7 +273,6 @@ class ReceiverManagement(QWidget):
             
             receiver_id, msg = add_receiver_identity(name, tel)
             if receiver_id is not None:
-                self.load_receivers_to_table()
                 self.receivers_table_widget.select_row_by_id(receiver_id)
                 QMessageBox.information(self, "Receiver Added", f"{msg} Now, please add their first address.")
                 self.add_address()
@@ -250,10 +293,7 @@ class ReceiverManagement(QWidget):
                 QMessageBox.warning(self, "Input Error", "Receiver name cannot be empty.")
                 return
             success, msg = update_receiver_identity(self.current_receiver_id, new_name, new_tel)
-            if success:
-                self.load_receivers_to_table()
-                self.receivers_table_widget.select_row_by_id(self.current_receiver_id)
-            else:
+            if not success:
                 QMessageBox.warning(self, "Error", msg)
 
     def delete_receiver(self):
@@ -261,9 +301,7 @@ class ReceiverManagement(QWidget):
         reply = QMessageBox.question(self, 'Delete Receiver', "Are you sure you want to delete this receiver and ALL their addresses?", QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
             success, msg = delete_receiver_identity(self.current_receiver_id)
-            if success:
-                self.load_receivers_to_table()
-            else:
+            if not success:
                 QMessageBox.warning(self, "Error", msg)
 
     def add_address(self):
@@ -278,9 +316,6 @@ class ReceiverManagement(QWidget):
         if reply == QMessageBox.Yes:
             success, msg = delete_receiver_address(address_id)
             if success:
-                self.populate_address_table(self.current_receiver_id)
-                self.load_receivers_to_table()
-                self.receivers_table_widget.select_row_by_id(self.current_receiver_id)
                 self.address_form_widget.hide()
             else:
                 QMessageBox.warning(self, "Error", msg)
@@ -288,9 +323,7 @@ class ReceiverManagement(QWidget):
     def set_selected_address_as_default(self):
         if not self.current_address_id or not self.current_receiver_id: return
         success, msg = set_default_address(self.current_receiver_id, self.current_address_id)
-        if success:
-            self.populate_address_table(self.current_receiver_id)
-        else:
+        if not success:
             QMessageBox.warning(self, "Error", msg)
 
     def save_address_form(self, data):
@@ -300,9 +333,6 @@ class ReceiverManagement(QWidget):
             success, msg = add_receiver_address(self.current_receiver_id, data)
 
         if success:
-            self.populate_address_table(self.current_receiver_id)
-            self.load_receivers_to_table()
-            self.receivers_table_widget.select_row_by_id(self.current_receiver_id)
             self.address_form_widget.hide()
         else:
             QMessageBox.warning(self, "Database Error", msg)
@@ -311,37 +341,34 @@ class ReceiverManagement(QWidget):
         self.export_button.setText("Exporting...")
         self.export_button.setEnabled(False)
         try:
-            all_data = get_all_receiver_addresses()
-            if not all_data:
+            if not get_receiver_identities_page(None, 1):
                 QMessageBox.information(self, "Export", "There is no receiver data to export.")
                 return
 
-            headers = ["Name", "Tel", "Inventory", "Address Details", "Sub-district", "District", "Province", "Post Code", "Delivery By", "Zone", "Note"]
-            key_map = {
-                "Name": "name",
-                "Tel": "tel",
-                "Inventory": "inventory_code",
-                "Address Details": "address_detail",
-                "Sub-district": "sub_district",
-                "District": "district",
-                "Province": "province",
-                "Post Code": "post_code",
-                "Delivery By": "delivery_by",
-                "Zone": "zone",
-                "Note": "note"
-            }
+            headers = list(RECEIVER_SHEET_COLUMNS.values())
+            key_map = {header: key for key, header in RECEIVER_SHEET_COLUMNS.items()}
             
             settings = QSettings("ProAuto", "App")
             last_dir = settings.value("excel/last_export_directory", QStandardPaths.writableLocation(QStandardPaths.DocumentsLocation))
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             default_filename = f"receivers_export_{timestamp}.xlsx"
             
-            file_path, _ = QFileDialog.getSaveFileName(self, "Save Excel File", os.path.join(last_dir, default_filename), "Excel Files (*.xlsx)")
+            file_path, _ = QFileDialog.getSaveFileName(
+                self, "Save Excel File", os.path.join(last_dir, default_filename), f"Excel Files (*.xlsx);;{CSV_FILE_FILTER}"
+            )
 
             if not file_path: return
 
             settings.setValue("excel/last_export_directory", os.path.dirname(file_path))
 
+            if is_csv_path(file_path):
+                # Streams from the query cursor to the file, without holding the rows or going through openpyxl.
+                count = export_table_csv('receivers', file_path)
+                QMessageBox.information(self, "Export Successful", f"{count} addresses exported to\n{file_path}")
+                return
+
+            all_data = get_all_receiver_addresses()
+
             workbook = openpyxl.Workbook()
             sheet = workbook.active
             sheet.title = "Receivers"
@@ -368,59 +395,109 @@ class ReceiverManagement(QWidget):
             self.export_button.setEnabled(True)
 
     def import_from_excel(self):
-        self.import_button.setText("Importing...")
+        file_path = select_excel_file(self)
+        if not file_path: return
+
+        self.import_file_path = file_path
+        # A dry run first, so the user sees what the sheet would change before anything is written.
+        self._start_import()
+
+    def _start_import(self, preview=None):
+        """Previews the import of import_file_path or, given that preview's outcome, writes the rows it staged."""
+        file_path = self.import_file_path
+        dry_run = preview is None
+        self.import_button.setText("Checking..." if dry_run else "Importing...")
         self.import_button.setEnabled(False)
-        try:
-            imported_data, filename = read_excel_to_dict_list(self)
-            if not imported_data: return
-
-            added_count, updated_count, unchanged_count = 0, 0, 0
-            delivery_options = set(get_all_delivery_options())
-
-            for row_data in imported_data:
-                name = row_data.get('Name')
-                tel = str(row_data.get('Tel', ''))
-                if not name: continue
-
-                receiver_id, _ = add_receiver_identity(name, tel)
-                if receiver_id is None: continue
-
-                delivery_by = row_data.get('Delivery By', '').strip()
-                if delivery_by and delivery_by not in delivery_options:
-                    add_delivery_option(delivery_by)
-                    delivery_options.add(delivery_by)
-
-                address_data = {
-                    'inventory_code': row_data.get('Inventory', ''),
-                    'address_detail': row_data.get('Address Details', ''),
-                    'sub_district': row_data.get('Sub-district', ''),
-                    'district': row_data.get('District', ''),
-                    'province': row_data.get('Province', ''),
-                    'post_code': str(row_data.get('Post Code', '')),
-                    'delivery_by': delivery_by,
-                    'zone': str(row_data.get('Zone', '')),
-                    'note': str(row_data.get('Note', ''))
-                }
-
-                existing_address = find_exact_address(receiver_id, address_data['address_detail'], address_data['post_code'])
-
-                if existing_address:
-                    is_different = any(str(existing_address.get(k, '')) != str(v) for k, v in address_data.items())
-                    if is_different:
-                        update_receiver_address(existing_address['id'], address_data)
-                        updated_count += 1
-                    else:
-                        unchanged_count += 1
-                else:
-                    add_receiver_address(receiver_id, address_data)
-                    added_count += 1
-
-            self.load_receivers_to_table()
-            QMessageBox.information(self, "Import Complete", 
-                                    f"Successfully imported from {filename}\n\n"
-                                    f"New addresses added: {added_count}\n"
-                                    f"Addresses updated: {updated_count}\n"
-                                    f"Unchanged items: {unchanged_count}")
-        finally:
-            self.import_button.setText("Import Excel")
-            self.import_button.setEnabled(True)
\ No newline at end of file
+        self.import_cancel_event = threading.Event()
+
+        # Starts as a busy indicator; switches to a percentage once the worker knows the sheet size.
+        label = f"{'Checking' if dry_run else 'Importing'} {os.path.basename(file_path)}..."
+        self.import_progress = QProgressDialog(label, "Cancel", 0, 0, self)
+        self.import_progress.setWindowTitle("Import Excel")
+        self.import_progress.setWindowModality(Qt.WindowModal)
+        self.import_progress.setMinimumDuration(0)
+        self.import_progress.setAutoClose(False)
+        self.import_progress.setAutoReset(False)
+        self.import_progress.canceled.connect(self._cancel_import)
+        self.import_progress.show()
+
+        # The import writes in one transaction on the import thread; the tables refresh once, from the
+        # change notifications sent after it commits.
+        if dry_run:
+            worker = Worker(run_receiver_import, file_path, self.import_cancel_event, dry_run=True, keep_staged=True)
+        else:
+            worker = Worker(confirm_receiver_import, preview, file_path, self.import_cancel_event)
+        worker.signals.progress.connect(self._on_import_progress)
+        worker.signals.result.connect(self._on_import_finished)
+        worker.signals.error.connect(self._on_import_failed)
+        self.import_pool.start(worker)
+
+    def _cancel_import(self):
+        self.import_cancel_event.set()
+        self.import_progress.setLabelText("Cancelling, rolling back...")
+        self.import_progress.setCancelButton(None)
+
+    def _on_import_progress(self, percent):
+        if self.import_progress.maximum() == 0:
+            self.import_progress.setRange(0, 100)
+        self.import_progress.setValue(percent)
+
+    def _end_import(self):
+        # hide(), not close(): closing a QProgressDialog emits canceled.
+        self.import_progress.hide()
+        self.import_progress.deleteLater()
+        self.import_button.setText("Import Excel")
+        self.import_button.setEnabled(True)
+
+    def _on_import_failed(self, error):
+        self._end_import()
+        _, value, _ = error
+        QMessageBox.critical(self, "Import Failed", f"Nothing was imported from {self.import_file_path}.\n\nAn error occurred while reading the file: {value}")
+
+    def _discard_preview(self):
+        # The preview's rows are staged on the import thread's connection, so they are dropped there.
+        self.import_pool.start(Worker(lambda progress_callback: discard_staged_receivers()))
+
+    def _on_import_finished(self, outcome):
+        self._end_import()
+        counts, message, file_path = outcome['counts'], outcome['message'], self.import_file_path
+        if outcome['cancelled']:
+            QMessageBox.information(self, "Import Cancelled", f"The import was cancelled. Nothing was imported from {file_path}.")
+            return
+        if counts is None:
+            QMessageBox.critical(self, "Import Failed", f"Nothing was imported from {file_path}.\n\n{message}")
+            return
+        added_count, updated_count, unchanged_count = counts['added'], counts['updated'], counts['unchanged']
+
+        if outcome['dry_run']:
+            if not (added_count or updated_count):
+                self._discard_preview()
+                QMessageBox.information(self, "Nothing to Import",
+                                        f"Every address in {file_path} is already up to date "
+                                        f"({unchanged_count} unchanged).")
+                return
+            preview = (f"Importing {file_path} will change:\n\n"
+                       f"New addresses: {added_count}\n"
+                       f"Updated addresses: {updated_count}\n"
+                       f"Unchanged items: {unchanged_count}\n\n"
+                       f"Import now?")
+            if QMessageBox.question(self, "Import Preview", preview) == QMessageBox.Yes:
+                self._start_import(preview=outcome)
+            else:
+                self._discard_preview()
+            return
+
+        summary = (f"Successfully imported from {file_path}\n\n"
+                   f"New addresses added: {added_count}\n"
+                   f"Addresses updated: {updated_count}\n"
+                   f"Unchanged items: {unchanged_count}")
+        needs_review = outcome['review_rows']
+        if outcome['parsed'] or needs_review:
+            summary += f"\nAddresses split from text: {outcome['parsed']}"
+        if needs_review:
+            rows_to_check = ", ".join(str(row_number) for row_number in needs_review[:20])
+            if len(needs_review) > 20:
+                rows_to_check += ", ..."
+            summary += (f"\nAddresses left as typed (please check): {len(needs_review)}"
+                        f"\nRows: {rows_to_check}")
+        QMessageBox.information(self, "Import Complete", summary)
@@ -9,19 +9,33 @@ import qtawesome as qta
 
 # Database imports
 from src.db.sender_queries import (
-    initialize_sender_db, add_sender, get_all_senders, update_sender, 
+    add_sender, get_all_senders, update_sender, 
     delete_sender
 )
-from src.db.address_queries import get_provinces, get_districts, get_sub_districts, get_zipcode, get_addresses_by_zipcode
+from src.db.address_queries import get_zipcode, get_addresses_by_zipcode
 from src.db.config_queries import get_config
 from src.db.path_config_queries import get_all_path_configs
+from src.db.async_dao import AsyncQuery
+from src.db.changes import VersionTracker
+from src.components.db_change_bus import get_change_bus
 from src.components.validated_line_edit import ValidatedLineEdit
+from src.components.address_completer import AddressCompleter
+from src.components.address_models import (
+    AddressCombosMixin, PlaceListModel, province_model, district_model, sub_district_model
+)
 
-class SenderManagement(QWidget):
+class SenderManagement(AddressCombosMixin, QWidget):
     def __init__(self):
         super().__init__()
         self.current_sender_id = None
-        initialize_sender_db()
+        # The sender list loads off the GUI thread; only the latest refresh is shown.
+        self.senders_query = AsyncQuery(get_all_senders, self)
+        self.senders_query.result.connect(self._fill_sender_table)
+        # Changes made elsewhere arrive on the change bus while the page is shown; while it is hidden,
+        # showEvent catches up through the tracker and the inventory default it last read.
+        self.versions = VersionTracker("senders", "inventory_path_configs")
+        self.loaded_default_code = None
+        get_change_bus().table_changed.connect(self._on_table_changed)
         self.setup_ui()
         self.load_senders_to_table() # This will also populate the dropdown
         self.initialize_address_dropdowns()
@@ -30,9 +44,26 @@ class SenderManagement(QWidget):
     def showEvent(self, event):
         """Override showEvent to refresh data when the widget is shown."""
         super().showEvent(event)
-        if self.isVisible():
+        if self.isVisible() and (self.versions.changed_since_last_check()
+                                 or get_config("bills_process_inventory_code") != self.loaded_default_code):
             self.load_senders_to_table()
 
+    def _on_table_changed(self, table, operation, ids):
+        if not self.isVisible():
+            return
+        if table == "senders":
+            # Only the list reloads, so a search being typed and the form being edited are kept.
+            self.versions.mark_seen()
+            self.senders_query.request()
+        elif table == "inventory_path_configs" or (
+            table == "app_config" and (ids is None or "bills_process_inventory_code" in ids)
+        ):
+            self.versions.mark_seen()
+            current_code = self.inventory_combo.currentText()
+            self.populate_inventory_dropdown()
+            if self.current_sender_id is not None:
+                self.inventory_combo.setCurrentText(current_code)
+
 
     def setup_ui(self):
         main_layout = QVBoxLayout(self)
@@ -135,8 +166,10 @@ class SenderManagement(QWidget):
 
         # --- New Address Fields ---
         self.postcode_input = QLineEdit()
-        self.postcode_input.setPlaceholderText("Enter 5-digit post code")
+        self.postcode_input.setPlaceholderText("Post code, sub-district or district")
         self.postcode_input.returnPressed.connect(self.on_find_by_zipcode_clicked)
+        self.postcode_completer = AddressCompleter(self.postcode_input, self)
+        self.postcode_completer.location_chosen.connect(self.on_location_chosen)
         find_zip_button = QPushButton(qta.icon('fa5s.search', color='white'), " Find")
         find_zip_button.clicked.connect(self.on_find_by_zipcode_clicked)
         
@@ -236,6 +269,7 @@ class SenderManagement(QWidget):
         codes = sorted([config['inventory_code'] for config in path_configs])
         
         default_code = get_config("bills_process_inventory_code")
+        self.loaded_default_code = default_code
         
         if default_code and default_code not in codes:
             codes.append(default_code)
@@ -250,48 +284,37 @@ class SenderManagement(QWidget):
         self.inventory_combo.blockSignals(False)
 
     def initialize_address_dropdowns(self):
-        self.province_combo.blockSignals(True)
-        self.province_combo.clear()
-        self.province_combo.addItem("Select Province...")
-        provinces = get_provinces()
-        if provinces:
-            self.province_combo.addItems(provinces)
-        self.province_combo.blockSignals(False)
+        for combo in (self.province_combo, self.district_combo, self.sub_district_combo):
+            combo.blockSignals(True)
+        self.province_combo.setModel(province_model())
+        self.province_combo.setCurrentIndex(0)
+        self.district_combo.setModel(district_model(None))
+        self.sub_district_combo.setModel(sub_district_model(None, None))
+        for combo in (self.province_combo, self.district_combo, self.sub_district_combo):
+            combo.blockSignals(False)
         self.district_combo.setEnabled(False)
         self.sub_district_combo.setEnabled(False)
 
     def on_province_changed(self, province):
         self.district_combo.blockSignals(True)
-        self.district_combo.clear()
-        self.district_combo.addItem("Select District...")
-        self.sub_district_combo.clear()
+        self.sub_district_combo.blockSignals(True)
+        districts = district_model(province)
+        self.district_combo.setModel(districts)
+        self.district_combo.setCurrentIndex(0)
+        self.sub_district_combo.setModel(sub_district_model(None, None))
         self.postcode_input.clear()
-
-        if province and province != "Select Province...":
-            districts = get_districts(province)
-            if districts:
-                self.district_combo.addItems(districts)
-                self.district_combo.setEnabled(True)
-        else:
-            self.district_combo.setEnabled(False)
-        
+        self.district_combo.setEnabled(districts.place_count() > 0)
         self.sub_district_combo.setEnabled(False)
         self.district_combo.blockSignals(False)
+        self.sub_district_combo.blockSignals(False)
 
     def on_district_changed(self, district):
         self.sub_district_combo.blockSignals(True)
-        self.sub_district_combo.clear()
-        self.sub_district_combo.addItem("Select Sub-district...")
+        sub_districts = sub_district_model(self.province_combo.currentText(), district)
+        self.sub_district_combo.setModel(sub_districts)
+        self.sub_district_combo.setCurrentIndex(0)
         self.postcode_input.clear()
-
-        province = self.province_combo.currentText()
-        if district and district != "Select District...":
-            sub_districts = get_sub_districts(province, district)
-            if sub_districts:
-                self.sub_district_combo.addItems(sub_districts)
-                self.sub_district_combo.setEnabled(True)
-        else:
-            self.sub_district_combo.setEnabled(False)
+        self.sub_district_combo.setEnabled(sub_districts.place_count() > 0)
         self.sub_district_combo.blockSignals(False)
 
     def on_sub_district_changed(self, sub_district):
@@ -321,14 +344,14 @@ class SenderManagement(QWidget):
         province = results[0]['province']
         self.province_combo.setCurrentText(province)
 
+        # The post code narrows the lists below what any shared model holds, so these models are
+        # one-offs owned by their combo and deleted by Qt when the combo switches back.
         districts = sorted(list(set(row['district'] for row in results)))
-        self.district_combo.clear()
-        self.district_combo.addItems(districts)
+        self.district_combo.setModel(PlaceListModel(districts, parent=self.district_combo))
         self.district_combo.setEnabled(True)
 
         sub_districts = sorted(list(set(row['sub_district'] for row in results)))
-        self.sub_district_combo.clear()
-        self.sub_district_combo.addItems(sub_districts)
+        self.sub_district_combo.setModel(PlaceListModel(sub_districts, parent=self.sub_district_combo))
         self.sub_district_combo.setEnabled(True)
 
         self.province_combo.blockSignals(False)
@@ -341,8 +364,14 @@ class SenderManagement(QWidget):
             self.sub_district_combo.setCurrentText(sub_districts[0])
 
     def load_senders_to_table(self):
+        self.versions.mark_seen()
+        self.senders_query.request()
+        self.populate_inventory_dropdown()
+        if self.search_input:
+            self.search_input.clear()
+
+    def _fill_sender_table(self, senders):
         self.sender_table.setRowCount(0)
-        senders = get_all_senders()
         for sender in senders:
             row_position = self.sender_table.rowCount()
             self.sender_table.insertRow(row_position)
@@ -355,10 +384,8 @@ class SenderManagement(QWidget):
             self.sender_table.setItem(row_position, 6, QTableWidgetItem(sender.get("province", "")))
             self.sender_table.setItem(row_position, 7, QTableWidgetItem(sender["post_code"]))
             self.sender_table.setItem(row_position, 8, QTableWidgetItem(sender["tel"]))
-        
-        self.populate_inventory_dropdown()
-        if self.search_input:
-            self.search_input.clear()
+        # The user may have started typing a search while the senders were loading.
+        self.filter_table()
 
     def on_sender_selection_changed(self):
         if self.sender_table.selectedItems():
@@ -405,32 +432,7 @@ class SenderManagement(QWidget):
         self.address_detail_input.line_edit.setText(address_detail)
         self.postcode_input.setText(post_code)
 
-        self.province_combo.blockSignals(True)
-        self.district_combo.blockSignals(True)
-        self.sub_district_combo.blockSignals(True)
-
-        self.initialize_address_dropdowns()
-        self.province_combo.setCurrentText(province)
-
-        self.district_combo.clear()
-        if province:
-            districts = get_districts(province)
-            if districts:
-                self.district_combo.addItems(districts)
-                self.district_combo.setEnabled(True)
-        self.district_combo.setCurrentText(district)
-
-        self.sub_district_combo.clear()
-        if province and district:
-            sub_districts = get_sub_districts(province, district)
-            if sub_districts:
-                self.sub_district_combo.addItems(sub_districts)
-                self.sub_district_combo.setEnabled(True)
-        self.sub_district_combo.setCurrentText(sub_district)
-
-        self.province_combo.blockSignals(False)
-        self.district_combo.blockSignals(False)
-        self.sub_district_combo.blockSignals(False)
+        self._select_address(province, district, sub_district)
 
         self.delete_button.setVisible(True)
 
@@ -445,7 +447,6 @@ class SenderManagement(QWidget):
             success, message = delete_sender(self.current_sender_id)
             if success:
                 QMessageBox.information(self, "Success", "Sender deleted successfully.")
-                self.load_senders_to_table()
                 self.show_add_form()
             else:
                 QMessageBox.warning(self, "Error", message)
@@ -496,7 +497,6 @@ class SenderManagement(QWidget):
 
         if success:
             QMessageBox.information(self, "Success", message)
-            self.load_senders_to_table()
             self.show_add_form()
         else:
             QMessageBox.warning(self, "Database Error", message)
@@ -10,7 +10,10 @@ from src.components.custom_spinbox import CustomSpinBox
 from src.components.flow_layout import FlowLayout
 from src.app.shipping_label.components.receiver_table_view import ReceiverTableView
 from src.app.shipping_label.components.label_preview import LabelPreview
-from src.db.receiver_queries import get_all_receiver_identities, get_addresses_for_receiver, get_receiver_identity_by_id
+from src.db.receiver_queries import get_receiver_with_addresses
+from src.db.async_dao import AsyncQuery
+from src.db.changes import VersionTracker
+from src.components.db_change_bus import get_change_bus
 from src.db.sender_queries import get_all_senders
 from src.db.config_queries import get_config
 from src.utils.widget_to_pdf import save_widget_as_pdf
@@ -22,6 +25,16 @@ class ShippingLabel(QWidget):
         super().__init__()
         
         self.senders_data = [] # Cache for sender data
+        # Receiver details load off the GUI thread; a quicker selection change supersedes a slower one.
+        self.receiver_query = AsyncQuery(get_receiver_with_addresses, self)
+        self.receiver_query.result.connect(self._show_receiver)
+        self.current_receiver_id = None
+
+        # Reload on show only when what the page displays changed while it was hidden.
+        self.receiver_versions = VersionTracker("receiver_identities")
+        self.sender_versions = VersionTracker("senders")
+        self.loaded_default_code = None
+        get_change_bus().table_changed.connect(self._on_table_changed)
         self.printer = QPrinter(QPrinter.HighResolution)
 
         main_layout = QHBoxLayout(self)
@@ -217,8 +230,7 @@ class ShippingLabel(QWidget):
         self.label_preview.update_copy_count(value)
 
     def load_receiver_data(self):
-        receivers = get_all_receiver_identities()
-        self.receiver_list_view.populate_table(receivers)
+        self.receiver_list_view.load_receivers()
 
     def load_sender_data(self):
         self.senders_data = get_all_senders()
@@ -228,6 +240,7 @@ class ShippingLabel(QWidget):
             self.sender_combo.addItem(sender['name'], userData=sender['id'])
         
         default_inventory_code = get_config("bills_process_inventory_code")
+        self.loaded_default_code = default_inventory_code
         if default_inventory_code:
             for i, sender in enumerate(self.senders_data):
                 if sender['inventory_code'] == default_inventory_code:
@@ -237,57 +250,11 @@ class ShippingLabel(QWidget):
         self.on_sender_selected(self.sender_combo.currentIndex()) # Manually trigger for initial load
 
     def on_receiver_selected(self, receiver_id):
+        self.current_receiver_id = receiver_id if receiver_id > 0 else None
         if receiver_id > 0:
-            # Get receiver identity data from DB
-            identity = get_receiver_identity_by_id(receiver_id)
-            if not identity:
-                self.receiver_name_input.clear()
-                self.receiver_tel_input.clear()
-                self.receiver_address_input.clear()
-                # Clear live view
-                self.label_preview.update_receiver_info("Receiver not found", "", "", "")
-                return
-
-            # Populate name and tel from the identity data
-            self.receiver_name_input.setText(identity.get("name", ""))
-            self.receiver_tel_input.setText(identity.get("tel", ""))
-
-            # Get address data from DB
-            addresses = get_addresses_for_receiver(receiver_id)
-            if not addresses:
-                self.receiver_address_input.clear()
-                # Clear live view address part
-                self.label_preview.update_receiver_info(
-                    identity.get("name", "N/A"),
-                    "No address found for this receiver.",
-                    identity.get('tel', 'N/A'),
-                    ""
-                )
-                return
-
-            # Find the default address or use the first one
-            default_address = next((addr for addr in addresses if addr.get('is_default')), addresses[0])
-            
-            full_address = (
-                f"{default_address.get('address_detail', '')} "
-                f"ต.{default_address.get('sub_district', '')} "
-                f"อ.{default_address.get('district', '')} "
-                f"จ.{default_address.get('province', '')} "
-                f"{default_address.get('post_code', '')}"
-            )
-            self.receiver_address_input.setText(full_address)
-
-            # Update live view
-            self.label_preview.update_receiver_info(
-                identity.get("name", "N/A"),
-                full_address,
-                identity.get('tel', 'N/A'),
-                default_address.get('delivery_by', 'N/A'),
-                default_address.get('note', 'N/A')
-            )
-            self.receiver_delivery_by_input.setText(default_address.get('delivery_by', 'N/A'))
-            self.receiver_note_input.setText(default_address.get('note', ''))
+            self.receiver_query.request(receiver_id)
         else:
+            self.receiver_query.cancel()
             self.receiver_name_input.clear()
             self.receiver_tel_input.clear()
             self.receiver_address_input.clear()
@@ -296,6 +263,48 @@ class ShippingLabel(QWidget):
             # Clear live view
             self.label_preview.clear_receiver_info()
 
+    def _show_receiver(self, receiver):
+        identity, addresses = receiver
+        if not identity:
+            self.receiver_name_input.clear()
+            self.receiver_tel_input.clear()
+            self.receiver_address_input.clear()
+            # Clear live view
+            self.label_preview.update_receiver_info("Receiver not found", "", "", "")
+            return
+
+        # Populate name and tel from the identity data
+        self.receiver_name_input.setText(identity.get("name", ""))
+        self.receiver_tel_input.setText(identity.get("tel", ""))
+
+        if not addresses:
+            self.receiver_address_input.clear()
+            # Clear live view address part
+            self.label_preview.update_receiver_info(
+                identity.get("name", "N/A"),
+                "No address found for this receiver.",
+                identity.get('tel', 'N/A'),
+                ""
+            )
+            return
+
+        # Find the default address or use the first one
+        default_address = next((addr for addr in addresses if addr.get('is_default')), addresses[0])
+        
+        full_address = default_address.get('formatted_address', '')
+        self.receiver_address_input.setText(full_address)
+
+        # Update live view
+        self.label_preview.update_receiver_info(
+            identity.get("name", "N/A"),
+            full_address,
+            identity.get('tel', 'N/A'),
+            default_address.get('delivery_by', 'N/A'),
+            default_address.get('note', 'N/A')
+        )
+        self.receiver_delivery_by_input.setText(default_address.get('delivery_by', 'N/A'))
+        self.receiver_note_input.setText(default_address.get('note', ''))
+
     def on_sender_selected(self, index):
         if index < 0 or not self.senders_data:
             self.label_preview.clear_sender_info()
@@ -304,13 +313,7 @@ class ShippingLabel(QWidget):
         sender = self.senders_data[index]
         self.sender_name_input.setText(sender.get('name', ''))
         self.sender_tel_input.setText(sender.get('tel', ''))
-        full_address = (
-            f"{sender.get('address_detail', '')} "
-            f"ต.{sender.get('sub_district', '')} "
-            f"อ.{sender.get('district', '')} "
-            f"จ.{sender.get('province', '')} "
-            f"{sender.get('post_code', '')}"
-        )
+        full_address = sender.get('formatted_address', '')
         self.sender_address_input.setText(full_address)
 
         # Update live view
@@ -322,7 +325,25 @@ class ShippingLabel(QWidget):
     def showEvent(self, event):
         super().showEvent(event)
         if self.isVisible():
-            self.load_receiver_data()
+            if self.receiver_versions.changed_since_last_check():
+                self.load_receiver_data()
+            if (self.sender_versions.changed_since_last_check()
+                    or get_config("bills_process_inventory_code") != self.loaded_default_code):
+                self.load_sender_data()
+
+    def _on_table_changed(self, table, operation, ids):
+        # While hidden, showEvent catches up through the version trackers instead.
+        if not self.isVisible():
+            return
+        if table == "receiver_identities":
+            self.receiver_list_view.apply_change(operation, ids)
+            self.receiver_versions.mark_seen()
+            if self.current_receiver_id and (ids is None or self.current_receiver_id in ids):
+                self.receiver_query.request(self.current_receiver_id)
+        elif table == "senders" or (
+            # Of the settings, the sender list only depends on the default inventory code.
+            table == "app_config" and (ids is None or "bills_process_inventory_code" in ids)
+        ):
             self.load_sender_data()
-            self.label_preview.refresh_assets()
+            self.sender_versions.mark_seen()
 
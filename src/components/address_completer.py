@@ -0,0 +1,77 @@
+from PySide6.QtCore import QAbstractListModel, QModelIndex, Qt, Signal
+from PySide6.QtWidgets import QCompleter
+
+from src.db.address_queries import complete_address
+
+
+class AddressCompletionModel(QAbstractListModel):
+    """
+    Candidate addresses for the text typed so far, answered from the in-memory gazetteer's prefix
+    index. Each row displays as "zipcode ต.sub-district อ.district จ.province"; LocationRole holds
+    the address record as a dict.
+    """
+    LocationRole = Qt.UserRole + 1
+
+    def __init__(self, limit=50, parent=None):
+        super().__init__(parent)
+        self.limit = limit
+        self._locations = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._locations)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._locations):
+            return None
+        location = self._locations[index.row()]
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return (
+                f"{location['zipcode']} ต.{location['sub_district']} "
+                f"อ.{location['district']} จ.{location['province']}"
+            )
+        if role == self.LocationRole:
+            return location
+        return None
+
+    def set_prefix(self, prefix):
+        self.beginResetModel()
+        self._locations = complete_address(prefix, self.limit)
+        self.endResetModel()
+        return len(self._locations)
+
+
+class AddressCompleter(QCompleter):
+    """
+    Live post-code / sub-district / district suggestions for a QLineEdit.
+
+    Typing "101" or "บางร" lists matching locations; picking one emits location_chosen(dict) with
+    province, district, sub_district and zipcode. The model is refilled on every edit, so the popup
+    shows it unfiltered.
+    """
+    location_chosen = Signal(dict)
+
+    def __init__(self, line_edit, parent=None):
+        super().__init__(parent or line_edit)
+        self.line_edit = line_edit
+        self.completion_model = AddressCompletionModel(parent=self)
+        self.setModel(self.completion_model)
+        self.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.setCaseSensitivity(Qt.CaseInsensitive)
+        self.setMaxVisibleItems(12)
+        # Attached with setWidget rather than QLineEdit.setCompleter, so the line edit keeps what the
+        # user typed until a location is picked and the form decides what to show.
+        self.setWidget(line_edit)
+        line_edit.textEdited.connect(self._on_text_edited)
+        self.activated[QModelIndex].connect(self._on_activated)
+
+    def _on_text_edited(self, text):
+        if self.completion_model.set_prefix(text):
+            self.complete()
+        else:
+            self.popup().hide()
+
+    def _on_activated(self, index):
+        location = index.data(AddressCompletionModel.LocationRole)
+        self.popup().hide()
+        if location:
+            self.location_chosen.emit(location)
@@ -0,0 +1,112 @@
+from PySide6.QtCore import QAbstractListModel, QModelIndex, QObject, Qt
+
+from src.db import changes
+from src.db.address_queries import get_provinces, get_districts, get_sub_districts
+
+PROVINCE_PLACEHOLDER = "Select Province..."
+DISTRICT_PLACEHOLDER = "Select District..."
+SUB_DISTRICT_PLACEHOLDER = "Select Sub-district..."
+
+
+class PlaceListModel(QAbstractListModel):
+    """A fixed list of place names, optionally headed by a "Select ..." placeholder row. Read-only."""
+
+    def __init__(self, names, placeholder=None, parent=None):
+        super().__init__(parent)
+        self._items = ((placeholder,) if placeholder else ()) + tuple(names)
+        self.has_placeholder = bool(placeholder)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._items)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role in (Qt.DisplayRole, Qt.EditRole) and index.isValid() and index.row() < len(self._items):
+            return self._items[index.row()]
+        return None
+
+    def place_count(self):
+        """Number of real places, not counting the placeholder."""
+        return len(self._items) - self.has_placeholder
+
+
+# Every form's province, district and sub-district combos share one model per parent key, so switching
+# between records swaps a model pointer instead of recreating combo items. The models belong to
+# _owner, so neither a combo switching away nor clearing the cache deletes one that is still shown.
+_models = {}
+_owner = QObject()
+
+
+def _shared(key, load_names, placeholder):
+    model = _models.get(key)
+    if model is None:
+        model = _models[key] = PlaceListModel(load_names(), placeholder, _owner)
+    return model
+
+
+def _is_selected(name, placeholder):
+    return bool(name) and name != placeholder
+
+
+def province_model():
+    return _shared(("province",), get_provinces, PROVINCE_PLACEHOLDER)
+
+
+def district_model(province):
+    """Districts of `province`; just the placeholder when no province is selected."""
+    if not _is_selected(province, PROVINCE_PLACEHOLDER):
+        return _shared(("district", None), tuple, DISTRICT_PLACEHOLDER)
+    return _shared(("district", province), lambda: get_districts(province), DISTRICT_PLACEHOLDER)
+
+
+def sub_district_model(province, district):
+    """Sub-districts of `district`; just the placeholder when no district is selected."""
+    if not (_is_selected(province, PROVINCE_PLACEHOLDER) and _is_selected(district, DISTRICT_PLACEHOLDER)):
+        return _shared(("sub_district", None), tuple, SUB_DISTRICT_PLACEHOLDER)
+    return _shared(
+        ("sub_district", province, district), lambda: get_sub_districts(province, district), SUB_DISTRICT_PLACEHOLDER
+    )
+
+
+class AddressCombosMixin:
+    """
+    Address handling shared by forms with province_combo, district_combo and sub_district_combo
+    cascading through the shared models, and a postcode_input.
+    """
+
+    def _select_address(self, province, district, sub_district):
+        # Shows a stored address using the shared models; a combo already on the right model keeps it as is.
+        for combo in (self.province_combo, self.district_combo, self.sub_district_combo):
+            combo.blockSignals(True)
+        self.province_combo.setModel(province_model())
+        self.province_combo.setCurrentText(province)
+        districts = district_model(province)
+        self.district_combo.setModel(districts)
+        self.district_combo.setCurrentText(district)
+        self.district_combo.setEnabled(districts.place_count() > 0)
+        sub_districts = sub_district_model(province, district)
+        self.sub_district_combo.setModel(sub_districts)
+        self.sub_district_combo.setCurrentText(sub_district)
+        self.sub_district_combo.setEnabled(sub_districts.place_count() > 0)
+        for combo in (self.province_combo, self.district_combo, self.sub_district_combo):
+            combo.blockSignals(False)
+
+    def on_location_chosen(self, location):
+        # Each setCurrentText runs the cascade for the next combo; the chosen zipcode is set last because
+        # a few sub-districts span more than one zipcode.
+        self.province_combo.setCurrentText(location['province'])
+        self.district_combo.setCurrentText(location['district'])
+        self.sub_district_combo.setCurrentText(location['sub_district'])
+        self.postcode_input.setText(location['zipcode'])
+
+
+def clear_address_models():
+    """Forgets the shared models; combos keep the ones they show until they next switch."""
+    _models.clear()
+
+
+def _on_table_changed(table, operation, ids):
+    if table == "thai_addresses":
+        clear_address_models()
+
+
+changes.add_listener(_on_table_changed)
@@ -0,0 +1,26 @@
+from PySide6.QtCore import QObject, Signal
+
+from src.db import changes
+
+
+class DbChangeBus(QObject):
+    """
+    Application-wide Qt signal for committed database changes (see src/db/changes.py).
+
+    table_changed(table, operation, ids) carries the table name, "insert"/"update"/"delete" and a
+    frozenset of affected row ids, or None when every row should be treated as changed. Slots on
+    widgets always run on the GUI thread, even for writes made from QThreadPool workers.
+    """
+    table_changed = Signal(str, str, object)
+
+
+_bus = None
+
+
+def get_change_bus():
+    """Returns the shared bus, creating it (on the GUI thread) the first time it is needed."""
+    global _bus
+    if _bus is None:
+        _bus = DbChangeBus()
+        changes.add_listener(_bus.table_changed.emit)
+    return _bus
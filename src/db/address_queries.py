@@ -1,46 +1,45 @@
-import sqlite3
+from src.db.connection import get_connection, gazetteer_table
+from src.db.gazetteer import get_gazetteer
 
-DATABASE_NAME = "app_database.db"
+# The cascade lookups answer from the in-memory gazetteer (src/db/gazetteer.py), loaded from
+# thai_addresses on first use.
 
 def get_provinces():
     """Retrieves a unique list of all provinces."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT DISTINCT province FROM thai_addresses ORDER BY province")
-        provinces = cursor.fetchall()
-        return [row[0] for row in provinces]
+    return get_gazetteer().get_provinces()
 
 def get_districts(province):
     """Retrieves districts for a given province."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT DISTINCT district FROM thai_addresses WHERE province = ? ORDER BY district", (province,))
-        districts = cursor.fetchall()
-        return [row[0] for row in districts]
+    return get_gazetteer().get_districts(province)
 
 def get_sub_districts(province, district):
     """Retrieves sub-districts for a given province and district."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT DISTINCT sub_district FROM thai_addresses WHERE province = ? AND district = ? ORDER BY sub_district", (province, district))
-        sub_districts = cursor.fetchall()
-        return [row[0] for row in sub_districts]
+    return get_gazetteer().get_sub_districts(province, district)
 
 def get_zipcode(province, district, sub_district):
     """Retrieves the zipcode for a given address combination."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT zipcode FROM thai_addresses WHERE province = ? AND district = ? AND sub_district = ? LIMIT 1", 
-                       (province, district, sub_district))
-        result = cursor.fetchone()
-        return result[0] if result else ""
+    return get_gazetteer().get_zipcode(province, district, sub_district)
 
 def get_addresses_by_zipcode(zipcode):
     """Retrieves all address records for a given zipcode."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute("SELECT province, district, sub_district FROM thai_addresses WHERE zipcode = ?", (zipcode,))
-        addresses = cursor.fetchall()
-        return [dict(row) for row in addresses]
+    return get_gazetteer().get_addresses_by_zipcode(zipcode)
 
+def complete_address(prefix, limit=50):
+    """Retrieves address records whose zipcode, sub-district or district starts with `prefix`."""
+    return [
+        {"province": province, "district": district, "sub_district": sub_district, "zipcode": zipcode}
+        for province, district, sub_district, zipcode in get_gazetteer().complete(prefix, limit)
+    ]
+
+def iter_thai_addresses(conn=None):
+    """
+    Yields every gazetteer row in id order, straight from the cursor, with the columns import_tambons.py writes.
+    Reads the table lookups use, or thai_addresses of `conn` when it has no gazetteer attached.
+    """
+    conn = conn or get_connection()
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT id, sub_district, district, province, zipcode, sub_district_code, district_code, province_code
+        FROM {gazetteer_table(conn)} ORDER BY id
+    """)
+    yield from cursor
@@ -0,0 +1,108 @@
+"""
+Runs src/db query functions on the global QThreadPool so the GUI thread never waits on the database.
+
+Two ways to call a query off the GUI thread:
+
+* submit(), for one-off calls such as warming a cache at startup. It returns a
+  concurrent.futures.Future for the result:
+
+      submit(preload_gazetteer)
+
+* AsyncQuery, for calls driven by the UI (selection changes, page refreshes). It delivers the result
+  through a Qt signal on the GUI thread and coalesces requests: while a call is running only the most
+  recent new request is kept, and a result that has been overtaken by a newer request is dropped.
+
+      self.addresses_query = AsyncQuery(get_addresses_for_receiver, self)
+      self.addresses_query.result.connect(self.show_addresses)
+      self.addresses_query.request(receiver_id)
+
+Each pool thread gets its own connection from src.db.connection, so query functions need no changes.
+"""
+import sys
+import traceback
+from concurrent.futures import Future
+
+from PySide6.QtCore import QObject, QThreadPool, Signal, Slot
+
+from src.components.async_worker import Worker
+
+
+def submit(fn, *args, **kwargs):
+    """Runs fn(*args, **kwargs) on the global thread pool and returns a Future for its result."""
+    future = Future()
+
+    def task(progress_callback):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    QThreadPool.globalInstance().start(Worker(task))
+    return future
+
+
+def _run_ticket(ticket, fn, args, kwargs, progress_callback):
+    # Errors travel back with the ticket so stale failures can be dropped like stale results.
+    try:
+        return ticket, True, fn(*args, **kwargs)
+    except Exception:
+        exctype, value = sys.exc_info()[:2]
+        return ticket, False, (exctype, value, traceback.format_exc())
+
+
+class AsyncQuery(QObject):
+    """
+    A query function bound to a QObject, run on the thread pool with only the latest request answered.
+
+    result is emitted on the GUI thread with the function's return value; error with the same
+    (exctype, value, traceback) tuple as WorkerSignals.error. Stale results are never emitted.
+    """
+    result = Signal(object)
+    error = Signal(tuple)
+
+    def __init__(self, fn, parent=None):
+        super().__init__(parent)
+        self._fn = fn
+        self._ticket = 0
+        self._running = False
+        self._pending = None
+
+    def request(self, *args, **kwargs):
+        """Asks for fn(*args, **kwargs). Supersedes any request whose result has not been delivered yet."""
+        self._ticket += 1
+        self._pending = (self._ticket, args, kwargs)
+        if not self._running:
+            self._start_pending()
+        return self._ticket
+
+    def cancel(self):
+        """Drops every outstanding request; nothing is emitted for them."""
+        self._ticket += 1
+        self._pending = None
+
+    def is_busy(self):
+        return self._running or self._pending is not None
+
+    def _start_pending(self):
+        ticket, args, kwargs = self._pending
+        self._pending = None
+        self._running = True
+        worker = Worker(_run_ticket, ticket, self._fn, args, kwargs)
+        # self lives on the GUI thread, so this connection is queued and _on_finished runs there.
+        worker.signals.result.connect(self._on_finished)
+        QThreadPool.globalInstance().start(worker)
+
+    @Slot(object)
+    def _on_finished(self, outcome):
+        ticket, ok, value = outcome
+        self._running = False
+        if self._pending is not None:
+            self._start_pending()
+        if ticket != self._ticket:
+            return
+        if ok:
+            self.result.emit(value)
+        else:
+            self.error.emit(value)
@@ -0,0 +1,77 @@
+"""
+In-process change tracking for writes made through src/db.
+
+Write functions call notify_changed() once their transaction has committed. Every table has a
+version counter that only moves forward, so a page can remember the versions it last loaded
+(VersionTracker) and skip reloading when nothing it shows has changed. Listeners are told which
+table changed, how, and which row ids were touched; src/components/db_change_bus.py turns that
+into a Qt signal for the pages.
+
+Writes made by other programs (sqlite3 shell, another copy of the app) are not seen here.
+"""
+import threading
+
+INSERT = "insert"
+UPDATE = "update"
+DELETE = "delete"
+
+_versions = {}
+_listeners = []
+_lock = threading.Lock()
+
+
+def notify_changed(table, operation, ids=None):
+    """
+    Records a committed change to `table`. `operation` is INSERT, UPDATE or DELETE; `ids` are the
+    affected row ids, or None when they are unknown or too many to list (listeners then reload).
+    Listeners run on the calling thread.
+    """
+    with _lock:
+        _versions[table] = _versions.get(table, 0) + 1
+        listeners = list(_listeners)
+    ids = frozenset(ids) if ids is not None else None
+    for listener in listeners:
+        try:
+            listener(table, operation, ids)
+        except Exception as e:
+            print(f"Change listener failed for {table}: {e}")
+
+
+def get_version(table):
+    with _lock:
+        return _versions.get(table, 0)
+
+
+def add_listener(listener):
+    """Registers listener(table, operation, ids) to be called after every change."""
+    with _lock:
+        _listeners.append(listener)
+
+
+def remove_listener(listener):
+    with _lock:
+        if listener in _listeners:
+            _listeners.remove(listener)
+
+
+class VersionTracker:
+    """Remembers the versions of a set of tables as of the last load."""
+
+    def __init__(self, *tables):
+        self.tables = tables
+        self._seen = None
+
+    def _current(self):
+        with _lock:
+            return tuple(_versions.get(table, 0) for table in self.tables)
+
+    def changed_since_last_check(self):
+        """True on the first call and whenever one of the tables changed since the previous call."""
+        current = self._current()
+        changed = current != self._seen
+        self._seen = current
+        return changed
+
+    def mark_seen(self):
+        """Treats every change so far as loaded, e.g. after applying it row by row."""
+        self._seen = self._current()
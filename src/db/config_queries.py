@@ -1,34 +1,60 @@
 import sqlite3
+import threading
 
-DATABASE_NAME = "app_database.db"
+from src.db import changes, connection
+from src.db.connection import get_connection
 
-def initialize_config_db():
-    """Initializes the database and creates the app_config table if it doesn't exist."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS app_config (
-                key TEXT PRIMARY KEY,
-                value TEXT
-            )
-        """)
-        conn.commit()
+# app_config is a handful of rows read on nearly every page show and label print, so it is loaded
+# once into memory and kept current by save_config(). The cache belongs to one database file and is
+# reloaded when connection.set_database_path() points somewhere else. Widgets that follow a setting
+# listen for "app_config" changes on the DbChangeBus, which reports the saved key as the row id and
+# delivers on the GUI thread whichever thread saved.
+_cache = None
+_cache_path = None
+_cache_lock = threading.Lock()
+
+def _load_config():
+    with get_connection() as conn:
+        rows = conn.execute("SELECT key, value FROM app_config").fetchall()
+    return {row[0]: row[1] for row in rows}
+
+def _get_cache():
+    global _cache, _cache_path
+    with _cache_lock:
+        if _cache is not None and _cache_path == connection.DATABASE_NAME:
+            return _cache
+    try:
+        values = _load_config()
+    except sqlite3.OperationalError:
+        # app_config does not exist until migrations have run; don't cache the empty answer.
+        return {}
+    with _cache_lock:
+        _cache = values
+        _cache_path = connection.DATABASE_NAME
+        return _cache
+
+def invalidate_config_cache():
+    """Drops the cached values so the next read goes back to the database (e.g. after an external edit)."""
+    global _cache
+    with _cache_lock:
+        _cache = None
 
 def save_config(key, value):
     """Saves a key-value pair to the config table. Replaces the value if the key already exists."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
         try:
             cursor.execute("INSERT OR REPLACE INTO app_config (key, value) VALUES (?, ?)", (key, value))
             conn.commit()
-            return True, "Configuration saved."
         except sqlite3.Error as e:
             return False, f"Database error: {e}"
 
+    with _cache_lock:
+        if _cache is not None and _cache_path == connection.DATABASE_NAME:
+            _cache[key] = value
+    changes.notify_changed("app_config", changes.UPDATE, [key])
+    return True, "Configuration saved."
+
 def get_config(key, default=None):
     """Retrieves a value from the config table for a given key."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT value FROM app_config WHERE key = ?", (key,))
-        result = cursor.fetchone()
-        return result[0] if result else default
+    return _get_cache().get(key, default)
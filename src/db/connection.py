@@ -0,0 +1,236 @@
+import os
+import pathlib
+import sqlite3
+import threading
+
+from src.db import instrumentation
+
+DATABASE_NAME = "app_database.db"
+# The read-only Thai address gazetteer built by `python import_tambons.py`, shipped in the application
+# directory and looked up there whatever the working directory. When the file exists it is attached to
+# every connection as GAZETTEER_SCHEMA, immutable and memory-mapped, and address lookups read it instead
+# of the thai_addresses table in DATABASE_NAME, which is left as it is.
+_APP_DIRECTORY = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+GAZETTEER_DATABASE_NAME = os.path.join(_APP_DIRECTORY, "gazetteer.db")
+GAZETTEER_SCHEMA = "gazetteer"
+GAZETTEER_MMAP_SIZE = 64 * 1024 * 1024
+
+# PRAGMA profiles applied to every connection as it opens. "sqlite_default" mirrors a
+# bare sqlite3.connect() and is kept for comparison in `db_tools.py bench-pragmas`.
+PRAGMA_PROFILES = {
+    "sqlite_default": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "mmap_size": 0,
+        "cache_size": -2000,
+        "temp_store": "DEFAULT",
+        "foreign_keys": "OFF",
+    },
+    "balanced": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 64 * 1024 * 1024,
+        "cache_size": -16000,
+        "temp_store": "MEMORY",
+        "foreign_keys": "ON",
+    },
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "mmap_size": 64 * 1024 * 1024,
+        "cache_size": -16000,
+        "temp_store": "MEMORY",
+        "foreign_keys": "ON",
+    },
+}
+DEFAULT_PRAGMA_PROFILE = "balanced"
+
+# Allowed values per PRAGMA. PRAGMA values cannot be bound as parameters, so anything
+# coming from .env or app_config is checked against this table before it reaches SQL.
+_PRAGMA_CHOICES = {
+    "journal_mode": ("DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"),
+    "synchronous": ("OFF", "NORMAL", "FULL", "EXTRA"),
+    "temp_store": ("DEFAULT", "FILE", "MEMORY"),
+    "foreign_keys": ("ON", "OFF"),
+    "mmap_size": int,
+    "cache_size": int,
+}
+
+# Each thread (the GUI thread and every QThreadPool worker) keeps exactly one
+# long-lived connection. sqlite3 connections must not be shared across threads.
+_local = threading.local()
+# Bumped whenever the database path, PRAGMA profile or instrumentation changes so every thread
+# reopens its connection on next use.
+_generation = 0
+_profile_override = None
+
+
+def set_database_path(path):
+    """
+    Points the connection manager at a different database file.
+    Other threads reopen their connection against the new file on their next query.
+    """
+    global DATABASE_NAME, _generation
+    close_connection()
+    DATABASE_NAME = path
+    _generation += 1
+
+
+def set_gazetteer_path(path):
+    """
+    Points connections at a different read-only gazetteer file, or at none with None, in which case
+    address lookups read thai_addresses from the main database.
+    """
+    global GAZETTEER_DATABASE_NAME, _generation
+    close_connection()
+    GAZETTEER_DATABASE_NAME = path
+    _generation += 1
+
+
+def invalidate_connections():
+    """Makes every thread reopen its connection on its next query (used when connection settings change)."""
+    global _generation
+    close_connection()
+    _generation += 1
+
+
+def set_pragma_profile(profile=None, **overrides):
+    """
+    Forces a PRAGMA profile (and optional per-PRAGMA overrides) for connections opened from now on,
+    ignoring .env and app_config. Call with no arguments to go back to the configured profile.
+    """
+    global _profile_override, _generation
+    if profile is not None and profile not in PRAGMA_PROFILES:
+        raise ValueError(f"Unknown PRAGMA profile '{profile}'.")
+    close_connection()
+    _profile_override = (profile, overrides) if profile is not None or overrides else None
+    _generation += 1
+
+
+def _normalize_pragma(name, value):
+    choices = _PRAGMA_CHOICES[name]
+    if choices is int:
+        return int(value)
+    value = str(value).strip().upper()
+    if value not in choices:
+        raise ValueError(f"Invalid value '{value}' for PRAGMA {name}.")
+    return value
+
+
+def _read_app_config_pragmas(conn):
+    """Reads `db_pragma_profile` and `db_<pragma>` keys from app_config, if the table exists yet."""
+    keys = ["db_pragma_profile"] + [f"db_{name}" for name in _PRAGMA_CHOICES]
+    placeholders = ", ".join("?" for _ in keys)
+    try:
+        rows = conn.execute(f"SELECT key, value FROM app_config WHERE key IN ({placeholders})", keys).fetchall()
+    except sqlite3.OperationalError:
+        return {}
+    return {row[0]: row[1] for row in rows if row[1] not in (None, "")}
+
+
+def resolve_pragmas(conn=None):
+    """
+    Works out the PRAGMA values to apply. Precedence, lowest first:
+    the profile's values, then `db_<pragma>` keys in app_config, then DB_<PRAGMA> variables in .env.
+    The profile itself is picked by DB_PRAGMA_PROFILE in .env, then `db_pragma_profile` in app_config.
+    """
+    if _profile_override is not None:
+        profile, overrides = _profile_override
+        pragmas = dict(PRAGMA_PROFILES[profile or DEFAULT_PRAGMA_PROFILE])
+        pragmas.update({name: _normalize_pragma(name, value) for name, value in overrides.items()})
+        return pragmas
+
+    stored = _read_app_config_pragmas(conn) if conn is not None else {}
+    profile = os.getenv("DB_PRAGMA_PROFILE") or stored.get("db_pragma_profile") or DEFAULT_PRAGMA_PROFILE
+    if profile not in PRAGMA_PROFILES:
+        print(f"Unknown PRAGMA profile '{profile}', falling back to '{DEFAULT_PRAGMA_PROFILE}'.")
+        profile = DEFAULT_PRAGMA_PROFILE
+
+    pragmas = dict(PRAGMA_PROFILES[profile])
+    for name in _PRAGMA_CHOICES:
+        for value in (stored.get(f"db_{name}"), os.getenv(f"DB_{name.upper()}")):
+            if value in (None, ""):
+                continue
+            try:
+                pragmas[name] = _normalize_pragma(name, value)
+            except ValueError as e:
+                print(f"Ignoring PRAGMA setting: {e}")
+    return pragmas
+
+
+def apply_pragmas(conn, pragmas):
+    """Applies resolved PRAGMA values to an open connection."""
+    for name, value in pragmas.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+
+
+def get_active_pragmas(conn=None):
+    """Reads back the PRAGMA values in effect on a connection (the calling thread's by default)."""
+    conn = conn or get_connection()
+    return {name: conn.execute(f"PRAGMA {name}").fetchone()[0] for name in _PRAGMA_CHOICES}
+
+
+def _attach_gazetteer(conn):
+    """
+    Attaches GAZETTEER_DATABASE_NAME read-only. immutable=1 tells SQLite the file never changes, so
+    reading it takes no locks and checks no journal; replace the file only while the app is closed.
+    """
+    path = GAZETTEER_DATABASE_NAME
+    if not path or not os.path.exists(path):
+        return
+    uri = pathlib.Path(path).resolve().as_uri() + "?mode=ro&immutable=1"
+    try:
+        conn.execute(f"ATTACH DATABASE ? AS {GAZETTEER_SCHEMA}", (uri,))
+        conn.execute(f"PRAGMA {GAZETTEER_SCHEMA}.mmap_size = {GAZETTEER_MMAP_SIZE}")
+    except sqlite3.Error as e:
+        print(f"Could not attach the gazetteer database {path}: {e}")
+
+
+def gazetteer_table(conn):
+    """Names the thai_addresses table address lookups read: the attached gazetteer's when there is one."""
+    row = conn.execute(
+        "SELECT 1 FROM pragma_database_list WHERE name = ?", (GAZETTEER_SCHEMA,)
+    ).fetchone()
+    if row and conn.execute(
+        f"SELECT 1 FROM {GAZETTEER_SCHEMA}.sqlite_master WHERE type = 'table' AND name = 'thai_addresses'"
+    ).fetchone():
+        return f"{GAZETTEER_SCHEMA}.thai_addresses"
+    return "thai_addresses"
+
+
+def open_connection(path=None):
+    """Opens a new, fully configured connection. Prefer get_connection() for normal queries."""
+    factory = instrumentation.InstrumentedConnection if instrumentation.is_enabled() else sqlite3.Connection
+    # uri=True only so the gazetteer can be attached by URI; plain file names open as before.
+    conn = sqlite3.connect(path or DATABASE_NAME, factory=factory, uri=True)
+    conn.row_factory = sqlite3.Row
+    apply_pragmas(conn, resolve_pragmas(conn))
+    _attach_gazetteer(conn)
+    return conn
+
+
+def get_connection():
+    """
+    Returns the connection owned by the calling thread, opening it on first use.
+
+    Query functions use it as `with get_connection() as conn:` which commits on success
+    and rolls back on error, exactly like a fresh `sqlite3.connect()` did, but without
+    paying for a new connection on every call.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "generation", None) != _generation:
+        if conn is not None:
+            conn.close()
+        conn = open_connection()
+        _local.conn = conn
+        _local.generation = _generation
+    return conn
+
+
+def close_connection():
+    """Closes the calling thread's connection, if it has one."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+        _local.generation = None
@@ -0,0 +1,163 @@
+"""
+In-memory copy of the thai_addresses gazetteer for the province -> district -> sub-district -> zipcode
+dropdowns.
+
+The table is read once, in index order, into interned strings and pre-sorted tuples of children, plus
+a zipcode -> locations map, so every cascade step is a dict lookup instead of a SELECT DISTINCT.
+The rows come from the read-only gazetteer file attached by src/db/connection.py when there is one,
+otherwise from thai_addresses in the main database. The copy belongs to those files: it is rebuilt
+when connection.set_database_path() or connection.set_gazetteer_path() points elsewhere or when a write through
+src/db reports a change to thai_addresses.
+"""
+import sys
+import threading
+import time
+from bisect import bisect_left
+
+from src.db import changes, connection
+from src.db.connection import get_connection
+
+
+class Gazetteer:
+    """Sorted lookups over (province, district, sub_district, zipcode) rows."""
+
+    def __init__(self, rows):
+        """`rows` is a list sorted by province, district, sub_district, zipcode (the index order)."""
+        intern = sys.intern
+        districts = {}
+        sub_districts = {}
+        zipcodes = {}
+        by_zipcode = {}
+        # Rows come grouped by province, then district, then sub-district, so each name is interned
+        # and its child list started once per group rather than looked up per row.
+        province = district = sub_district = None
+        for row_province, row_district, row_sub_district, zipcode in rows:
+            if row_province != province:
+                province = intern(row_province)
+                province_districts = districts[province] = []
+                district = None
+            if row_district != district:
+                district = intern(row_district)
+                province_districts.append(district)
+                district_subs = sub_districts[(province, district)] = []
+                sub_district = None
+            if row_sub_district != sub_district:
+                sub_district = intern(row_sub_district)
+                district_subs.append(sub_district)
+                location = (province, district, sub_district)
+                # Zipcodes ascend within a sub-district; the first one is what LIMIT 1 over the index returned.
+                zipcodes[location] = zipcode
+            locations = by_zipcode.get(zipcode)
+            if locations is None:
+                locations = by_zipcode[intern(zipcode)] = []
+            locations.append(location)
+
+        self.provinces = tuple(districts)
+        self.districts = {key: tuple(value) for key, value in districts.items()}
+        self.sub_districts = {key: tuple(value) for key, value in sub_districts.items()}
+        self.zipcodes = zipcodes
+        self.by_zipcode = {key: tuple(value) for key, value in by_zipcode.items()}
+        self.row_count = len(rows)
+        self._prefix_keys = None
+        self._prefix_locations = None
+
+    def get_provinces(self):
+        return list(self.provinces)
+
+    def get_districts(self, province):
+        return list(self.districts.get(province, ()))
+
+    def get_sub_districts(self, province, district):
+        return list(self.sub_districts.get((province, district), ()))
+
+    def get_zipcode(self, province, district, sub_district):
+        return self.zipcodes.get((province, district, sub_district), "")
+
+    def get_addresses_by_zipcode(self, zipcode):
+        return [
+            {"province": province, "district": district, "sub_district": sub_district}
+            for province, district, sub_district in self.by_zipcode.get(zipcode, ())
+        ]
+
+    def _build_prefix_index(self):
+        # One sorted array of search keys (zipcode, sub-district, district) and a parallel array of the
+        # (province, district, sub_district, zipcode) each key leads to; a prefix is a bisect plus a walk.
+        entries = set()
+        for zipcode, locations in self.by_zipcode.items():
+            for province, district, sub_district in locations:
+                location = (province, district, sub_district, zipcode)
+                entries.add((zipcode, location))
+                entries.add((sub_district, location))
+                entries.add((district, location))
+        entries = sorted(entries)
+        self._prefix_locations = [location for _, location in entries]
+        self._prefix_keys = [key for key, _ in entries]
+
+    def complete(self, prefix, limit=50):
+        """
+        Returns up to `limit` (province, district, sub_district, zipcode) tuples whose zipcode,
+        sub-district or district starts with `prefix`, in key order without duplicates.
+        """
+        prefix = prefix.strip()
+        if not prefix:
+            return []
+        if self._prefix_keys is None:
+            self._build_prefix_index()
+        keys, locations = self._prefix_keys, self._prefix_locations
+        results = {}
+        index = bisect_left(keys, prefix)
+        while index < len(keys) and len(results) < limit and keys[index].startswith(prefix):
+            results.setdefault(locations[index], None)
+            index += 1
+        return list(results)
+
+
+_gazetteer = None
+_gazetteer_source = None
+_lock = threading.Lock()
+
+
+def load_gazetteer():
+    """Reads thai_addresses and builds a fresh Gazetteer from one pass over its covering index."""
+    with get_connection() as conn:
+        rows = conn.execute(f"""
+            SELECT province, district, sub_district, zipcode FROM {connection.gazetteer_table(conn)}
+            ORDER BY province, district, sub_district, zipcode
+        """).fetchall()
+    return Gazetteer(rows)
+
+
+def get_gazetteer():
+    """Returns the shared Gazetteer for the current database, loading it on first use."""
+    global _gazetteer, _gazetteer_source
+    with _lock:
+        source = (connection.DATABASE_NAME, connection.GAZETTEER_DATABASE_NAME)
+        if _gazetteer is not None and _gazetteer_source == source:
+            return _gazetteer
+        start = time.perf_counter()
+        _gazetteer = load_gazetteer()
+        _gazetteer_source = source
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if elapsed_ms > 20:
+            print(f"Loaded {_gazetteer.row_count} gazetteer rows in {elapsed_ms:.1f} ms.")
+        return _gazetteer
+
+
+def preload_gazetteer():
+    """Loads the gazetteer and its prefix index ahead of first use, e.g. on a pool thread at startup."""
+    get_gazetteer().complete("0", limit=1)
+
+
+def invalidate_gazetteer():
+    """Drops the in-memory copy; the next lookup reloads it from thai_addresses."""
+    global _gazetteer
+    with _lock:
+        _gazetteer = None
+
+
+def _on_table_changed(table, operation, ids):
+    if table == "thai_addresses":
+        invalidate_gazetteer()
+
+
+changes.add_listener(_on_table_changed)
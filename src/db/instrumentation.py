@@ -0,0 +1,234 @@
+"""
+Opt-in timing for every statement executed through src/db.
+
+While disabled, connections are plain sqlite3 connections and nothing here runs.
+While enabled, connections are opened with InstrumentedConnection, which times every
+execute, whether on a cursor or on the connection, and every fetch or iteration over the
+results, keeps per-function counters and writes statements slower than the threshold to a
+rolling slow-query log.
+
+Enable it with DB_QUERY_STATS=1 in .env (DB_SLOW_QUERY_MS and DB_SLOW_QUERY_LOG tune it)
+or by calling enable_instrumentation().
+"""
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from logging.handlers import RotatingFileHandler
+
+DEFAULT_SLOW_QUERY_MS = 100.0
+DEFAULT_SLOW_QUERY_LOG = "slow_queries.log"
+
+_enabled = False
+_slow_query_seconds = DEFAULT_SLOW_QUERY_MS / 1000
+_stats = {}
+_stats_lock = threading.Lock()
+
+slow_query_logger = logging.getLogger("src.db.slow_queries")
+slow_query_logger.propagate = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def enable_instrumentation(slow_query_ms=DEFAULT_SLOW_QUERY_MS, log_path=DEFAULT_SLOW_QUERY_LOG):
+    """Turns instrumentation on. Every thread reopens its connection on its next query."""
+    global _enabled, _slow_query_seconds
+    from src.db import connection
+
+    _slow_query_seconds = slow_query_ms / 1000
+    for handler in list(slow_query_logger.handlers):
+        slow_query_logger.removeHandler(handler)
+        handler.close()
+    if log_path:
+        handler = RotatingFileHandler(log_path, maxBytes=1024 * 1024, backupCount=3, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        slow_query_logger.addHandler(handler)
+        slow_query_logger.setLevel(logging.INFO)
+    _enabled = True
+    connection.invalidate_connections()
+
+
+def disable_instrumentation():
+    """Turns instrumentation off; connections go back to plain sqlite3 connections."""
+    global _enabled
+    from src.db import connection
+
+    _enabled = False
+    connection.invalidate_connections()
+
+
+def configure_from_env():
+    """Enables instrumentation when DB_QUERY_STATS is set to a truthy value."""
+    if os.getenv("DB_QUERY_STATS", "").strip().lower() not in ("1", "true", "yes", "on"):
+        return
+    enable_instrumentation(
+        slow_query_ms=float(os.getenv("DB_SLOW_QUERY_MS", DEFAULT_SLOW_QUERY_MS)),
+        log_path=os.getenv("DB_SLOW_QUERY_LOG", DEFAULT_SLOW_QUERY_LOG),
+    )
+
+
+def get_query_stats():
+    """Returns a snapshot of the per-function counters: {function: {calls, rows, total_ms, max_ms}}."""
+    with _stats_lock:
+        return {
+            name: {"calls": s[0], "rows": s[1], "total_ms": s[2] * 1000, "max_ms": s[3] * 1000}
+            for name, s in _stats.items()
+        }
+
+
+def reset_query_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def dump_query_stats(stream=None):
+    """Writes the per-function counters, most expensive first, to `stream` (stdout by default)."""
+    stream = stream or sys.stdout
+    stats = sorted(get_query_stats().items(), key=lambda item: item[1]["total_ms"], reverse=True)
+    stream.write(f"{'function':<55} {'calls':>7} {'rows':>9} {'total ms':>10} {'avg ms':>8} {'max ms':>8}\n")
+    for name, s in stats:
+        stream.write(
+            f"{name:<55} {s['calls']:>7} {s['rows']:>9} {s['total_ms']:>10.2f} "
+            f"{s['total_ms'] / s['calls']:>8.3f} {s['max_ms']:>8.3f}\n"
+        )
+    stream.flush()
+
+
+def _params_shape(parameters):
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in parameters.items()) + "}"
+    return "(" + ", ".join(type(v).__name__ for v in parameters) + ")"
+
+
+def _caller_name():
+    # The first frame outside this module issued the statement, through a cursor or through conn.execute.
+    frame = sys._getframe(1)
+    while frame.f_back is not None and frame.f_globals.get("__name__") == __name__:
+        frame = frame.f_back
+    module = frame.f_globals.get("__name__", "?").rsplit(".", 1)[-1]
+    return f"{module}.{frame.f_code.co_name}"
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that times execute and fetch calls and reports them once the statement is consumed."""
+
+    _record = None
+
+    def _start(self, sql, shape):
+        self._finish()
+        # [caller, sql, params shape, rows, elapsed seconds]
+        self._record = [_caller_name(), sql, shape, 0, 0.0]
+
+    def _finish(self):
+        record = self._record
+        if record is None:
+            return
+        self._record = None
+        caller, sql, shape, rows, elapsed = record
+        if rows == 0 and self.rowcount > 0:
+            rows = self.rowcount
+        with _stats_lock:
+            s = _stats.setdefault(caller, [0, 0, 0.0, 0.0])
+            s[0] += 1
+            s[1] += rows
+            s[2] += elapsed
+            s[3] = max(s[3], elapsed)
+        if elapsed >= _slow_query_seconds:
+            slow_query_logger.info(
+                "%.1f ms | %s | rows=%d | params=%s | %s",
+                elapsed * 1000, caller, rows, shape, " ".join(sql.split())
+            )
+
+    def execute(self, sql, parameters=()):
+        self._start(sql, _params_shape(parameters))
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._record[4] += time.perf_counter() - start
+
+    def executemany(self, sql, seq_of_parameters):
+        if isinstance(seq_of_parameters, (list, tuple)):
+            shape = f"many[{len(seq_of_parameters)}]"
+        else:
+            shape = "many[stream]"
+        self._start(sql, shape)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._record[4] += time.perf_counter() - start
+            self._finish()
+
+    def __next__(self):
+        # Iterating the cursor (for row in cursor, yield from cursor) reads rows without any fetch call.
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            if self._record is not None:
+                self._record[4] += time.perf_counter() - start
+                self._finish()
+            raise
+        if self._record is not None:
+            self._record[4] += time.perf_counter() - start
+            self._record[3] += 1
+        return row
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        if self._record is not None:
+            self._record[4] += time.perf_counter() - start
+            if row is None:
+                self._finish()
+            else:
+                self._record[3] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(size if size is not None else self.arraysize)
+        if self._record is not None:
+            self._record[4] += time.perf_counter() - start
+            self._record[3] += len(rows)
+            if not rows:
+                self._finish()
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        if self._record is not None:
+            self._record[4] += time.perf_counter() - start
+            self._record[3] += len(rows)
+            self._finish()
+        return rows
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors, including those behind conn.execute and conn.executemany, are InstrumentedCursor."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    # sqlite3.Connection runs these on a cursor of its own in C, which would bypass InstrumentedCursor.
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
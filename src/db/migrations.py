@@ -0,0 +1,452 @@
+import logging
+import sqlite3
+
+from src.db.address_hash import HASHED_FIELDS, address_content_hash
+from src.db.connection import get_connection
+
+logger = logging.getLogger(__name__)
+
+
+def _table_exists(cursor, table):
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name = ?", (table,))
+    return cursor.fetchone() is not None
+
+
+def _table_columns(cursor, table):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [info[1] for info in cursor.fetchall()]
+
+
+def _migrate_legacy_receivers(cursor):
+    """Moves the old single 'receivers' table into 'receiver_identities' and 'receiver_addresses'."""
+    if not _table_exists(cursor, "receivers") or 'receiver_identity_id' in _table_columns(cursor, "receivers"):
+        return
+
+    print("Migrating legacy 'receivers' table...")
+    cursor.execute("ALTER TABLE receivers RENAME TO receivers_old")
+    cursor.execute("INSERT INTO receiver_identities (name, tel) SELECT DISTINCT name, tel FROM receivers_old")
+    cursor.execute("""
+        INSERT INTO receiver_addresses (
+            receiver_identity_id, inventory_code, address_detail, sub_district,
+            district, province, post_code, delivery_by, zone, created_at
+        )
+        SELECT
+            ri.id,
+            ro.inventory_code, ro.address_detail, ro.sub_district,
+            ro.district, ro.province, ro.post_code, ro.delivery_by, ro.zone, ro.created_at
+        FROM receivers_old ro
+        JOIN receiver_identities ri ON ro.name = ri.name AND ro.tel = ri.tel
+    """)
+    cursor.execute("DROP TABLE receivers_old")
+
+
+def _create_baseline_schema(cursor):
+    """
+    Version 1: every table the application used before versioned migrations existed.
+    Written to be safe on databases created by the old initialize_*_db functions.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL UNIQUE,
+            password_hash TEXT NOT NULL,
+            email TEXT UNIQUE,
+            role TEXT DEFAULT 'user',
+            avatar TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS app_config (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS inventory_path_configs (
+            inventory_code TEXT PRIMARY KEY,
+            template_dir TEXT NOT NULL
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS delivery_options (
+            name TEXT PRIMARY KEY
+        )
+    """)
+    cursor.execute("SELECT COUNT(*) FROM delivery_options")
+    if cursor.fetchone()[0] == 0:
+        initial_options = [("Kerry",), ("Flash",), ("J&T",), ("DHL",), ("Thai Post",)]
+        cursor.executemany("INSERT INTO delivery_options (name) VALUES (?)", initial_options)
+
+    # The very first senders table stored the address in a single 'address' column; it was never migrated.
+    if _table_exists(cursor, "senders") and 'address' in _table_columns(cursor, "senders"):
+        cursor.execute("DROP TABLE senders")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS senders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            inventory_code TEXT NOT NULL,
+            name TEXT NOT NULL,
+            address_detail TEXT NOT NULL,
+            sub_district TEXT NOT NULL,
+            district TEXT NOT NULL,
+            province TEXT NOT NULL,
+            post_code TEXT NOT NULL,
+            tel TEXT NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS receiver_identities (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL UNIQUE,
+            tel TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS receiver_addresses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            receiver_identity_id INTEGER NOT NULL,
+            inventory_code TEXT NOT NULL,
+            address_detail TEXT NOT NULL,
+            sub_district TEXT NOT NULL,
+            district TEXT NOT NULL,
+            province TEXT NOT NULL,
+            post_code TEXT NOT NULL,
+            delivery_by TEXT NOT NULL,
+            zone TEXT,
+            note TEXT,
+            is_default BOOLEAN DEFAULT 0,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (receiver_identity_id) REFERENCES receiver_identities (id) ON DELETE CASCADE
+        )
+    """)
+    if 'note' not in _table_columns(cursor, "receiver_addresses"):
+        cursor.execute("ALTER TABLE receiver_addresses ADD COLUMN note TEXT")
+    _migrate_legacy_receivers(cursor)
+
+    # Filled by `import_tambons.py --db`; address lookups read it while no gazetteer file is attached,
+    # and an empty one still answers them on a new database.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS thai_addresses (
+            id INTEGER PRIMARY KEY,
+            sub_district TEXT NOT NULL,
+            district TEXT NOT NULL,
+            province TEXT NOT NULL,
+            zipcode TEXT NOT NULL,
+            sub_district_code TEXT,
+            district_code TEXT,
+            province_code TEXT
+        )
+    """)
+
+
+def _create_lookup_indexes(cursor):
+    """Version 2: secondary indexes for the receiver, sender and Thai address lookups."""
+    # Cascading province -> district -> sub-district -> zipcode dropdowns, answered from the index alone.
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_thai_addresses_location
+        ON thai_addresses (province, district, sub_district, zipcode)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_thai_addresses_zipcode
+        ON thai_addresses (zipcode, province, district, sub_district)
+    """)
+    # find_exact_address and the import de-duplication check.
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_receiver_addresses_lookup
+        ON receiver_addresses (receiver_identity_id, address_detail, post_code)
+    """)
+    # get_addresses_for_receiver (newest first), exports, and the ON DELETE CASCADE from receiver_identities.
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_receiver_addresses_recent
+        ON receiver_addresses (receiver_identity_id, created_at)
+    """)
+    # Renaming a delivery option rewrites every address that uses it.
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_receiver_addresses_delivery_by
+        ON receiver_addresses (delivery_by)
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_senders_inventory_code ON senders (inventory_code)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_senders_created_at ON senders (created_at)")
+
+
+# Telephone numbers are indexed as typed and with separators removed, so "081-234" and "081234" both match.
+_SEARCH_TEL_TEXT = """
+    coalesce({tel}, '') || char(10) ||
+    replace(replace(replace(replace(coalesce({tel}, ''), '-', ''), ' ', ''), '.', ''), '+66', '0')
+"""
+_ADDRESS_SEARCH_COLUMNS = "inventory_code, address_detail, sub_district, district, province, post_code, note"
+
+
+def _create_receiver_search(cursor):
+    """
+    Version 3: FTS5 trigram indexes for the receiver search box. The trigram tokenizer matches any
+    3+ character substring, which works for Thai text that has no spaces between words.
+
+    receiver_search holds one row per receiver (rowid = receiver_identities.id) with the name and telephone.
+    receiver_address_search indexes receiver_addresses in place (external content, rowid = address id),
+    so an address write costs one index update instead of rebuilding a per-receiver document.
+    Triggers keep both in step. SQLite builds without FTS5 or the trigram tokenizer (before 3.34)
+    skip this step and searches fall back to LIKE; the receiver search startup check builds the
+    indexes the first time the app runs on a SQLite that supports them.
+    """
+    try:
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS receiver_search
+            USING fts5(name, tel, tokenize = 'trigram')
+        """)
+    except sqlite3.OperationalError as e:
+        logger.warning("Full-text receiver search unavailable (%s); searches will use LIKE.", e)
+        return
+    cursor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS receiver_address_search
+        USING fts5({_ADDRESS_SEARCH_COLUMNS}, content = 'receiver_addresses', content_rowid = 'id', tokenize = 'trigram')
+    """)
+
+    cursor.execute("DELETE FROM receiver_search")
+    cursor.execute(f"""
+        INSERT INTO receiver_search (rowid, name, tel)
+        SELECT id, name, {_SEARCH_TEL_TEXT.format(tel="tel")} FROM receiver_identities
+    """)
+    cursor.execute("INSERT INTO receiver_address_search (receiver_address_search) VALUES ('rebuild')")
+
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS receiver_search_identity_insert
+        AFTER INSERT ON receiver_identities BEGIN
+            INSERT INTO receiver_search (rowid, name, tel)
+            VALUES (new.id, new.name, {_SEARCH_TEL_TEXT.format(tel="new.tel")});
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS receiver_search_identity_update
+        AFTER UPDATE OF name, tel ON receiver_identities BEGIN
+            UPDATE receiver_search SET name = new.name, tel = {_SEARCH_TEL_TEXT.format(tel="new.tel")}
+            WHERE rowid = new.id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS receiver_search_identity_delete
+        AFTER DELETE ON receiver_identities BEGIN
+            DELETE FROM receiver_search WHERE rowid = old.id;
+        END
+    """)
+
+    # External-content tables are told about changes explicitly: 'delete' needs the old values.
+    new_values = ", ".join(f"new.{column}" for column in _ADDRESS_SEARCH_COLUMNS.split(", "))
+    old_values = ", ".join(f"old.{column}" for column in _ADDRESS_SEARCH_COLUMNS.split(", "))
+    insert_new = f"""
+        INSERT INTO receiver_address_search (rowid, {_ADDRESS_SEARCH_COLUMNS}) VALUES (new.id, {new_values});
+    """
+    delete_old = f"""
+        INSERT INTO receiver_address_search (receiver_address_search, rowid, {_ADDRESS_SEARCH_COLUMNS})
+        VALUES ('delete', old.id, {old_values});
+    """
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS receiver_address_search_insert
+        AFTER INSERT ON receiver_addresses BEGIN {insert_new} END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS receiver_address_search_update
+        AFTER UPDATE OF {_ADDRESS_SEARCH_COLUMNS} ON receiver_addresses BEGIN {delete_old} {insert_new} END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS receiver_address_search_delete
+        AFTER DELETE ON receiver_addresses BEGIN {delete_old} END
+    """)
+
+
+def _add_receiver_address_count(cursor):
+    """
+    Version 4: receiver_identities.address_count, the number of addresses a receiver has.
+    The receiver lists show it for every row; reading a column replaces a COUNT over
+    receiver_addresses per receiver. Triggers keep it exact for every write path, including
+    ON DELETE CASCADE and addresses moved to another receiver.
+    """
+    if "address_count" not in _table_columns(cursor, "receiver_identities"):
+        cursor.execute("ALTER TABLE receiver_identities ADD COLUMN address_count INTEGER NOT NULL DEFAULT 0")
+    cursor.execute("""
+        UPDATE receiver_identities SET address_count = (
+            SELECT COUNT(*) FROM receiver_addresses ra WHERE ra.receiver_identity_id = receiver_identities.id
+        )
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS receiver_address_count_insert
+        AFTER INSERT ON receiver_addresses BEGIN
+            UPDATE receiver_identities SET address_count = address_count + 1 WHERE id = new.receiver_identity_id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS receiver_address_count_delete
+        AFTER DELETE ON receiver_addresses BEGIN
+            UPDATE receiver_identities SET address_count = address_count - 1 WHERE id = old.receiver_identity_id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS receiver_address_count_move
+        AFTER UPDATE OF receiver_identity_id ON receiver_addresses
+        WHEN old.receiver_identity_id IS NOT new.receiver_identity_id BEGIN
+            UPDATE receiver_identities SET address_count = address_count - 1 WHERE id = old.receiver_identity_id;
+            UPDATE receiver_identities SET address_count = address_count + 1 WHERE id = new.receiver_identity_id;
+        END
+    """)
+
+
+# The label address, e.g. "12/3 ม.4 ต.เชิงทะเล อ.ถลาง จ.ภูเก็ต 83110", built from a row's own columns.
+# {row} is the column prefix: "new." in a trigger, "" in a generated column, which allows no qualified names.
+_FORMATTED_ADDRESS_SQL = """
+    coalesce({row}address_detail, '') || ' ต.' || coalesce({row}sub_district, '') ||
+    ' อ.' || coalesce({row}district, '') || ' จ.' || coalesce({row}province, '') ||
+    ' ' || coalesce({row}post_code, '')
+"""
+_FORMATTED_ADDRESS_COLUMNS = "address_detail, sub_district, district, province, post_code"
+
+
+def _add_formatted_addresses(cursor):
+    """
+    Version 5: formatted_address on receiver_addresses and senders, the exact text printed on a label,
+    so labels are filled from one column instead of being assembled per selection. It is a VIRTUAL
+    generated column, worked out from the row when it is read, so writes pay nothing for it. SQLite
+    before 3.31 has no generated columns; there it is stored, and triggers rewrite it whenever one of
+    its parts is inserted or changed.
+    """
+    generated = sqlite3.sqlite_version_info >= (3, 31, 0)
+    for table in ("receiver_addresses", "senders"):
+        # table_info leaves generated columns out; table_xinfo lists them.
+        cursor.execute(f"PRAGMA table_xinfo({table})")
+        if any(info[1] == "formatted_address" for info in cursor.fetchall()):
+            continue
+        if generated:
+            cursor.execute(f"""
+                ALTER TABLE {table} ADD COLUMN formatted_address TEXT
+                GENERATED ALWAYS AS ({_FORMATTED_ADDRESS_SQL.format(row='')}) VIRTUAL
+            """)
+            continue
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN formatted_address TEXT NOT NULL DEFAULT ''")
+        cursor.execute(f"UPDATE {table} SET formatted_address = {_FORMATTED_ADDRESS_SQL.format(row='')}")
+        for event in ("INSERT", f"UPDATE OF {_FORMATTED_ADDRESS_COLUMNS}"):
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_formatted_address_{event.split()[0].lower()}
+                AFTER {event} ON {table} BEGIN
+                    UPDATE {table} SET formatted_address = {_FORMATTED_ADDRESS_SQL.format(row='new.')}
+                    WHERE id = new.id;
+                END
+            """)
+
+
+def _create_zone_rules(cursor):
+    """
+    Version 6: zone_rules, the rules that fill receiver_addresses.zone. Each rule maps one district
+    (province + district), one post-code range (post_code_from..post_code_to, inclusive) or one
+    province to a zone; src/db/zone_queries.py compiles them into lookups.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS zone_rules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            zone TEXT NOT NULL,
+            province TEXT,
+            district TEXT,
+            post_code_from TEXT,
+            post_code_to TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def _add_address_content_hash(cursor):
+    """
+    Version 7: receiver_addresses.content_hash, the address_content_hash() of the row, so imports and
+    their dry runs compare an incoming address with the stored one through an index instead of field
+    by field. The lookup index gains the hash as a last column, which answers both from the index alone.
+    Writers in src/db set the hash with the row; a trigger clears it when any other write changes a
+    hashed field without it (renaming a delivery option, outside tools), and readers then compare fields.
+    """
+    if "content_hash" not in _table_columns(cursor, "receiver_addresses"):
+        cursor.execute("ALTER TABLE receiver_addresses ADD COLUMN content_hash INTEGER")
+    cursor.execute(f"SELECT id, {', '.join(HASHED_FIELDS)} FROM receiver_addresses")
+    cursor.executemany(
+        "UPDATE receiver_addresses SET content_hash = ? WHERE id = ?",
+        [(address_content_hash(dict(zip(HASHED_FIELDS, row[1:]))), row[0]) for row in cursor.fetchall()]
+    )
+    new_values = ", ".join(f"coalesce(new.{field}, '')" for field in HASHED_FIELDS)
+    old_values = ", ".join(f"coalesce(old.{field}, '')" for field in HASHED_FIELDS)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS receiver_addresses_content_hash_stale
+        AFTER UPDATE OF {', '.join(HASHED_FIELDS)} ON receiver_addresses
+        WHEN new.content_hash IS old.content_hash AND ({new_values}) IS NOT ({old_values}) BEGIN
+            UPDATE receiver_addresses SET content_hash = NULL WHERE id = new.id;
+        END
+    """)
+    cursor.execute("DROP INDEX IF EXISTS idx_receiver_addresses_lookup")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_receiver_addresses_content
+        ON receiver_addresses (receiver_identity_id, address_detail, post_code, content_hash)
+    """)
+
+
+# Ordered (version, description, step) entries. Steps receive a cursor inside the migration
+# transaction and must not commit. Never edit a released step; append a new one instead.
+MIGRATIONS = [
+    (1, "Baseline schema", _create_baseline_schema),
+    (2, "Lookup indexes", _create_lookup_indexes),
+    (3, "Receiver full-text search", _create_receiver_search),
+    (4, "Receiver address counts", _add_receiver_address_count),
+    (5, "Formatted label addresses", _add_formatted_addresses),
+    (6, "Zone rules", _create_zone_rules),
+    (7, "Address content hashes", _add_address_content_hash),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def _receiver_search_missing(cursor):
+    return not _table_exists(cursor, 'receiver_search')
+
+
+# (description, needed(cursor), step(cursor)). Run after the versioned steps whenever `needed` holds, for
+# schema that depends on the SQLite build rather than on user_version. Each `needed` costs a catalogue
+# lookup or two, and each step must be safe to run again.
+STARTUP_CHECKS = [
+    ("Receiver full-text search", _receiver_search_missing, _create_receiver_search),
+]
+
+
+def get_schema_version(conn=None):
+    """Returns the schema version recorded in PRAGMA user_version."""
+    conn = conn or get_connection()
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def run_migrations(conn=None):
+    """
+    Brings the database schema up to LATEST_VERSION. Only steps newer than PRAGMA user_version run,
+    followed by the STARTUP_CHECKS whose condition holds, all inside one transaction, so an up-to-date
+    database costs a PRAGMA read and a catalogue lookup per check.
+    Returns the schema version after the run.
+    """
+    conn = conn or get_connection()
+    current_version = get_schema_version(conn)
+    pending = [migration for migration in MIGRATIONS if migration[0] > current_version]
+    cursor = conn.cursor()
+    if not pending and not any(needed(cursor) for _, needed, _ in STARTUP_CHECKS):
+        return current_version
+
+    cursor.execute("BEGIN")
+    try:
+        for version, description, step in pending:
+            print(f"Applying database migration {version}: {description}")
+            step(cursor)
+        for description, needed, step in STARTUP_CHECKS:
+            # A versioned step may already have done the work.
+            if needed(cursor):
+                logger.info("Running startup check: %s", description)
+                step(cursor)
+        if pending:
+            current_version = pending[-1][0]
+            cursor.execute(f"PRAGMA user_version = {current_version}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return current_version
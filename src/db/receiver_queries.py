@@ -1,114 +1,32 @@
 import sqlite3
+from itertools import chain, islice
 
-DATABASE_NAME = "app_database.db"
+from src.db import changes
+from src.db.address_hash import address_content_hash
+from src.db.connection import get_connection
+from src.db.zone_queries import get_zone_engine
 
-def initialize_receiver_db():
-    """
-    Initializes the database and migrates the old single 'receivers' table 
-    to a new structure with 'receiver_identities' and 'receiver_addresses' tables.
-    """
-    with sqlite3.connect(DATABASE_NAME) as conn:
-        cursor = conn.cursor()
-
-        # Check if migration is needed by looking for the old 'receivers' table schema
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='receivers'")
-        table_exists = cursor.fetchone()
-        
-        is_migrated = False
-        if table_exists:
-            cursor.execute("PRAGMA table_info(receivers)")
-            columns = [info[1] for info in cursor.fetchall()]
-            # If 'receiver_identity_id' exists, we assume it's already migrated
-            if 'receiver_identity_id' in columns:
-                is_migrated = True
-
-        # --- Create new tables (will be ignored if they already exist) ---
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS receiver_identities (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL UNIQUE,
-                tel TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS receiver_addresses (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                receiver_identity_id INTEGER NOT NULL,
-                inventory_code TEXT NOT NULL,
-                address_detail TEXT NOT NULL,
-                sub_district TEXT NOT NULL,
-                district TEXT NOT NULL,
-                province TEXT NOT NULL,
-                post_code TEXT NOT NULL,
-                delivery_by TEXT NOT NULL,
-                zone TEXT,
-                note TEXT,
-                is_default BOOLEAN DEFAULT 0,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (receiver_identity_id) REFERENCES receiver_identities (id) ON DELETE CASCADE
-            )
-        """)
-
-        # --- Schema Migration for 'note' column ---
-        cursor.execute("PRAGMA table_info(receiver_addresses)")
-        columns = [info[1] for info in cursor.fetchall()]
-        if 'note' not in columns:
-            try:
-                print("Migration required: Adding 'note' column to 'receiver_addresses' table...")
-                cursor.execute("ALTER TABLE receiver_addresses ADD COLUMN note TEXT")
-                print("Migration completed successfully.")
-                conn.commit()
-            except Exception as e:
-                print(f"Migration for 'note' column failed: {e}")
-                conn.rollback()
-
-        if table_exists and not is_migrated:
-            print("Migration required: Migrating 'receivers' table...")
-            try:
-                # Rename old table to start transaction-like block
-                cursor.execute("ALTER TABLE receivers RENAME TO receivers_old")
+# --- New Query Functions ---
 
-                # Populate receiver_identities from old table
-                cursor.execute("INSERT INTO receiver_identities (name, tel) SELECT DISTINCT name, tel FROM receivers_old")
+def _receiver_of_address(cursor, address_id):
+    cursor.execute("SELECT receiver_identity_id FROM receiver_addresses WHERE id = ?", (address_id,))
+    row = cursor.fetchone()
+    return row[0] if row else None
 
-                # Populate receiver_addresses
-                cursor.execute("""
-                    INSERT INTO receiver_addresses (
-                        receiver_identity_id, inventory_code, address_detail, sub_district, 
-                        district, province, post_code, delivery_by, zone, created_at
-                    )
-                    SELECT 
-                        ri.id,
-                        ro.inventory_code, ro.address_detail, ro.sub_district, 
-                        ro.district, ro.province, ro.post_code, ro.delivery_by, ro.zone, ro.created_at
-                    FROM receivers_old ro
-                    JOIN receiver_identities ri ON ro.name = ri.name AND ro.tel = ri.tel
-                """)
-                
-                cursor.execute("DROP TABLE receivers_old")
-                print("Migration completed successfully.")
-                conn.commit()
-            except Exception as e:
-                print(f"Migration failed: {e}. Rolling back.")
-                conn.rollback()
-                # Attempt to restore old table if rename succeeded but rest failed
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='receivers_old'")
-                if cursor.fetchone():
-                    cursor.execute("ALTER TABLE receivers_old RENAME TO receivers")
-                raise e
-        
-        conn.commit()
-
-# --- New Query Functions ---
+def _notify_addresses_changed(operation, address_ids, receiver_id):
+    """Reports an address change, and the owning receiver as updated since its address list changed."""
+    changes.notify_changed("receiver_addresses", operation, address_ids)
+    if receiver_id is not None:
+        changes.notify_changed("receiver_identities", changes.UPDATE, [receiver_id])
 
 def add_receiver_identity(name, tel):
     """Adds a new unique receiver and returns their ID."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
         try:
             cursor.execute("INSERT INTO receiver_identities (name, tel) VALUES (?, ?)", (name, tel))
             conn.commit()
+            changes.notify_changed("receiver_identities", changes.INSERT, [cursor.lastrowid])
             return cursor.lastrowid, "Receiver added."
         except sqlite3.IntegrityError:
             # If already exists, find and return the ID
@@ -119,57 +37,195 @@ def add_receiver_identity(name, tel):
             return None, f"Database error: {e}"
 
 def add_receiver_address(receiver_identity_id, data):
-    """Adds a new address for a given receiver."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
+    """Adds a new address for a given receiver. A blank zone is filled from the zone rules."""
+    data = get_zone_engine().fill_zone(dict(data))
+    with get_connection() as conn:
         cursor = conn.cursor()
         try:
             cursor.execute("""
                 INSERT INTO receiver_addresses (
                     receiver_identity_id, inventory_code, address_detail, sub_district, 
-                    district, province, post_code, delivery_by, zone, note
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    district, province, post_code, delivery_by, zone, note, content_hash
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 receiver_identity_id, data['inventory_code'], data['address_detail'], data['sub_district'],
-                data['district'], data['province'], data['post_code'], data['delivery_by'], data.get('zone'), data.get('note')
+                data['district'], data['province'], data['post_code'], data['delivery_by'], data.get('zone'), data.get('note'),
+                address_content_hash(data)
             ))
             conn.commit()
+            _notify_addresses_changed(changes.INSERT, [cursor.lastrowid], receiver_identity_id)
             return True, "Address added successfully."
         except sqlite3.Error as e:
             return False, f"Database error: {e}"
 
-def get_all_receiver_identities():
-    """Retrieves all unique receivers and includes a count of their addresses."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
-        conn.row_factory = sqlite3.Row
+# Rows per page for the receiver listings; large enough to fill a tall table, small enough to stay instant.
+RECEIVER_PAGE_SIZE = 200
+
+def _like_pattern(text):
+    """A LIKE pattern matching `text` anywhere, with its own % and _ taken literally (ESCAPE '\\')."""
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+def get_receiver_identities_page(after=None, limit=RECEIVER_PAGE_SIZE, search=None):
+    """
+    Retrieves one page of receivers ordered by (name, id), with a count of their addresses.
+
+    Pass the (name, id) of the last row of the previous page as `after` to get the next page; the
+    lookup seeks straight to it through the name index, so page 1000 costs the same as page 1.
+    `search` keeps only names containing that text (case-insensitive for Latin letters).
+    """
+    conditions, params = [], []
+    if after is not None:
+        conditions.append("(ri.name, ri.id) > (?, ?)")
+        params.extend(after)
+    if search:
+        conditions.append("ri.name LIKE ? ESCAPE '\\'")
+        params.append(_like_pattern(search))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    with get_connection() as conn:
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT 
-                ri.id, 
-                ri.name, 
-                ri.tel, 
-                COUNT(ra.id) as address_count
+        cursor.execute(f"""
+            SELECT
+                ri.id,
+                ri.name,
+                ri.tel,
+                ri.address_count
             FROM receiver_identities ri
-            LEFT JOIN receiver_addresses ra ON ri.id = ra.receiver_identity_id
-            GROUP BY ri.id
-            ORDER BY ri.name
-        """)
+            {where}
+            ORDER BY ri.name, ri.id
+            LIMIT ?
+        """, (*params, limit))
         return [dict(row) for row in cursor.fetchall()]
 
+def get_receiver_identities_by_ids(receiver_ids):
+    """Retrieves the given receivers in the get_receiver_identities_page shape; missing ids are left out."""
+    receiver_ids = list(receiver_ids)
+    receivers = []
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        for chunk in _chunks(receiver_ids):
+            placeholders = ", ".join("?" for _ in chunk)
+            cursor.execute(f"""
+                SELECT
+                    ri.id,
+                    ri.name,
+                    ri.tel,
+                    ri.address_count
+                FROM receiver_identities ri
+                WHERE ri.id IN ({placeholders})
+            """, chunk)
+            receivers.extend(dict(row) for row in cursor.fetchall())
+    return receivers
+
+def iter_receiver_identities(page_size=RECEIVER_PAGE_SIZE, search=None):
+    """Yields every receiver in (name, id) order, fetching one page at a time."""
+    after = None
+    while True:
+        page = get_receiver_identities_page(after, page_size, search)
+        yield from page
+        if len(page) < page_size:
+            return
+        after = (page[-1]['name'], page[-1]['id'])
+
+# Matches taken from each full-text index per search. Ranking runs over these, so a query as broad as a
+# province name stays fast; narrowing the search text brings the rest into reach.
+SEARCH_CANDIDATE_LIMIT = 5000
+_PHONE_SEPARATORS = str.maketrans("", "", "- .")
+
+def _search_index_available(cursor):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'receiver_search'")
+    return cursor.fetchone() is not None
+
+def search_receivers(text, limit=RECEIVER_PAGE_SIZE, offset=0):
+    """
+    Finds receivers whose name, telephone or any address (detail, sub-district, district, province,
+    post code, inventory or note) contains `text`, best matches first, in the same shape as
+    get_receiver_identities_page.
+
+    Uses the receiver_search and receiver_address_search FTS5 trigram indexes: name matches come first,
+    then telephone matches, then address matches, each group in name order. Queries shorter than three
+    characters (too short for a trigram) or databases without the indexes fall back to a name/telephone
+    LIKE in name order.
+    """
+    text = text.strip()
+    if not text:
+        return get_receiver_identities_page(limit=limit) if offset == 0 else []
+    # Phone numbers are indexed without separators too; search the compact form when that is all it is.
+    compact = text.translate(_PHONE_SEPARATORS)
+    if compact.isdigit():
+        text = compact
+
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        if len(text) >= 3 and _search_index_available(cursor):
+            phrase = '"' + text.replace('"', '""') + '"'
+            # Ranked by where the text was found (name, then telephone, then an address), then by name.
+            # Each index stops after SEARCH_CANDIDATE_LIMIT matches instead of scoring every match,
+            # which is what keeps a search as broad as a province name in the milliseconds.
+            cursor.execute("""
+                WITH hits (receiver_id, tier) AS (
+                    SELECT receiver_id, 0 FROM (
+                        SELECT rowid AS receiver_id FROM receiver_search WHERE receiver_search MATCH ? LIMIT ?
+                    )
+                    UNION ALL
+                    SELECT ra.receiver_identity_id, 1 FROM (
+                        SELECT rowid FROM receiver_address_search WHERE receiver_address_search MATCH ? LIMIT ?
+                    ) hit
+                    JOIN receiver_addresses ra ON ra.id = hit.rowid
+                )
+                SELECT
+                    ri.id,
+                    ri.name,
+                    ri.tel,
+                    ri.address_count
+                FROM (SELECT receiver_id, MIN(tier) AS tier FROM hits GROUP BY receiver_id) best
+                JOIN receiver_identities ri ON ri.id = best.receiver_id
+                ORDER BY
+                    CASE WHEN best.tier = 1 THEN 2 WHEN instr(lower(ri.name), lower(?)) > 0 THEN 0 ELSE 1 END,
+                    ri.name, ri.id
+                LIMIT ? OFFSET ?
+            """, (phrase, SEARCH_CANDIDATE_LIMIT, phrase, SEARCH_CANDIDATE_LIMIT, text, limit, offset))
+        else:
+            pattern = _like_pattern(text)
+            cursor.execute("""
+                SELECT
+                    ri.id,
+                    ri.name,
+                    ri.tel,
+                    ri.address_count
+                FROM receiver_identities ri
+                WHERE ri.name LIKE ? ESCAPE '\\' OR ri.tel LIKE ? ESCAPE '\\'
+                ORDER BY ri.name, ri.id
+                LIMIT ? OFFSET ?
+            """, (pattern, pattern, limit, offset))
+        return [dict(row) for row in cursor.fetchall()]
+
+def get_all_receiver_identities():
+    """Retrieves all unique receivers and includes a count of their addresses."""
+    return list(iter_receiver_identities())
+
 def get_addresses_for_receiver(receiver_identity_id):
     """Retrieves all addresses for a specific receiver."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
-        conn.row_factory = sqlite3.Row
+    with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM receiver_addresses WHERE receiver_identity_id = ? ORDER BY created_at DESC", (receiver_identity_id,))
         return [dict(row) for row in cursor.fetchall()]
 
+def get_receiver_with_addresses(receiver_id):
+    """Retrieves a receiver identity and all their addresses (newest first) as (identity, addresses)."""
+    identity = get_receiver_identity_by_id(receiver_id)
+    if not identity:
+        return None, []
+    return identity, get_addresses_for_receiver(receiver_id)
+
 def update_receiver_identity(receiver_id, name, tel):
     """Updates a receiver's name and telephone."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
         try:
             cursor.execute("UPDATE receiver_identities SET name = ?, tel = ? WHERE id = ?", (name, tel, receiver_id))
             conn.commit()
+            changes.notify_changed("receiver_identities", changes.UPDATE, [receiver_id])
             return True, "Receiver updated."
         except sqlite3.IntegrityError:
             return False, "That name is already taken."
@@ -178,48 +234,54 @@ def update_receiver_identity(receiver_id, name, tel):
 
 def update_receiver_address(address_id, data):
     """Updates a specific address."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
         try:
+            receiver_id = _receiver_of_address(cursor, address_id)
             cursor.execute("""UPDATE receiver_addresses SET
                 inventory_code = ?, address_detail = ?, sub_district = ?, district = ?,
-                province = ?, post_code = ?, delivery_by = ?, zone = ?, note = ?
+                province = ?, post_code = ?, delivery_by = ?, zone = ?, note = ?, content_hash = ?
                 WHERE id = ?
             """, (
                 data['inventory_code'], data['address_detail'], data['sub_district'], data['district'],
-                data['province'], data['post_code'], data['delivery_by'], data.get('zone'), data.get('note'), address_id
+                data['province'], data['post_code'], data['delivery_by'], data.get('zone'), data.get('note'),
+                address_content_hash(data), address_id
             ))
             conn.commit()
+            _notify_addresses_changed(changes.UPDATE, [address_id], receiver_id)
             return True, "Address updated."
         except sqlite3.Error as e:
             return False, f"Database error: {e}"
 
 def delete_receiver_identity(receiver_id):
     """Deletes a receiver and all their associated addresses (due to CASCADE)."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
         try:
             cursor.execute("DELETE FROM receiver_identities WHERE id = ?", (receiver_id,))
             conn.commit()
+            changes.notify_changed("receiver_addresses", changes.DELETE)
+            changes.notify_changed("receiver_identities", changes.DELETE, [receiver_id])
             return True, "Receiver and all addresses deleted."
         except sqlite3.Error as e:
             return False, f"Database error: {e}"
 
 def delete_receiver_address(address_id):
     """Deletes a single address."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
         try:
+            receiver_id = _receiver_of_address(cursor, address_id)
             cursor.execute("DELETE FROM receiver_addresses WHERE id = ?", (address_id,))
             conn.commit()
+            _notify_addresses_changed(changes.DELETE, [address_id], receiver_id)
             return True, "Address deleted."
         except sqlite3.Error as e:
             return False, f"Database error: {e}"
 
 def get_receiver_address_by_id(address_id):
     """Retrieves a single address by its ID."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
-        conn.row_factory = sqlite3.Row
+    with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM receiver_addresses WHERE id = ?", (address_id,))
         data = cursor.fetchone()
@@ -227,43 +289,48 @@ def get_receiver_address_by_id(address_id):
 
 def find_exact_address(receiver_identity_id, address_detail, post_code):
     """Finds an address for a specific receiver to prevent duplicates."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
-        conn.row_factory = sqlite3.Row
+    with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT * FROM receiver_addresses 
             WHERE receiver_identity_id = ? AND address_detail = ? AND post_code = ?
+            ORDER BY id LIMIT 1
         """, (receiver_identity_id, address_detail, post_code))
         data = cursor.fetchone()
         return dict(data) if data else None
 
+def iter_all_receiver_addresses():
+    """
+    Yields every address joined with its receiver's name and tel, straight from the cursor, so an
+    export never holds the whole table. Columns are in the order of the receiver spreadsheet.
+    """
+    cursor = get_connection().cursor()
+    cursor.execute("""
+        SELECT 
+            ri.name,
+            ri.tel,
+            ra.inventory_code,
+            ra.address_detail,
+            ra.sub_district,
+            ra.district,
+            ra.province,
+            ra.post_code,
+            ra.delivery_by,
+            ra.zone,
+            ra.note
+        FROM receiver_addresses ra
+        JOIN receiver_identities ri ON ra.receiver_identity_id = ri.id
+        ORDER BY ri.name, ra.created_at
+    """)
+    yield from cursor
+
 def get_all_receiver_addresses():
     """Retrieves all addresses from the database, joined with receiver identity info."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT 
-                ri.name,
-                ri.tel,
-                ra.inventory_code,
-                ra.address_detail,
-                ra.sub_district,
-                ra.district,
-                ra.province,
-                ra.post_code,
-                ra.delivery_by,
-                ra.zone,
-                ra.note
-            FROM receiver_addresses ra
-            JOIN receiver_identities ri ON ra.receiver_identity_id = ri.id
-            ORDER BY ri.name, ra.created_at
-        """)
-        return [dict(row) for row in cursor.fetchall()]
+    return [dict(row) for row in iter_all_receiver_addresses()]
 
 def set_default_address(receiver_identity_id, address_id):
     """Sets a specific address as the default for a receiver, clearing any previous default."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
         try:
             # First, clear any existing default for this receiver
@@ -271,15 +338,312 @@ def set_default_address(receiver_identity_id, address_id):
             # Then, set the new default
             cursor.execute("UPDATE receiver_addresses SET is_default = 1 WHERE id = ? AND receiver_identity_id = ?", (address_id, receiver_identity_id))
             conn.commit()
+            _notify_addresses_changed(changes.UPDATE, None, receiver_identity_id)
             return True, "Default address set."
         except sqlite3.Error as e:
             return False, f"Database error: {e}"
 
 def get_receiver_identity_by_id(receiver_id):
     """Retrieves a single receiver identity by their ID."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
-        conn.row_factory = sqlite3.Row
+    with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM receiver_identities WHERE id = ?", (receiver_id,))
         data = cursor.fetchone()
         return dict(data) if data else None
+
+# Columns compared and written by the receiver import, in statement order.
+ADDRESS_FIELDS = (
+    'inventory_code', 'address_detail', 'sub_district', 'district',
+    'province', 'post_code', 'delivery_by', 'zone', 'note'
+)
+# Keeps every IN (...) list well under SQLite's bound-parameter limit.
+_ID_CHUNK = 500
+# Import rows held in memory at once by staged_merge_receivers; every chunk is staged in the same transaction.
+IMPORT_CHUNK_SIZE = 2000
+
+
+def _chunks(items, size=_ID_CHUNK):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _field_value(value):
+    return '' if value is None else str(value)
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _prepare_import_rows(rows, counts, zone_engine):
+    """Yields (name, tel, data) for every importable row, counting rows without a name as skipped."""
+    for row in rows:
+        name = row.get('name')
+        if not name:
+            counts['skipped'] += 1
+            continue
+        data = {field: _field_value(row.get(field)) for field in ADDRESS_FIELDS}
+        data['delivery_by'] = data['delivery_by'].strip()
+        zone_engine.fill_zone(data)
+        yield name, _field_value(row.get('tel')), data
+
+
+# Per-connection scratch table for staged_merge_receivers. It only ever holds the rows of the import
+# in progress, so reading it whole is what every statement below is meant to do.
+IMPORT_STAGING_TABLE = "receiver_import_staging"
+
+
+def _same_address_sql(left, right):
+    """SQL that is true when `left` (a staging row) holds the same ADDRESS_FIELDS as `right`."""
+    return " AND ".join(f"{left}.{field} = COALESCE({right}.{field}, '')" for field in ADDRESS_FIELDS)
+
+
+def _load_staging(cursor, chunks):
+    """Creates (or empties) the staging table and fills it with the prepared rows and their hashes, in import order."""
+    cursor.execute(f"""
+        CREATE TEMP TABLE IF NOT EXISTS {IMPORT_STAGING_TABLE} (
+            seq INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            tel TEXT NOT NULL,
+            {', '.join(f'{field} TEXT NOT NULL' for field in ADDRESS_FIELDS)},
+            content_hash INTEGER NOT NULL,
+            receiver_identity_id INTEGER,
+            stored_id INTEGER,
+            stored_hash INTEGER,
+            prev_seq INTEGER,
+            is_last INTEGER NOT NULL DEFAULT 1
+        )
+    """)
+    cursor.execute(f"DELETE FROM {IMPORT_STAGING_TABLE}")
+    for prepared in chunks:
+        cursor.executemany(
+            f"""
+            INSERT INTO {IMPORT_STAGING_TABLE} (name, tel, {', '.join(ADDRESS_FIELDS)}, content_hash)
+            VALUES (?, ?, {', '.join('?' for _ in ADDRESS_FIELDS)}, ?)
+            """,
+            [
+                (name, tel, *(data[field] for field in ADDRESS_FIELDS), address_content_hash(data))
+                for name, tel, data in prepared
+            ]
+        )
+
+
+def _diff_staging(cursor, counts):
+    """Matches the staged rows with the stored addresses and adds their added/updated/unchanged counts."""
+    staging = IMPORT_STAGING_TABLE
+    # Each row's receiver and stored address, read from the content index alone; duplicates resolve to
+    # the lowest id, like find_exact_address. Rows of receivers not stored yet keep NULLs.
+    cursor.execute(f"""
+        UPDATE {staging}
+        SET receiver_identity_id = receiver_identities.id,
+            (stored_id, stored_hash) = (
+                SELECT receiver_addresses.id, receiver_addresses.content_hash FROM receiver_addresses
+                WHERE receiver_addresses.receiver_identity_id = receiver_identities.id
+                  AND receiver_addresses.address_detail = {staging}.address_detail
+                  AND receiver_addresses.post_code = {staging}.post_code
+                ORDER BY receiver_addresses.id LIMIT 1
+            )
+        FROM receiver_identities
+        WHERE receiver_identities.name = {staging}.name
+    """)
+    # Rows repeating an address are compared with the row before them, so later rows win and the
+    # counts match importing the rows one by one.
+    cursor.execute(f"""
+        UPDATE {staging}
+        SET prev_seq = ordered.prev_seq, is_last = ordered.next_seq IS NULL
+        FROM (
+            SELECT seq,
+                   LAG(seq) OVER address_rows AS prev_seq,
+                   LEAD(seq) OVER address_rows AS next_seq
+            FROM {staging}
+            WINDOW address_rows AS (PARTITION BY name, address_detail, post_code ORDER BY seq)
+        ) AS ordered
+        WHERE ordered.seq = {staging}.seq AND (ordered.prev_seq IS NOT NULL OR ordered.next_seq IS NOT NULL)
+    """)
+    # Hashes decide; only stored rows whose hash was cleared are compared field by field.
+    cursor.execute(f"""
+        SELECT
+            COUNT(*) AS total,
+            COALESCE(SUM({staging}.prev_seq IS NULL AND {staging}.stored_id IS NULL), 0) AS added,
+            COALESCE(SUM(CASE
+                WHEN previous.seq IS NOT NULL THEN {staging}.content_hash <> previous.content_hash
+                WHEN {staging}.stored_id IS NOT NULL THEN COALESCE(
+                    {staging}.content_hash <> {staging}.stored_hash,
+                    NOT ({_same_address_sql(staging, 'receiver_addresses')})
+                )
+            END), 0) AS updated
+        FROM {staging}
+        LEFT JOIN {staging} AS previous ON previous.seq = {staging}.prev_seq
+        LEFT JOIN receiver_addresses
+            ON receiver_addresses.id = {staging}.stored_id AND {staging}.stored_hash IS NULL
+    """)
+    total, added, updated = cursor.fetchone()
+    counts['added'] += added
+    counts['updated'] += updated
+    counts['unchanged'] += total - added - updated
+
+
+def _merge_staging(cursor, counts):
+    """Merges the staged rows into the receiver tables. Returns (new_identity_count, written_address_count)."""
+    staging = IMPORT_STAGING_TABLE
+    # A new receiver takes the telephone of its first row, as in add_receiver_identity.
+    cursor.execute(f"""
+        INSERT INTO receiver_identities (name, tel)
+        SELECT name, tel FROM {staging}
+        WHERE seq IN (SELECT MIN(seq) FROM {staging} GROUP BY name)
+        ORDER BY seq
+        ON CONFLICT(name) DO NOTHING
+    """)
+    new_identities = cursor.rowcount
+    cursor.execute(f"""
+        INSERT INTO delivery_options (name)
+        SELECT DISTINCT delivery_by FROM {staging} WHERE delivery_by <> ''
+        ON CONFLICT(name) DO NOTHING
+    """)
+    _diff_staging(cursor, counts)
+
+    # Only the last row of each address is written, and only where its hash differs from the stored
+    # one; a stored row without a hash is rewritten, which gives it one.
+    cursor.execute(f"""
+        INSERT INTO receiver_addresses (receiver_identity_id, {', '.join(ADDRESS_FIELDS)}, content_hash)
+        SELECT receiver_identity_id, {', '.join(ADDRESS_FIELDS)}, content_hash FROM {staging}
+        WHERE is_last AND stored_id IS NULL
+        ORDER BY seq
+    """)
+    written_addresses = cursor.rowcount
+    cursor.execute(f"""
+        UPDATE receiver_addresses
+        SET {', '.join(f'{field} = {staging}.{field}' for field in ADDRESS_FIELDS)},
+            content_hash = {staging}.content_hash
+        FROM {staging}
+        WHERE {staging}.is_last AND receiver_addresses.id = {staging}.stored_id
+          AND {staging}.stored_hash IS NOT {staging}.content_hash
+    """)
+    written_addresses += cursor.rowcount
+    return new_identities, written_addresses
+
+
+def _reset_staging(cursor):
+    """Forgets what an earlier diff resolved, so the staged rows can be matched again against the current tables."""
+    cursor.execute(f"""
+        UPDATE {IMPORT_STAGING_TABLE}
+        SET receiver_identity_id = NULL, stored_id = NULL, stored_hash = NULL, prev_seq = NULL, is_last = 1
+    """)
+
+
+def _notify_import(new_identities, written_addresses):
+    if new_identities or written_addresses:
+        changes.notify_changed("receiver_identities", changes.INSERT)
+    if written_addresses:
+        changes.notify_changed("receiver_addresses", changes.INSERT)
+
+
+def staged_merge_receivers(rows, chunk_size=IMPORT_CHUNK_SIZE, dry_run=False, keep_staged=False):
+    """
+    Imports many receiver rows in a single transaction.
+
+    Each row is a dict with 'name', 'tel' and the ADDRESS_FIELDS keys. Receivers are matched by name
+    (new names are inserted, existing ones keep their telephone, as in add_receiver_identity) and
+    addresses by (receiver, address_detail, post_code): new ones are inserted, ones with any different
+    field are updated, the rest are left alone; when rows repeat an address the last one wins. Blank
+    zones are filled from the zone rules before comparing. Unknown delivery_by values are added to
+    delivery_options.
+
+    The rows are streamed `chunk_size` at a time, with their content hashes, into a TEMP staging
+    table with executemany; a few set-based statements joined on (receiver, address_detail, post_code)
+    then classify every row as added, updated or unchanged by comparing hashes and write the new and
+    changed addresses at once. Each staged row costs one index lookup, so the import time follows the
+    size of the file, not of the database. Everything runs in one transaction; an error raised while
+    reading rolls it back and propagates.
+
+    With `dry_run`, the rows are staged and counted the same way but nothing is written to the
+    database: the counts preview what the import would do. Adding `keep_staged` leaves the staged rows
+    on this thread's connection, for merge_staged_receivers() to write without reading them again.
+
+    Returns ({'added': n, 'updated': n, 'unchanged': n, 'skipped': n}, message), or (None, message) if
+    the transaction was rolled back because of a database error.
+    """
+    counts = {'added': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0}
+    chunks = _batched(_prepare_import_rows(rows, counts, get_zone_engine()), chunk_size)
+    first_chunk = next(chunks, None)
+    if first_chunk is None:
+        discard_staged_receivers()
+        return counts, "Nothing to import."
+
+    new_identities = written_addresses = 0
+    conn = get_connection()
+    try:
+        with conn:
+            cursor = conn.cursor()
+            # A dry run only writes the TEMP staging table, so it never takes the database's write lock.
+            cursor.execute("BEGIN" if dry_run else "BEGIN IMMEDIATE")
+            _load_staging(cursor, chain([first_chunk], chunks))
+            if dry_run:
+                _diff_staging(cursor, counts)
+            else:
+                new_identities, written_addresses = _merge_staging(cursor, counts)
+            if not (dry_run and keep_staged):
+                cursor.execute(f"DELETE FROM {IMPORT_STAGING_TABLE}")
+        if dry_run:
+            return counts, "Dry run: nothing was written."
+        _notify_import(new_identities, written_addresses)
+        return counts, "Import committed."
+    except sqlite3.Error as e:
+        return None, f"Database error: {e}"
+
+
+def _staging_exists(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_temp_master WHERE type = 'table' AND name = ?", (IMPORT_STAGING_TABLE,)
+    ).fetchone() is not None
+
+
+def has_staged_receivers():
+    """True when a kept dry run left rows staged on this thread's connection."""
+    conn = get_connection()
+    if not _staging_exists(conn):
+        return False
+    return conn.execute(f"SELECT 1 FROM {IMPORT_STAGING_TABLE} LIMIT 1").fetchone() is not None
+
+
+def merge_staged_receivers(skipped=0, cancel_event=None):
+    """
+    Writes the rows a staged_merge_receivers(..., dry_run=True, keep_staged=True) call left staged on this
+    thread's connection. They are matched again against the tables as they are now, so the counts and
+    the result are those of importing the file at this moment, without reading or hashing it again.
+    `skipped` is the preview's skipped count: skipped rows are never staged. If `cancel_event` (a
+    threading.Event) is set by the time the merge would commit, it is rolled back and the rows stay staged.
+
+    Returns what staged_merge_receivers does, or (None, message) when nothing is staged or it was cancelled.
+    """
+    counts = {'added': 0, 'updated': 0, 'unchanged': 0, 'skipped': skipped}
+    if not has_staged_receivers():
+        return None, "There is no previewed import to write."
+    conn = get_connection()
+    try:
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            _reset_staging(cursor)
+            new_identities, written_addresses = _merge_staging(cursor, counts)
+            if cancel_event is not None and cancel_event.is_set():
+                conn.rollback()
+                return None, "Import cancelled."
+            cursor.execute(f"DELETE FROM {IMPORT_STAGING_TABLE}")
+    except sqlite3.Error as e:
+        return None, f"Database error: {e}"
+    _notify_import(new_identities, written_addresses)
+    return counts, "Import committed."
+
+
+def discard_staged_receivers():
+    """Drops rows a kept dry run left staged on this thread's connection, if any."""
+    conn = get_connection()
+    if _staging_exists(conn):
+        with conn:
+            conn.execute(f"DELETE FROM {IMPORT_STAGING_TABLE}")
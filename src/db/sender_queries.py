@@ -1,45 +1,14 @@
 import sqlite3
 
-DATABASE_NAME = "app_database.db"
+from src.db import changes
+from src.db.connection import get_connection
 
-def initialize_sender_db():
-    """
-    Initializes the SQLite database. It checks for an old 'senders' table schema
-    and replaces it with the new one, ensuring compatibility by dropping the old table.
-    """
-    with sqlite3.connect(DATABASE_NAME) as conn:
-        cursor = conn.cursor()
-
-        # Check if the table exists and has the old 'address' column
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='senders'")
-        table_exists = cursor.fetchone()
-        if table_exists:
-            cursor.execute("PRAGMA table_info(senders)")
-            columns = [info[1] for info in cursor.fetchall()]
-            # If 'address' column exists, it's the old schema. Drop it to recreate it.
-            if 'address' in columns:
-                cursor.execute("DROP TABLE senders")
-
-        # Create the table with the new schema if it doesn't exist or was just dropped
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS senders (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                inventory_code TEXT NOT NULL,
-                name TEXT NOT NULL,
-                address_detail TEXT NOT NULL,
-                sub_district TEXT NOT NULL,
-                district TEXT NOT NULL,
-                province TEXT NOT NULL,
-                post_code TEXT NOT NULL,
-                tel TEXT NOT NULL,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        conn.commit()
+# Sender columns in statement order, as written by import_senders and iter_all_senders.
+SENDER_FIELDS = ('inventory_code', 'name', 'address_detail', 'sub_district', 'district', 'province', 'post_code', 'tel')
 
 def add_sender(inventory_code, name, address_detail, sub_district, district, province, post_code, tel):
     """Adds a new sender to the database."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
         try:
             cursor.execute("""
@@ -48,6 +17,7 @@ def add_sender(inventory_code, name, address_detail, sub_district, district, pro
                 """,
                            (inventory_code, name, address_detail, sub_district, district, province, post_code, tel))
             conn.commit()
+            changes.notify_changed("senders", changes.INSERT, [cursor.lastrowid])
             return True, "Sender added successfully."
         except sqlite3.Error as e:
             return False, f"Database error: {e}"
@@ -55,19 +25,25 @@ def add_sender(inventory_code, name, address_detail, sub_district, district, pro
 
 def get_all_senders():
     """Retrieves all senders from the database."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
-        conn.row_factory = sqlite3.Row # This allows accessing columns by name
+    with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("""
-            SELECT id, inventory_code, name, address_detail, sub_district, district, province, post_code, tel 
+            SELECT id, inventory_code, name, address_detail, sub_district, district, province, post_code, tel,
+                   formatted_address
             FROM senders ORDER BY created_at DESC
         """)
         senders_data = cursor.fetchall()
         return [dict(row) for row in senders_data]
 
+def iter_all_senders():
+    """Yields every sender's SENDER_FIELDS, newest first, straight from the cursor, for exports."""
+    cursor = get_connection().cursor()
+    cursor.execute(f"SELECT {', '.join(SENDER_FIELDS)} FROM senders ORDER BY created_at DESC")
+    yield from cursor
+
 def update_sender(sender_id, inventory_code, name, address_detail, sub_district, district, province, post_code, tel):
     """Updates an existing sender's details."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
         try:
             cursor.execute("""UPDATE senders SET 
@@ -82,25 +58,89 @@ def update_sender(sender_id, inventory_code, name, address_detail, sub_district,
                           WHERE id = ?""",
                            (inventory_code, name, address_detail, sub_district, district, province, post_code, tel, sender_id))
             conn.commit()
+            changes.notify_changed("senders", changes.UPDATE, [sender_id])
             return True, "Sender updated successfully."
         except sqlite3.Error as e:
             return False, f"Database error: {e}"
 
 def delete_sender(sender_id):
     """Deletes a sender from the database by ID."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
         try:
             cursor.execute("DELETE FROM senders WHERE id = ?", (sender_id,))
             conn.commit()
+            changes.notify_changed("senders", changes.DELETE, [sender_id])
             return True, "Sender deleted successfully."
         except sqlite3.Error as e:
             return False, f"Database error: {e}"
 
 def get_distinct_inventory_codes():
     """Retrieves a unique list of all inventory codes from the senders table."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT DISTINCT inventory_code FROM senders ORDER BY inventory_code")
         codes = cursor.fetchall()
-        return [row[0] for row in codes]
\ No newline at end of file
+        return [row[0] for row in codes]
+
+def import_senders(rows, dry_run=False):
+    """
+    Imports many sender rows (dicts with the SENDER_FIELDS keys) in a single transaction.
+
+    Senders are matched by (inventory_code, name), the lowest id first where a pair is stored twice:
+    new ones are inserted, ones with any other field different are updated and the rest left alone.
+    Rows without an inventory code or a name are skipped. Rows are counted in order against what is
+    stored, so later rows for the same sender win. With `dry_run` the counts are worked out the same
+    way and nothing is written.
+
+    Returns ({'added': n, 'updated': n, 'unchanged': n, 'skipped': n}, message), or (None, message) if
+    the transaction was rolled back because of a database error.
+    """
+    counts = {'added': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0}
+    conn = get_connection()
+    try:
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN" if dry_run else "BEGIN IMMEDIATE")
+            # A few hundred senders at most, so they are compared in memory.
+            cursor.execute(f"SELECT id, {', '.join(SENDER_FIELDS)} FROM senders ORDER BY id")
+            stored = {}
+            for row in cursor.fetchall():
+                stored.setdefault((row['inventory_code'], row['name']), (row['id'], tuple(row)[1:]))
+            inserts, updates = {}, {}
+            for row in rows:
+                values = tuple('' if row.get(field) is None else str(row.get(field)).strip() for field in SENDER_FIELDS)
+                key = values[:2]
+                if not all(key):
+                    counts['skipped'] += 1
+                    continue
+                sender_id, stored_values = stored.get(key, (None, None))
+                if stored_values is None:
+                    counts['added'] += 1
+                    inserts[key] = values
+                elif stored_values == values:
+                    counts['unchanged'] += 1
+                    continue
+                else:
+                    counts['updated'] += 1
+                    if key in inserts:
+                        inserts[key] = values
+                    else:
+                        updates[sender_id] = values
+                stored[key] = (sender_id, values)
+            if not dry_run:
+                placeholders = ", ".join("?" for _ in SENDER_FIELDS)
+                cursor.executemany(
+                    f"INSERT INTO senders ({', '.join(SENDER_FIELDS)}) VALUES ({placeholders})", inserts.values()
+                )
+                cursor.executemany(
+                    f"UPDATE senders SET {', '.join(f'{field} = ?' for field in SENDER_FIELDS)} WHERE id = ?",
+                    [(*values, sender_id) for sender_id, values in updates.items()]
+                )
+        if dry_run:
+            return counts, "Dry run: nothing was written."
+        if inserts or updates:
+            changes.notify_changed("senders", changes.INSERT)
+        return counts, "Import committed."
+    except sqlite3.Error as e:
+        return None, f"Database error: {e}"
@@ -1,24 +1,8 @@
 import sqlite3
 import hashlib
 
-DATABASE_NAME = "app_database.db"
-
-def initialize_db():
-    """Initializes the SQLite database and creates the users table if it doesn't exist."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT NOT NULL UNIQUE,
-                password_hash TEXT NOT NULL,
-                email TEXT UNIQUE,
-                role TEXT DEFAULT 'user',
-                avatar TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        conn.commit()
+from src.db import changes
+from src.db.connection import get_connection
 
 def hash_password(password):
     """Hashes a password using SHA256.
@@ -31,12 +15,13 @@ def hash_password(password):
 def add_user(username, password, email=None, role='user', avatar=None):
     """Adds a new user to the database."""
     password_hash = hash_password(password)
-    with sqlite3.connect(DATABASE_NAME) as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
         try:
             cursor.execute("INSERT INTO users (username, password_hash, email, role, avatar) VALUES (?, ?, ?, ?, ?)",
                            (username, password_hash, email, role, avatar))
             conn.commit()
+            changes.notify_changed("users", changes.INSERT, [cursor.lastrowid])
             return True, "User registered successfully."
         except sqlite3.IntegrityError as e:
             if "UNIQUE constraint failed: users.username" in str(e):
@@ -48,7 +33,7 @@ def add_user(username, password, email=None, role='user', avatar=None):
 
 def get_user_details(username):
     """Retrieves all details of a user by username."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT id, username, email, role, avatar, created_at FROM users WHERE username = ?", (username,))
         user_data = cursor.fetchone()
@@ -66,7 +51,7 @@ def get_user_details(username):
 def verify_user(username, password):
     """Verifies a user's credentials."""
     password_hash = hash_password(password)
-    with sqlite3.connect(DATABASE_NAME) as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM users WHERE username = ? AND password_hash = ?",
                        (username, password_hash))
@@ -75,7 +60,7 @@ def verify_user(username, password):
 
 def get_user_role(username):
     """Retrieves the role of a user."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT role FROM users WHERE username = ?", (username,))
         result = cursor.fetchone()
@@ -83,7 +68,7 @@ def get_user_role(username):
 
 def get_all_users():
     """Retrieves all users from the database."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT id, username, email, role, avatar, created_at FROM users")
         users_data = cursor.fetchall()
@@ -101,7 +86,7 @@ def get_all_users():
 
 def update_user(user_id, username=None, password=None, email=None, role=None, avatar=None):
     """Updates an existing user's details in the database."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
         updates = []
         params = []
@@ -132,6 +117,7 @@ def update_user(user_id, username=None, password=None, email=None, role=None, av
         try:
             cursor.execute(query, tuple(params))
             conn.commit()
+            changes.notify_changed("users", changes.UPDATE, [user_id])
             return True, "User updated successfully."
         except sqlite3.IntegrityError as e:
             if "UNIQUE constraint failed: users.username" in str(e):
@@ -143,8 +129,9 @@ def update_user(user_id, username=None, password=None, email=None, role=None, av
 
 def delete_user(user_id):
     """Deletes a user from the database by ID."""
-    with sqlite3.connect(DATABASE_NAME) as conn:
+    with get_connection() as conn:
         cursor = conn.cursor()
         cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
         conn.commit()
+        changes.notify_changed("users", changes.DELETE, [user_id])
         return cursor.rowcount > 0, "User deleted successfully."
\ No newline at end of file
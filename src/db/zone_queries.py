@@ -0,0 +1,250 @@
+"""
+Zone rules and the engine that applies them to receiver addresses.
+
+A rule maps one district, one post-code range or one province to a zone. The rules are compiled
+into a district dict, a province dict and a sorted list of non-overlapping post-code segments, so
+finding the zone of an address costs two dict lookups and one bisect however many rules there are.
+The most specific rule wins: district, then post-code range (the narrowest one where ranges
+overlap), then province.
+"""
+import sqlite3
+import threading
+from bisect import bisect_right
+
+from src.db import changes, connection
+from src.db.address_hash import HASHED_FIELDS, address_content_hash
+from src.db.connection import get_connection
+
+# Addresses written per executemany call by assign_zones; the whole pass is still one transaction.
+_BATCH_SIZE = 5000
+
+
+def _post_code_number(post_code):
+    post_code = str(post_code or "").strip()
+    return int(post_code) if len(post_code) == 5 and post_code.isdigit() else None
+
+
+class ZoneEngine:
+    """Compiled zone rules. `rules` are zone_rules rows as dicts, lowest id first."""
+
+    def __init__(self, rules):
+        self.by_district = {}
+        self.by_province = {}
+        ranges = []
+        for rule in rules:
+            zone, province, district = rule['zone'], rule['province'], rule['district']
+            low, high = _post_code_number(rule['post_code_from']), _post_code_number(rule['post_code_to'])
+            # Where two rules say the same thing, the older one keeps its zone.
+            if low is not None and high is not None:
+                ranges.append((high - low, rule['id'], low, high, zone))
+            elif province and district:
+                self.by_district.setdefault((province, district), zone)
+            elif province:
+                self.by_province.setdefault(province, zone)
+        self.rule_count = len(rules)
+        self._starts, self._ends, self._zones = self._compile_ranges(ranges)
+
+    @staticmethod
+    def _compile_ranges(ranges):
+        # Cut the number line at every range edge and give each piece the zone of the narrowest range
+        # covering it, merging neighbours with the same zone. Rules number in the hundreds at most.
+        edges = sorted({low for _, _, low, _, _ in ranges} | {high + 1 for _, _, _, high, _ in ranges})
+        ranges = sorted(ranges)
+        starts, ends, zones = [], [], []
+        for start, next_start in zip(edges, edges[1:]):
+            zone = next((zone for _, _, low, high, zone in ranges if low <= start <= high), None)
+            if zone is None:
+                continue
+            if zones and zones[-1] == zone and ends[-1] == start - 1:
+                ends[-1] = next_start - 1
+            else:
+                starts.append(start)
+                ends.append(next_start - 1)
+                zones.append(zone)
+        return starts, ends, zones
+
+    def zone_for(self, province, district, post_code):
+        """Returns the zone the rules give this address, or None when no rule matches."""
+        zone = self.by_district.get((province, district))
+        if zone is not None:
+            return zone
+        number = _post_code_number(post_code)
+        if number is not None:
+            index = bisect_right(self._starts, number) - 1
+            if index >= 0 and number <= self._ends[index]:
+                return self._zones[index]
+        return self.by_province.get(province)
+
+    def fill_zone(self, data):
+        """Sets data['zone'] from the rules when it is blank; a zone typed in by hand is kept."""
+        if not str(data.get('zone') or '').strip():
+            zone = self.zone_for(data.get('province'), data.get('district'), data.get('post_code'))
+            if zone is not None:
+                data['zone'] = zone
+        return data
+
+
+_engine = None
+_engine_path = None
+_lock = threading.Lock()
+
+
+def get_zone_engine():
+    """Returns the compiled rules of the current database, compiling them on first use."""
+    global _engine, _engine_path
+    with _lock:
+        if _engine is None or _engine_path != connection.DATABASE_NAME:
+            _engine = ZoneEngine(get_all_zone_rules())
+            _engine_path = connection.DATABASE_NAME
+        return _engine
+
+
+def invalidate_zone_engine():
+    """Drops the compiled rules; the next lookup compiles them again."""
+    global _engine
+    with _lock:
+        _engine = None
+
+
+def _on_table_changed(table, operation, ids):
+    if table == "zone_rules":
+        invalidate_zone_engine()
+
+
+changes.add_listener(_on_table_changed)
+
+
+def get_all_zone_rules():
+    """Retrieves every zone rule, oldest first."""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, zone, province, district, post_code_from, post_code_to
+            FROM zone_rules ORDER BY id
+        """)
+        return [dict(row) for row in cursor.fetchall()]
+
+
+def _rule_values(zone, province, district, post_code_from, post_code_to):
+    """Checks one rule's fields; returns (values, None) ready for the table or (None, error message)."""
+    zone = (zone or "").strip()
+    province, district = (province or "").strip() or None, (district or "").strip() or None
+    post_code_from, post_code_to = (post_code_from or "").strip() or None, (post_code_to or "").strip() or None
+    if not zone:
+        return None, "Zone cannot be empty."
+    if post_code_from or post_code_to:
+        post_code_to = post_code_to or post_code_from
+        post_code_from = post_code_from or post_code_to
+        low, high = _post_code_number(post_code_from), _post_code_number(post_code_to)
+        if low is None or high is None:
+            return None, "Post codes must have 5 digits."
+        if low > high:
+            return None, "The first post code must not be greater than the last."
+        if province or district:
+            return None, "A rule matches a post-code range, a district or a province, not several."
+    elif district and not province:
+        return None, "A district rule needs its province."
+    elif not province:
+        return None, "Enter a post-code range, a district or a province."
+    return (zone, province, district, post_code_from, post_code_to), None
+
+
+def add_zone_rule(zone, province=None, district=None, post_code_from=None, post_code_to=None):
+    """Adds a rule for a post-code range, a district (with its province) or a province."""
+    values, error = _rule_values(zone, province, district, post_code_from, post_code_to)
+    if error:
+        return False, error
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                INSERT INTO zone_rules (zone, province, district, post_code_from, post_code_to)
+                VALUES (?, ?, ?, ?, ?)
+            """, values)
+            conn.commit()
+            changes.notify_changed("zone_rules", changes.INSERT, [cursor.lastrowid])
+            return True, "Zone rule added."
+        except sqlite3.Error as e:
+            return False, f"Database error: {e}"
+
+
+def update_zone_rule(rule_id, zone, province=None, district=None, post_code_from=None, post_code_to=None):
+    """Replaces a rule's zone and what it matches."""
+    values, error = _rule_values(zone, province, district, post_code_from, post_code_to)
+    if error:
+        return False, error
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                UPDATE zone_rules SET zone = ?, province = ?, district = ?, post_code_from = ?, post_code_to = ?
+                WHERE id = ?
+            """, (*values, rule_id))
+            conn.commit()
+            changes.notify_changed("zone_rules", changes.UPDATE, [rule_id])
+            return True, "Zone rule updated."
+        except sqlite3.Error as e:
+            return False, f"Database error: {e}"
+
+
+def delete_zone_rule(rule_id):
+    """Deletes a rule. Zones already assigned from it are left as they are."""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute("DELETE FROM zone_rules WHERE id = ?", (rule_id,))
+            conn.commit()
+            changes.notify_changed("zone_rules", changes.DELETE, [rule_id])
+            return True, "Zone rule deleted."
+        except sqlite3.Error as e:
+            return False, f"Database error: {e}"
+
+
+def assign_zones(overwrite=False):
+    """
+    Applies the zone rules to every receiver address in one transaction. Addresses with a blank zone
+    get the zone of their best rule; with `overwrite`, addresses that already have a zone are moved
+    to the rule's zone too. Addresses no rule matches keep their zone either way. The receivers of the
+    changed addresses are reported as updated, as the other address writers do.
+
+    Returns (number_of_addresses_changed, message), or (None, message) if the transaction was rolled back.
+    """
+    engine = get_zone_engine()
+    if not engine.rule_count:
+        return 0, "There are no zone rules to apply."
+    conn = get_connection()
+    try:
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute(f"SELECT id, receiver_identity_id, {', '.join(HASHED_FIELDS)} FROM receiver_addresses")
+            # Addresses share a handful of (province, district, post code) combinations, so each is looked up once.
+            zones = {}
+            updates = []
+            receiver_ids = set()
+            for row in cursor:
+                address = dict(zip(HASHED_FIELDS, row[2:]))
+                zone = address['zone']
+                if zone and zone.strip() and not overwrite:
+                    continue
+                key = (address['province'], address['district'], address['post_code'])
+                if key not in zones:
+                    zones[key] = engine.zone_for(*key)
+                new_zone = zones[key]
+                if new_zone is None or new_zone == zone:
+                    continue
+                address['zone'] = new_zone
+                updates.append((new_zone, address_content_hash(address), row[0]))
+                receiver_ids.add(row[1])
+            for start in range(0, len(updates), _BATCH_SIZE):
+                conn.executemany(
+                    "UPDATE receiver_addresses SET zone = ?, content_hash = ? WHERE id = ?",
+                    updates[start:start + _BATCH_SIZE]
+                )
+        changed = len(updates)
+        if changed:
+            changes.notify_changed("receiver_addresses", changes.UPDATE, [update[2] for update in updates])
+            changes.notify_changed("receiver_identities", changes.UPDATE, receiver_ids)
+        return changed, f"Zones assigned to {changed} address(es)."
+    except sqlite3.Error as e:
+        return None, f"Database error: {e}"
@@ -0,0 +1,233 @@
+"""
+Splits one-line Thai addresses ("12/3 ม.4 ต.เชิงทะเล อ.ถลาง จ.ภูเก็ต 83110") into the structured
+fields receiver_addresses stores, and checks them against the gazetteer.
+
+Recognised markers: ต./ตำบล/แขวง for the sub-district, อ./อำเภอ/เขต for the district and
+จ./จังหวัด for the province; the last five-digit number is the post code. Missing or misspelt parts
+are filled from the gazetteer locations that fit the rest of the address best. Every result carries a
+confidence between 0 and 1 and a list of what was missing or corrected.
+
+parse_addresses() is the batch form used by the Excel import: it reads the gazetteer once and
+resolves each distinct sub-district/district/province/post-code combination only once.
+"""
+import re
+from difflib import SequenceMatcher
+
+from src.db.gazetteer import get_gazetteer
+
+# Rows below this confidence are left for the user to check rather than filled in automatically.
+MIN_CONFIDENCE = 0.75
+
+# A marker only counts at the start of the text or after whitespace, so "อบต." or "ถ.ศรีสุนทร" are
+# not mistaken for one.
+_MARKER_RE = re.compile(r"(?:^|(?<=\s))(ตำบล|ต\.|แขวง|อำเภอ|อ\.|เขต|จังหวัด|จ\.)\s*")
+_MARKER_FIELDS = {
+    "ตำบล": "sub_district", "ต.": "sub_district", "แขวง": "sub_district",
+    "อำเภอ": "district", "อ.": "district", "เขต": "district",
+    "จังหวัด": "province", "จ.": "province",
+}
+_ZIPCODE_RE = re.compile(r"(?<!\d)(\d{5})(?!\d)")
+_BANGKOK = "กรุงเทพมหานคร"
+_PROVINCE_ALIASES = {"กทม": _BANGKOK, "กทม.": _BANGKOK, "กรุงเทพ": _BANGKOK, "กรุงเทพฯ": _BANGKOK}
+_BANGKOK_NAMES = sorted([_BANGKOK, *_PROVINCE_ALIASES], key=len, reverse=True)
+# How much each part counts towards the confidence of a match.
+_WEIGHTS = {"sub_district": 0.35, "district": 0.3, "province": 0.2, "zipcode": 0.15}
+# Below this similarity a misspelt name is treated as not matching at all.
+_MIN_SIMILARITY = 0.6
+
+
+def _clean(value):
+    return value.strip(" ,") if value else ""
+
+
+def split_address(text, province_names=()):
+    """
+    Splits `text` on its markers without consulting the gazetteer. Returns a dict with
+    address_detail, sub_district, district, province and post_code (empty when not found).
+    A name from `province_names` written without จ. after the last marked part, separated by a
+    space, is split off that part as the province.
+    """
+    text = " ".join(str(text or "").split())
+    parts = {"address_detail": text, "sub_district": "", "district": "", "province": "", "post_code": ""}
+
+    zipcodes = list(_ZIPCODE_RE.finditer(text))
+    tail_end = len(text)
+    if zipcodes:
+        parts["post_code"] = zipcodes[-1].group(1)
+        tail_end = zipcodes[-1].start()
+
+    # The last marker of each kind wins; everything before the first of those is the address detail.
+    found = {}
+    markers = list(_MARKER_RE.finditer(text, 0, tail_end))
+    for index, match in enumerate(markers):
+        value_end = markers[index + 1].start() if index + 1 < len(markers) else tail_end
+        found[_MARKER_FIELDS[match.group(1)]] = (match.start(), _clean(text[match.end():value_end]))
+    if found and "province" not in found:
+        # Addresses often end "อ.X ภูเก็ต" or "เขตX กรุงเทพฯ" with no จ. marker; take the name off the last part.
+        last_field = max(found, key=lambda field: found[field][0])
+        start, value = found[last_field]
+        for name in _BANGKOK_NAMES:
+            if value.endswith(name) and value != name:
+                found[last_field] = (start, _clean(value[:-len(name)]))
+                parts["province"] = _BANGKOK
+                break
+        else:
+            head, _, name = value.rpartition(" ")
+            if head and name in province_names:
+                found[last_field] = (start, _clean(head))
+                parts["province"] = name
+    if found:
+        for field, (_, value) in found.items():
+            parts[field] = value
+        parts["address_detail"] = _clean(text[:min(start for start, _ in found.values())])
+    elif zipcodes:
+        parts["address_detail"] = _clean(text[:tail_end])
+
+    province = parts["province"]
+    parts["province"] = _PROVINCE_ALIASES.get(province, province)
+    return parts
+
+
+def _similarity(parsed, name, fuzzy):
+    if not parsed:
+        return None
+    if parsed == name:
+        return 1.0
+    if not fuzzy:
+        return 0.0
+    matcher = SequenceMatcher(None, parsed, name)
+    if matcher.real_quick_ratio() < _MIN_SIMILARITY or matcher.quick_ratio() < _MIN_SIMILARITY:
+        return 0.0
+    ratio = matcher.ratio()
+    return ratio if ratio >= _MIN_SIMILARITY else 0.0
+
+
+def _candidates(gazetteer, parts, text):
+    """Gazetteer locations (province, district, sub_district, zipcode) the parsed parts could refer to."""
+    candidates = set()
+    zipcode = parts["post_code"]
+    if zipcode:
+        for province, district, sub_district in gazetteer.by_zipcode.get(zipcode, ()):
+            candidates.add((province, district, sub_district, zipcode))
+
+    provinces = [parts["province"]] if parts["province"] in gazetteer.districts else []
+    if not provinces and not candidates:
+        # No usable post code or province marker: look for a province name anywhere in the text.
+        provinces = [province for province in gazetteer.provinces if province in text]
+    for province in provinces:
+        districts = gazetteer.districts[province]
+        if parts["district"] in districts:
+            districts = (parts["district"],)
+        for district in districts:
+            for sub_district in gazetteer.sub_districts[(province, district)]:
+                candidates.add((province, district, sub_district, gazetteer.zipcodes[(province, district, sub_district)]))
+    return candidates
+
+
+def _resolve(gazetteer, parts, text):
+    """Picks the best-fitting gazetteer location for the parsed parts. Returns (location, confidence, errors)."""
+    candidates = _candidates(gazetteer, parts, text)
+    if not candidates:
+        if parts["post_code"]:
+            return None, 0.0, [f"Unknown post code {parts['post_code']} and no recognisable province."]
+        return None, 0.0, ["No post code or province found."]
+
+    parsed = {
+        "sub_district": parts["sub_district"], "district": parts["district"],
+        "province": parts["province"], "zipcode": parts["post_code"],
+    }
+    # Spelling is only scored when no candidate carries the parsed name exactly.
+    names = {"sub_district": set(), "district": set(), "province": set()}
+    for province, district, sub_district, _ in candidates:
+        names["sub_district"].add(sub_district)
+        names["district"].add(district)
+        names["province"].add(province)
+    fuzzy = {field: parsed[field] not in names[field] for field in names}
+
+    best, best_score = None, 0.0
+    for candidate in candidates:
+        province, district, sub_district, zipcode = candidate
+        score = 0.0
+        for field, name in (("sub_district", sub_district), ("district", district), ("province", province)):
+            value = parsed[field]
+            if field == "district" and value == "เมือง":
+                # "อ.เมือง" is short for the capital district, "เมือง" + the province name.
+                value += province
+            similarity = _similarity(value, name, fuzzy[field])
+            if similarity is None:
+                # Not marked in the text: half credit when the name still appears in it.
+                similarity = 0.5 if name in text else 0.0
+            score += _WEIGHTS[field] * similarity
+        if parsed["zipcode"]:
+            score += _WEIGHTS["zipcode"] * (1.0 if parsed["zipcode"] == zipcode else 0.0)
+        elif score:
+            score += _WEIGHTS["zipcode"] * 0.5
+        # Ties go to the smallest location so results are stable from run to run.
+        if score > best_score or (score == best_score and best is not None and candidate < best):
+            best, best_score = candidate, score
+    if best is None:
+        return None, 0.0, ["No part of the address matches a known location."]
+
+    labels = {"sub_district": "Sub-district", "district": "District", "province": "Province", "zipcode": "Post code"}
+    errors = []
+    for field, value in zip(("province", "district", "sub_district", "zipcode"), best):
+        if not parsed[field]:
+            errors.append(f"{labels[field]} missing; using '{value}'.")
+        elif parsed[field] != value:
+            errors.append(f"{labels[field]} '{parsed[field]}' corrected to '{value}'.")
+    return best, round(best_score, 3), errors
+
+
+def parse_address(text):
+    """
+    Parses one free-text address. Returns a dict with address_detail, sub_district, district,
+    province, post_code (canonical gazetteer spellings when a location was found), confidence
+    (0 to 1) and errors (a list of messages, empty when the address matched exactly).
+    """
+    return parse_addresses([text])[0]
+
+
+def parse_addresses(texts):
+    """Parses many free-text addresses in one pass; returns a list of parse_address() results in order."""
+    gazetteer = get_gazetteer()
+    resolved = {}
+    results = []
+    for text in texts:
+        parts = split_address(text, gazetteer.provinces)
+        key = (parts["sub_district"], parts["district"], parts["province"], parts["post_code"])
+        # The text no marker consumed is searched for the parts that are missing, so it only joins the
+        # key when one is; addresses with all three parts marked share a result.
+        unmarked_text = "" if all(key[:3]) else parts["address_detail"]
+        key = key + (unmarked_text,)
+        if key not in resolved:
+            resolved[key] = _resolve(gazetteer, parts, unmarked_text)
+        location, confidence, errors = resolved[key]
+        if location is not None:
+            province, district, sub_district, zipcode = location
+            parts.update(province=province, district=district, sub_district=sub_district, post_code=zipcode)
+        parts["confidence"] = confidence
+        parts["errors"] = list(errors)
+        results.append(parts)
+    return results
+
+
+def fill_address_fields(rows, min_confidence=MIN_CONFIDENCE):
+    """
+    For import rows that carry the whole address in address_detail (sub_district, district, province and
+    post_code all blank), parses it and fills the structured fields in place when the parse reaches
+    `min_confidence`. Returns (filled_count, needs_review), where needs_review lists
+    (row_index, parse_result) for the rows that were left unchanged.
+    """
+    location_fields = ("sub_district", "district", "province", "post_code")
+    pending = [
+        index for index, row in enumerate(rows)
+        if row.get("address_detail") and not any(row.get(field) for field in location_fields)
+    ]
+    filled, needs_review = 0, []
+    for index, result in zip(pending, parse_addresses(str(rows[index]["address_detail"]) for index in pending)):
+        if result["confidence"] >= min_confidence:
+            rows[index].update({field: result[field] for field in ("address_detail",) + location_fields})
+            filled += 1
+        else:
+            needs_review.append((index, result))
+    return filled, needs_review
@@ -0,0 +1,69 @@
+"""
+CSV and tab-separated files, read and written with the csv module.
+
+Files are written as UTF-8 with a byte-order mark, which Excel needs to show Thai text instead of
+mojibake, and read as UTF-8 with or without one. A .tsv or .txt file is tab-separated, anything else
+comma-separated. Both directions stream a row at a time, so a file of any size costs the same memory,
+and skip openpyxl altogether, which makes them many times faster than the .xlsx path.
+"""
+import csv
+import os
+
+CSV_EXTENSIONS = (".csv", ".tsv", ".txt")
+CSV_ENCODING = "utf-8-sig"
+# File dialog filters; the xlsx ones live with the Excel helpers.
+CSV_FILE_FILTER = "CSV Files (*.csv);;Tab-separated Files (*.tsv *.txt)"
+
+
+def is_csv_path(file_path):
+    """True when `file_path` names a CSV or tab-separated file rather than a workbook."""
+    return os.path.splitext(file_path)[1].lower() in CSV_EXTENSIONS
+
+
+def delimiter_for(file_path):
+    return "," if os.path.splitext(file_path)[1].lower() == ".csv" else "\t"
+
+
+def _count_lines(file_path):
+    # Counting newline bytes is a fraction of the time parsing takes. A quoted cell spanning lines makes
+    # this an overestimate, which progress reporting already allows for.
+    with open(file_path, "rb") as f:
+        return sum(block.count(b"\n") for block in iter(lambda: f.read(1 << 20), b""))
+
+
+def iter_csv_rows(file_path, on_row_count=None):
+    """
+    Yields the rows of a CSV or tab-separated file as dictionaries keyed by the header row, like
+    iter_excel_rows: every row after the header is yielded, empty ones included, and values missing
+    from a short row are absent from its dictionary. Values are the text in the file.
+
+    Args:
+        file_path (str): Path of the .csv, .tsv or .txt file.
+        on_row_count (callable): Called once, before the first row, with the number of data lines.
+    """
+    if on_row_count is not None:
+        on_row_count(max(_count_lines(file_path) - 1, 0))
+    with open(file_path, "r", encoding=CSV_ENCODING, newline="") as f:
+        rows = csv.reader(f, delimiter=delimiter_for(file_path))
+        header_row = next(rows, None)
+        if header_row is None:
+            return
+        headers = [value.strip() or None for value in header_row]
+        for row in rows:
+            yield dict(zip(headers, row))
+
+
+def write_csv(file_path, headers, rows):
+    """
+    Writes `headers` and then `rows` (sequences in header order, such as the rows of a sqlite3 cursor)
+    to `file_path`, with a byte-order mark. None is written as an empty cell. Returns the number of
+    rows written.
+    """
+    count = 0
+    with open(file_path, "w", encoding=CSV_ENCODING, newline="") as f:
+        writer = csv.writer(f, delimiter=delimiter_for(file_path))
+        writer.writerow(headers)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
@@ -1,45 +1,78 @@
 from PySide6.QtWidgets import QFileDialog, QMessageBox
 import openpyxl
 
-def read_excel_to_dict_list(parent_widget):
+from src.utils.csv_io import CSV_FILE_FILTER
+
+def select_excel_file(parent_widget):
     """
-    Opens a file dialog to select an Excel file and reads its content into a list of dictionaries.
+    Opens a file dialog to select an Excel file, or a CSV/TSV file for imports that also read those.
 
     Args:
         parent_widget (QWidget): The parent widget for the file dialog.
 
     Returns:
-        tuple: A tuple containing (list_of_dicts, filename) or (None, None) if cancelled or failed.
+        str: The selected path, or None if cancelled.
     """
     file_path, _ = QFileDialog.getOpenFileName(
         parent_widget,
-        "Open Excel File",
+        "Open Excel or CSV File",
         "",
-        "Excel Files (*.xlsx *.xls)"
+        f"Spreadsheets (*.xlsx *.xlsm *.csv *.tsv *.txt);;Excel Files (*.xlsx *.xlsm);;{CSV_FILE_FILTER}"
     )
+    return file_path or None
 
-    if not file_path:
-        return None, None
+def iter_excel_rows(file_path, on_row_count=None):
+    """
+    Yields the rows of the workbook's active sheet as dictionaries keyed by the header row.
+
+    The workbook is opened with read_only=True and data_only=True, so rows are parsed from the file
+    as they are requested and formulas come back as their cached values; memory use stays the same
+    whatever the size of the sheet. Every row after the header is yielded, empty ones included, so
+    the n-th row yielded is spreadsheet row n + 1. Errors reading the file are raised to the caller,
+    possibly after some rows have been yielded.
 
+    Args:
+        file_path (str): Path of the .xlsx file.
+        on_row_count (callable): Called once, before the first row, with the number of data rows the
+            sheet declares, or None when the file does not record its size.
+    """
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
     try:
-        workbook = openpyxl.load_workbook(file_path)
         sheet = workbook.active
+        if on_row_count is not None:
+            on_row_count(sheet.max_row - 1 if sheet.max_row else None)
+        rows = sheet.iter_rows(values_only=True)
+        header_row = next(rows, None)
+        if header_row is None:
+            return
+        headers = [str(value).strip() if value is not None else None for value in header_row]
+        for row in rows:
+            yield dict(zip(headers, row))
+    finally:
+        # Read-only workbooks keep the file open until closed.
+        workbook.close()
+
+def read_excel_to_dict_list(parent_widget):
+    """
+    Opens a file dialog to select an Excel file and reads its content into a list of dictionaries.
+    Prefer select_excel_file() with iter_excel_rows() for large files, which never holds the whole sheet.
 
-        # Read header row
-        headers = [cell.value for cell in sheet[1]]
+    Args:
+        parent_widget (QWidget): The parent widget for the file dialog.
 
-        # Read data rows into a list of dictionaries
-        data = []
-        for row in sheet.iter_rows(min_row=2, values_only=True):
-            row_data = dict(zip(headers, row))
-            data.append(row_data)
-        
-        return data, file_path
+    Returns:
+        tuple: A tuple containing (list_of_dicts, filename) or (None, None) if cancelled or failed.
+    """
+    file_path = select_excel_file(parent_widget)
+    if not file_path:
+        return None, None
 
+    try:
+        return list(iter_excel_rows(file_path)), file_path
     except Exception as e:
         QMessageBox.warning(
-            parent_widget, 
-            "Import Failed", 
+            parent_widget,
+            "Import Failed",
             f"An error occurred while reading the file: {e}"
         )
         return None, None
@@ -0,0 +1,154 @@
+"""
+The receiver spreadsheet import, independent of the UI.
+
+Workbooks are read with openpyxl and .csv/.tsv files with the csv module (src/utils/csv_io.py). Sheet
+rows are mapped to receiver rows, free-text addresses are split a chunk at a time and the result is
+streamed into staged_merge_receivers, which stages and merges everything in one transaction.
+run_receiver_import() is meant to run on a Worker: it reports throttled progress through the
+Worker's progress signal and stops, rolling the transaction back, when its cancel event is set.
+With dry_run it stages and counts the rows the same way without writing, to preview the import;
+confirm_receiver_import() then writes a kept preview without reading the file again.
+"""
+import time
+from itertools import islice
+
+from src.db.receiver_queries import (
+    discard_staged_receivers, has_staged_receivers, merge_staged_receivers, staged_merge_receivers
+)
+from src.utils.address_parser import fill_address_fields
+from src.utils.csv_io import is_csv_path, iter_csv_rows
+from src.utils.excel_importer import iter_excel_rows
+
+# Spreadsheet header for each receiver row key, in export column order.
+RECEIVER_SHEET_COLUMNS = {
+    'name': "Name",
+    'tel': "Tel",
+    'inventory_code': "Inventory",
+    'address_detail': "Address Details",
+    'sub_district': "Sub-district",
+    'district': "District",
+    'province': "Province",
+    'post_code': "Post Code",
+    'delivery_by': "Delivery By",
+    'zone': "Zone",
+    'note': "Note",
+}
+# Rows mapped and address-parsed together while streaming an import.
+IMPORT_PARSE_CHUNK_SIZE = 2000
+# Least time between two progress reports; more often than this only costs the GUI repaints.
+PROGRESS_INTERVAL = 0.25
+
+
+class ImportCancelled(Exception):
+    """Raised inside an import whose cancel event was set, to roll its transaction back."""
+
+
+def iter_receiver_import_rows(sheet_rows, review):
+    """
+    Turns spreadsheet rows (dicts keyed by header) into receiver import rows, lazily.
+
+    Rows with the whole address typed into "Address Details" get their location columns parsed out,
+    a chunk at a time. review['parsed'] counts the addresses split that way and review['rows'] collects
+    the spreadsheet row numbers of addresses left as typed for the user to check.
+    """
+    sheet_rows = iter(sheet_rows)
+    first_row_number = 2  # Data starts on row 2, under the header.
+    while True:
+        rows = [
+            {key: row_data.get(header) for key, header in RECEIVER_SHEET_COLUMNS.items()}
+            for row_data in islice(sheet_rows, IMPORT_PARSE_CHUNK_SIZE)
+        ]
+        if not rows:
+            return
+        parsed_count, needs_review = fill_address_fields(rows)
+        review['parsed'] += parsed_count
+        review['rows'].extend(first_row_number + index for index, _ in needs_review)
+        first_row_number += len(rows)
+        yield from rows
+
+
+def _watch_rows(rows, row_count, cancel_event, progress_callback):
+    """Passes rows through, raising ImportCancelled once cancel_event is set and reporting percent done."""
+    last_report = time.monotonic()
+    for read, row in enumerate(rows, 1):
+        if cancel_event is not None and cancel_event.is_set():
+            raise ImportCancelled()
+        if progress_callback is not None and row_count[0]:
+            now = time.monotonic()
+            if now - last_report >= PROGRESS_INTERVAL:
+                last_report = now
+                # The sheet's declared size can overstate it; 100 is only reported once the import is done.
+                progress_callback.emit(min(99, read * 100 // row_count[0]))
+        yield row
+    if cancel_event is not None and cancel_event.is_set():
+        raise ImportCancelled()
+
+
+def iter_sheet_rows(file_path, on_row_count=None):
+    """Yields the rows of a workbook or, by its extension, a CSV/TSV file, as dictionaries keyed by header."""
+    reader = iter_csv_rows if is_csv_path(file_path) else iter_excel_rows
+    return reader(file_path, on_row_count=on_row_count)
+
+
+def _cancelled_outcome(dry_run):
+    return {
+        'dry_run': dry_run, 'cancelled': True, 'counts': None, 'message': "Import cancelled.",
+        'parsed': 0, 'review_rows': [],
+    }
+
+
+def run_receiver_import(file_path, cancel_event=None, progress_callback=None, dry_run=False, keep_staged=False):
+    """
+    Imports the receiver workbook or CSV/TSV file at `file_path`, or with `dry_run` only counts what importing it would
+    add, update and leave unchanged. A dry run with `keep_staged` leaves its rows staged on the calling
+    thread's connection for confirm_receiver_import().
+
+    progress_callback, when given, is a progress signal (such as Worker's) that receives the percentage
+    of the sheet read so far, at most every PROGRESS_INTERVAL seconds, and 100 at the end. Setting
+    `cancel_event` (a threading.Event) stops the import and rolls its transaction back. Errors reading
+    the file are raised as they are, also after a rollback.
+
+    Returns a dict with dry_run, cancelled, counts (staged_merge_receivers counts, or None if the
+    database rolled back or the import was cancelled), message, parsed (addresses split from text) and
+    review_rows (spreadsheet rows left as typed).
+    """
+    row_count = [None]
+
+    def on_row_count(count):
+        row_count[0] = count
+
+    sheet_rows = iter_sheet_rows(file_path, on_row_count=on_row_count)
+    review = {'parsed': 0, 'rows': []}
+    rows = _watch_rows(iter_receiver_import_rows(sheet_rows, review), row_count, cancel_event, progress_callback)
+    try:
+        counts, message = staged_merge_receivers(rows, dry_run=dry_run, keep_staged=keep_staged)
+    except ImportCancelled:
+        return _cancelled_outcome(dry_run)
+    if progress_callback is not None:
+        progress_callback.emit(100)
+    return {
+        'dry_run': dry_run, 'cancelled': False, 'counts': counts, 'message': message,
+        'parsed': review['parsed'], 'review_rows': review['rows'],
+    }
+
+
+def confirm_receiver_import(preview, file_path, cancel_event=None, progress_callback=None):
+    """
+    Writes the import `preview` describes: the result of run_receiver_import(file_path, dry_run=True,
+    keep_staged=True) on the same thread. The staged rows are merged as they are, so the file is not
+    read, parsed or hashed again; if they are gone (the connection was reopened in between), the file is
+    imported from scratch instead. Setting `cancel_event` rolls the merge back and drops the staged rows.
+    Returns a dict like run_receiver_import's.
+    """
+    if not has_staged_receivers():
+        return run_receiver_import(file_path, cancel_event, progress_callback)
+    counts, message = merge_staged_receivers(skipped=preview['counts']['skipped'], cancel_event=cancel_event)
+    if counts is None and cancel_event is not None and cancel_event.is_set():
+        discard_staged_receivers()
+        return _cancelled_outcome(False)
+    if progress_callback is not None:
+        progress_callback.emit(100)
+    return {
+        'dry_run': False, 'cancelled': False, 'counts': counts, 'message': message,
+        'parsed': preview['parsed'], 'review_rows': preview['review_rows'],
+    }
@@ -0,0 +1,67 @@
+"""
+CSV and tab-separated export and import of the receiver, sender and gazetteer tables.
+
+Exports stream rows from a query cursor straight into the file. Imports go through the same paths as
+their other sources: receivers through run_receiver_import (staging merge and dry runs, like .xlsx),
+senders through import_senders, and the gazetteer through import_tambons.py, which reads an
+"addresses" export as well as the SQL dump.
+"""
+import pathlib
+import sqlite3
+
+from src.db.address_queries import iter_thai_addresses
+from src.db.receiver_queries import iter_all_receiver_addresses
+from src.db.sender_queries import import_senders, iter_all_senders
+from src.utils.csv_io import iter_csv_rows, write_csv
+from src.utils.receiver_import import RECEIVER_SHEET_COLUMNS
+
+# Spreadsheet header for each sender key, in export column order.
+SENDER_SHEET_COLUMNS = {
+    'inventory_code': "Inventory",
+    'name': "Name",
+    'address_detail': "Address Details",
+    'sub_district': "Sub-district",
+    'district': "District",
+    'province': "Province",
+    'post_code': "Post Code",
+    'tel': "Tel",
+}
+# The gazetteer keeps its column names as headers, which is what import_tambons.py reads back.
+ADDRESS_SHEET_COLUMNS = {
+    column: column for column in (
+        'id', 'sub_district', 'district', 'province', 'zipcode', 'sub_district_code', 'district_code', 'province_code'
+    )
+}
+# Table name -> (headers by key, in the column order of the rows the function yields).
+EXPORT_TABLES = {
+    'receivers': (RECEIVER_SHEET_COLUMNS, iter_all_receiver_addresses),
+    'senders': (SENDER_SHEET_COLUMNS, iter_all_senders),
+    'addresses': (ADDRESS_SHEET_COLUMNS, iter_thai_addresses),
+}
+
+
+def export_table_csv(table, file_path):
+    """Writes every row of `table` (an EXPORT_TABLES name) to a CSV/TSV file. Returns the number of rows written."""
+    columns, iter_rows = EXPORT_TABLES[table]
+    return write_csv(file_path, list(columns.values()), iter_rows())
+
+
+def export_gazetteer_file_csv(db_path, file_path):
+    """
+    Writes the thai_addresses rows stored in the database file `db_path` itself (a gazetteer file or a
+    user database), opened read-only so the file is left byte for byte as it was. Returns the number of rows written.
+    """
+    conn = sqlite3.connect(pathlib.Path(db_path).resolve().as_uri() + "?mode=ro", uri=True)
+    try:
+        return write_csv(file_path, list(ADDRESS_SHEET_COLUMNS.values()), iter_thai_addresses(conn))
+    finally:
+        conn.close()
+
+
+def import_senders_csv(file_path, dry_run=False):
+    """Imports a sender CSV/TSV file with SENDER_SHEET_COLUMNS headers; returns import_senders' (counts, message)."""
+    rows = (
+        {key: row_data.get(header) for key, header in SENDER_SHEET_COLUMNS.items()}
+        for row_data in iter_csv_rows(file_path)
+    )
+    return import_senders(rows, dry_run=dry_run)
@@ -0,0 +1,41 @@
+import os
+import sys
+
+import pytest
+
+# The tests import the application packages (src, db_tools) from the repository root.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.db import connection, receiver_queries  # noqa: E402
+from src.db.migrations import run_migrations  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    """A freshly migrated database in a temporary directory, without the gazetteer file; yields its connection."""
+    database_name, gazetteer_name = connection.DATABASE_NAME, connection.GAZETTEER_DATABASE_NAME
+    connection.set_gazetteer_path(None)
+    connection.set_database_path(str(tmp_path / "test.db"))
+    run_migrations()
+    yield connection.get_connection()
+    connection.close_connection()
+    connection.set_database_path(database_name)
+    connection.set_gazetteer_path(gazetteer_name)
+
+
+@pytest.fixture
+def address():
+    """Builds receiver address dicts: every ADDRESS_FIELDS key blank apart from inventory_code and the keywords."""
+    def make(**values):
+        data = dict.fromkeys(receiver_queries.ADDRESS_FIELDS, "")
+        data.update(inventory_code="INV", **values)
+        return data
+    return make
+
+
+@pytest.fixture
+def import_row(address):
+    """Builds receiver import rows: a name, a telephone and an address(**values)."""
+    def make(name, tel="0800000000", **values):
+        return {'name': name, 'tel': tel, **address(**values)}
+    return make
@@ -0,0 +1,68 @@
+import pytest
+
+from src.db import gazetteer
+from src.utils.address_parser import parse_address, parse_addresses, split_address
+
+
+@pytest.fixture
+def locations(db):
+    """A gazetteer of a few Phuket and Bangkok sub-districts, read from the test database."""
+    rows = [
+        (1, "เชิงทะเล", "ถลาง", "ภูเก็ต", "83110"),
+        (2, "ป่าคลอก", "ถลาง", "ภูเก็ต", "83110"),
+        (3, "ตลาดใหญ่", "เมืองภูเก็ต", "ภูเก็ต", "83000"),
+        (4, "สีลม", "บางรัก", "กรุงเทพมหานคร", "10500"),
+    ]
+    with db:
+        db.executemany("INSERT INTO thai_addresses (id, sub_district, district, province, zipcode) VALUES (?, ?, ?, ?, ?)", rows)
+    gazetteer.invalidate_gazetteer()
+    yield
+    gazetteer.invalidate_gazetteer()
+
+
+def test_split_on_markers():
+    assert split_address("12/3 ม.4 ต.เชิงทะเล อ.ถลาง จ.ภูเก็ต 83110") == {
+        "address_detail": "12/3 ม.4", "sub_district": "เชิงทะเล", "district": "ถลาง",
+        "province": "ภูเก็ต", "post_code": "83110",
+    }
+
+
+def test_bangkok_without_a_province_marker():
+    parts = split_address("1 ถ.สีลม แขวงสีลม เขตบางรัก กทม. 10500")
+
+    assert (parts["address_detail"], parts["district"], parts["province"]) == ("1 ถ.สีลม", "บางรัก", "กรุงเทพมหานคร")
+
+
+def test_fully_marked_address_matches_exactly(locations):
+    result = parse_address("12/3 ม.4 ต.เชิงทะเล อ.ถลาง จ.ภูเก็ต 83110")
+
+    assert (result["confidence"], result["errors"]) == (1.0, [])
+
+
+def test_unmarked_trailing_province_is_split_off_the_district(locations):
+    result = parse_address("ต.เชิงทะเล อ.ถลาง ภูเก็ต")
+
+    assert (result["sub_district"], result["district"], result["province"], result["post_code"]) == (
+        "เชิงทะเล", "ถลาง", "ภูเก็ต", "83110"
+    )
+    assert result["confidence"] >= 0.75
+
+
+def test_text_before_the_markers_supplies_a_missing_province(locations):
+    result = parse_address("99 ภูเก็ต ต.เชิงทะเล อ.ถลาง")
+
+    assert (result["province"], result["post_code"]) == ("ภูเก็ต", "83110")
+    assert result["confidence"] >= 0.75
+
+
+def test_misspelt_sub_district_is_corrected(locations):
+    result = parse_address("ต.เชิงทะล อ.ถลาง จ.ภูเก็ต 83110")
+
+    assert result["sub_district"] == "เชิงทะเล"
+    assert result["errors"] == ["Sub-district 'เชิงทะล' corrected to 'เชิงทะเล'."]
+
+
+def test_batch_results_follow_the_input_order(locations):
+    texts = ["ต.สีลม เขตบางรัก กรุงเทพฯ", "ต.เชิงทะเล อ.ถลาง จ.ภูเก็ต", "ต.สีลม เขตบางรัก กรุงเทพฯ"]
+
+    assert [result["sub_district"] for result in parse_addresses(texts)] == ["สีลม", "เชิงทะเล", "สีลม"]
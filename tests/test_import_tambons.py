@@ -0,0 +1,39 @@
+import import_tambons
+from src.db import connection
+from src.utils.csv_io import write_csv
+
+ROWS = [
+    (1, "เชิงทะเล", "ถลาง", "ภูเก็ต", "83110", "830204", "8302", "83"),
+    (2, "ป่าตอง", "กะทู้", "ภูเก็ต", "83150", "830202", "8302", "83"),
+]
+
+
+def write_addresses(path, rows):
+    write_csv(str(path), import_tambons.COLUMNS, rows)
+    return str(path)
+
+
+def test_import_writes_only_the_differences(db, tmp_path):
+    csv_path = write_addresses(tmp_path / "addresses.csv", ROWS)
+    import_tambons.import_data(csv_path)
+    changed = [ROWS[0][:1] + ("เชิงทะเล 2",) + ROWS[0][2:]]
+
+    counts = import_tambons.import_data(write_addresses(tmp_path / "changed.csv", changed), prune=True)
+
+    assert {key: counts[key] for key in ("inserted", "updated", "unchanged", "deleted")} == {
+        "inserted": 0, "updated": 1, "unchanged": 0, "deleted": 1,
+    }
+    assert [tuple(row) for row in db.execute("SELECT id, sub_district FROM thai_addresses")] == [(1, "เชิงทะเล 2")]
+
+
+def test_import_writes_the_database_table_while_a_gazetteer_is_attached(db, tmp_path):
+    gazetteer_path = str(tmp_path / "gazetteer.db")
+    import_tambons.build_gazetteer_db(write_addresses(tmp_path / "gazetteer.csv", ROWS[:1]), gazetteer_path)
+    connection.set_gazetteer_path(gazetteer_path)
+
+    counts = import_tambons.import_data(write_addresses(tmp_path / "addresses.csv", ROWS))
+
+    conn = connection.get_connection()
+    assert counts["inserted"] == 2
+    assert conn.execute("SELECT COUNT(*) FROM main.thai_addresses").fetchone()[0] == 2
+    assert conn.execute("SELECT COUNT(*) FROM gazetteer.thai_addresses").fetchone()[0] == 1
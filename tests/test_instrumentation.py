@@ -0,0 +1,39 @@
+import pytest
+
+from src.db import connection, instrumentation
+
+
+@pytest.fixture
+def instrumented(db):
+    """The db connection reopened with every statement recorded, however fast."""
+    instrumentation.enable_instrumentation(slow_query_ms=0, log_path=None)
+    instrumentation.reset_query_stats()
+    yield connection.get_connection()
+    instrumentation.disable_instrumentation()
+    instrumentation.reset_query_stats()
+
+
+def run_connection_shortcuts(conn):
+    conn.executemany("INSERT INTO zone_rules (zone, province) VALUES (?, ?)", [("North", "A"), ("South", "B")])
+    return conn.execute("SELECT zone FROM zone_rules").fetchall()
+
+
+def iterate_cursor(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT zone FROM zone_rules")
+    return [row['zone'] for row in cursor]
+
+
+def test_connection_execute_and_executemany_are_recorded(instrumented):
+    run_connection_shortcuts(instrumented)
+
+    stats = instrumentation.get_query_stats()["test_instrumentation.run_connection_shortcuts"]
+    assert stats["calls"] == 2
+    assert stats["rows"] == 4
+
+
+def test_rows_read_by_iterating_a_cursor_are_counted(instrumented):
+    instrumented.executemany("INSERT INTO zone_rules (zone, province) VALUES (?, ?)", [("N", "A"), ("S", "B"), ("E", "C")])
+
+    assert len(iterate_cursor(instrumented)) == 3
+    assert instrumentation.get_query_stats()["test_instrumentation.iterate_cursor"]["rows"] == 3
@@ -0,0 +1,57 @@
+import os
+
+import import_tambons
+from src.db import connection
+from src.db.migrations import LATEST_VERSION, get_schema_version, run_migrations
+from src.db.receiver_queries import add_receiver_identity, search_receivers
+from src.utils.csv_io import write_csv
+
+
+def test_fresh_database_reaches_the_latest_version(db):
+    assert get_schema_version(db) == LATEST_VERSION
+    assert run_migrations() == LATEST_VERSION
+
+
+def test_up_to_date_database_is_left_alone(db):
+    changes_before = db.total_changes
+
+    run_migrations()
+
+    assert db.total_changes == changes_before
+
+
+def test_missing_search_index_is_recreated_and_filled(db):
+    receiver_id, _ = add_receiver_identity("Rebuilt", "0800000000")
+    db.execute("DROP TABLE receiver_search")
+
+    run_migrations()
+
+    assert [receiver['id'] for receiver in search_receivers("Rebuilt")] == [receiver_id]
+
+
+def test_formatted_address_is_a_generated_column(db):
+    for table in ("receiver_addresses", "senders"):
+        # table_xinfo reports hidden = 2 for a VIRTUAL generated column.
+        hidden = {info[1]: info[6] for info in db.execute(f"PRAGMA table_xinfo({table})")}
+        assert hidden['formatted_address'] == 2, table
+
+
+def test_in_database_gazetteer_is_kept_when_a_gazetteer_file_is_attached(db, tmp_path):
+    row = (1, "เชิงทะเล", "ถลาง", "ภูเก็ต", "83110", "830204", "8302", "83")
+    with db:
+        db.execute("INSERT INTO thai_addresses VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row)
+    csv_path, gazetteer_path = str(tmp_path / "addresses.csv"), str(tmp_path / "gazetteer.db")
+    write_csv(csv_path, import_tambons.COLUMNS, [row])
+    import_tambons.build_gazetteer_db(csv_path, gazetteer_path)
+
+    connection.set_gazetteer_path(gazetteer_path)
+    run_migrations()
+
+    conn = connection.get_connection()
+    assert connection.gazetteer_table(conn) == "gazetteer.thai_addresses"
+    assert conn.execute("SELECT COUNT(*) FROM main.thai_addresses").fetchone()[0] == 1
+
+
+def test_gazetteer_is_looked_up_in_the_application_directory():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    assert connection.GAZETTEER_DATABASE_NAME == os.path.join(root, "gazetteer.db")
@@ -0,0 +1,23 @@
+import pytest
+
+import db_tools
+
+
+def test_no_filtered_query_scans_a_table_or_index(db):
+    failures = [(sql, scans) for sql, _, scans in db_tools.explain_query_plans() if scans]
+    assert not failures, "\n".join(f"{sql}\n    {scans}" for sql, scans in failures)
+
+
+@pytest.mark.parametrize("detail, sql, unbounded", [
+    ("SCAN receiver_addresses", "SELECT * FROM receiver_addresses WHERE note = ?", True),
+    ("SCAN senders USING INDEX idx_senders_created_at", "SELECT * FROM senders WHERE tel = ?", True),
+    ("SCAN ri USING COVERING INDEX idx_x", "SELECT id FROM receiver_identities ri WHERE tel LIKE ?", True),
+    ("SEARCH ri USING INDEX sqlite_autoindex_receiver_identities_1 (name>?)", "... WHERE (ri.name, ri.id) > (?, ?)", False),
+    ("SCAN receiver_search VIRTUAL TABLE INDEX 0:M2", "... WHERE receiver_search MATCH ?", False),
+    ("SCAN sqlite_master", "SELECT 1 FROM sqlite_master WHERE name = ?", False),
+    ("SCAN gazetteer.sqlite_master", "SELECT 1 FROM gazetteer.sqlite_master WHERE name = ?", False),
+    ("SCAN ri USING INDEX sqlite_autoindex_receiver_identities_1", "... WHERE ri.name LIKE ? ESCAPE '\\'", False),
+    ("SCAN ri USING INDEX sqlite_autoindex_receiver_identities_1", "... WHERE ri.tel = ?", True),
+])
+def test_unbounded_scan_detection(detail, sql, unbounded):
+    assert db_tools._is_unbounded_scan(detail, sql) is unbounded
@@ -0,0 +1,42 @@
+import threading
+
+import pytest
+
+pytest.importorskip("openpyxl")
+
+from src.db.receiver_queries import has_staged_receivers  # noqa: E402
+from src.utils.csv_io import write_csv  # noqa: E402
+from src.utils.receiver_import import (  # noqa: E402
+    RECEIVER_SHEET_COLUMNS, confirm_receiver_import, run_receiver_import
+)
+
+
+@pytest.fixture
+def sheet(tmp_path):
+    file_path = str(tmp_path / "receivers.csv")
+    row = {key: "" for key in RECEIVER_SHEET_COLUMNS}
+    row.update(name="Sheet", tel="0800000000", address_detail="1/1", post_code="83110")
+    write_csv(file_path, list(RECEIVER_SHEET_COLUMNS.values()), [list(row.values())])
+    return file_path
+
+
+def test_confirmed_preview_writes_the_staged_rows(db, sheet):
+    preview = run_receiver_import(sheet, dry_run=True, keep_staged=True)
+
+    outcome = confirm_receiver_import(preview, sheet)
+
+    assert not outcome['cancelled'] and outcome['counts']['added'] == 1
+    assert db.execute("SELECT COUNT(*) FROM receiver_addresses").fetchone()[0] == 1
+    assert not has_staged_receivers()
+
+
+def test_cancelled_confirmation_rolls_back_and_drops_the_preview(db, sheet):
+    preview = run_receiver_import(sheet, dry_run=True, keep_staged=True)
+    cancel_event = threading.Event()
+    cancel_event.set()
+
+    outcome = confirm_receiver_import(preview, sheet, cancel_event)
+
+    assert outcome['cancelled'] and outcome['counts'] is None
+    assert db.execute("SELECT COUNT(*) FROM receiver_addresses").fetchone()[0] == 0
+    assert not has_staged_receivers()
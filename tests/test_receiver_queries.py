@@ -0,0 +1,221 @@
+import threading
+
+from src.db import receiver_queries
+from src.db.address_hash import address_content_hash
+from src.db.receiver_queries import (
+    add_receiver_address, add_receiver_identity, delete_receiver_address, get_addresses_for_receiver,
+    get_receiver_identities_page, iter_receiver_identities, search_receivers, staged_merge_receivers,
+    update_receiver_address, update_receiver_identity
+)
+
+
+def stored_addresses(conn):
+    return [
+        dict(row) for row in conn.execute(f"""
+            SELECT receiver_identity_id, {', '.join(receiver_queries.ADDRESS_FIELDS)}, content_hash
+            FROM receiver_addresses ORDER BY id
+        """)
+    ]
+
+
+# --- Keyset paging ---
+
+def test_pages_cover_every_receiver_once_in_name_order(db):
+    names = [f"Receiver {i % 7} {i}" for i in range(25)]
+    for name in names:
+        add_receiver_identity(name, "0800000000")
+
+    paged = [receiver['name'] for receiver in iter_receiver_identities(page_size=4)]
+
+    assert paged == sorted(names)
+
+
+def test_page_after_the_last_row_of_the_previous_page(db):
+    for name in ("Ann", "Bob", "Cid", "Dan"):
+        add_receiver_identity(name, "0800000000")
+    first = get_receiver_identities_page(limit=2)
+
+    second = get_receiver_identities_page((first[-1]['name'], first[-1]['id']), limit=2)
+
+    assert [receiver['name'] for receiver in second] == ["Cid", "Dan"]
+
+
+def test_page_search_takes_like_wildcards_literally(db):
+    add_receiver_identity("100% Cotton", "0800000000")
+    add_receiver_identity("1000 Cotton", "0800000001")
+
+    assert [receiver['name'] for receiver in get_receiver_identities_page(search="0%")] == ["100% Cotton"]
+
+
+# --- Full-text search ---
+
+def test_search_ranks_names_before_addresses_and_finds_telephones(db, address):
+    by_address, _ = add_receiver_identity("Address Match", "0811111111")
+    add_receiver_address(by_address, address(address_detail="12 Patong Road"))
+    add_receiver_identity("Phone Match", "0899900000")
+    add_receiver_identity("Patong Shop", "0822222222")
+    add_receiver_identity("No Match", "0833333333")
+
+    assert [receiver['name'] for receiver in search_receivers("Patong")] == ["Patong Shop", "Address Match"]
+    assert [receiver['name'] for receiver in search_receivers("089-990")] == ["Phone Match"]
+
+
+def test_short_search_falls_back_to_like(db):
+    add_receiver_identity("Ox", "0800000000")
+    add_receiver_identity("Bo", "0800000001")
+
+    assert [receiver['name'] for receiver in search_receivers("Ox")] == ["Ox"]
+
+
+def test_search_index_follows_renames_and_address_edits(db, address):
+    receiver_id, _ = add_receiver_identity("Old Name", "0800000000")
+    add_receiver_address(receiver_id, address(address_detail="Kata Beach"))
+    address_id = get_addresses_for_receiver(receiver_id)[0]['id']
+
+    update_receiver_identity(receiver_id, "New Name", "0800000000")
+    update_receiver_address(address_id, address(address_detail="Karon Beach"))
+
+    assert search_receivers("Old Name") == []
+    assert [receiver['id'] for receiver in search_receivers("New Name")] == [receiver_id]
+    assert search_receivers("Kata") == []
+    assert [receiver['id'] for receiver in search_receivers("Karon")] == [receiver_id]
+
+
+# --- Trigger-maintained columns ---
+
+def test_address_count_follows_inserts_and_deletes(db, address):
+    receiver_id, _ = add_receiver_identity("Counted", "0800000000")
+    add_receiver_address(receiver_id, address(address_detail="1"))
+    add_receiver_address(receiver_id, address(address_detail="2"))
+    delete_receiver_address(get_addresses_for_receiver(receiver_id)[0]['id'])
+
+    assert get_receiver_identities_page()[0]['address_count'] == 1
+
+
+def test_formatted_address_follows_the_address(db, address):
+    receiver_id, _ = add_receiver_identity("Label", "0800000000")
+    add_receiver_address(receiver_id, address(
+        address_detail="1/1", sub_district="เชิงทะเล", district="ถลาง", province="ภูเก็ต", post_code="83110"
+    ))
+    stored = get_addresses_for_receiver(receiver_id)[0]
+    update_receiver_address(stored['id'], dict(stored, address_detail="2/2"))
+
+    assert get_addresses_for_receiver(receiver_id)[0]['formatted_address'] == "2/2 ต.เชิงทะเล อ.ถลาง จ.ภูเก็ต 83110"
+
+
+# --- Staged merge ---
+
+def test_staged_merge_counts_and_writes(db, address, import_row):
+    receiver_id, _ = add_receiver_identity("Known", "0800000000")
+    add_receiver_address(receiver_id, address(address_detail="Same", post_code="83110"))
+    add_receiver_address(receiver_id, address(address_detail="Changed", post_code="83110"))
+    rows = [
+        import_row("Known", address_detail="Same", post_code="83110"),
+        import_row("Known", address_detail="Changed", post_code="83110", note="new note"),
+        import_row("New", address_detail="First", post_code="10500", note="one"),
+        import_row("New", address_detail="First", post_code="10500", note="two"),
+        import_row(""),
+    ]
+
+    counts, message = staged_merge_receivers(rows, chunk_size=2)
+
+    assert message == "Import committed."
+    assert counts == {'added': 1, 'updated': 2, 'unchanged': 1, 'skipped': 1}
+    notes = {row['address_detail']: row['note'] for row in stored_addresses(db)}
+    assert notes == {"Same": "", "Changed": "new note", "First": "two"}
+
+
+def test_staged_merge_keeps_the_telephone_of_a_known_receiver(db, import_row):
+    add_receiver_identity("Known", "0800000000")
+    staged_merge_receivers([import_row("Known", tel="0899999999"), import_row("New", tel="0811111111")])
+
+    telephones = {row['name']: row['tel'] for row in db.execute("SELECT name, tel FROM receiver_identities")}
+    assert telephones == {"Known": "0800000000", "New": "0811111111"}
+
+
+def test_staged_merge_is_idempotent(db, import_row):
+    rows = [import_row(f"R{i % 5}", address_detail=f"{i % 9} Moo", post_code="83110", note=str(i)) for i in range(40)]
+    staged_merge_receivers(rows)
+    stored = stored_addresses(db)
+
+    counts, _ = staged_merge_receivers(rows)
+
+    assert counts == {'added': 0, 'updated': 0, 'unchanged': 40, 'skipped': 0}
+    assert stored_addresses(db) == stored
+
+
+# --- Content hashes and previews ---
+
+def test_writers_store_the_content_hash(db, address, import_row):
+    receiver_id, _ = add_receiver_identity("Hashed", "0800000000")
+    add_receiver_address(receiver_id, address(address_detail="1", note="first"))
+    stored = get_addresses_for_receiver(receiver_id)[0]
+    update_receiver_address(stored['id'], dict(stored, note="second"))
+    staged_merge_receivers([import_row("Hashed", address_detail="2")])
+
+    assert all(row['content_hash'] == address_content_hash(row) for row in stored_addresses(db))
+
+
+def test_other_writes_clear_the_content_hash(db, address):
+    receiver_id, _ = add_receiver_identity("Stale", "0800000000")
+    add_receiver_address(receiver_id, address(address_detail="1"))
+    with db:
+        db.execute("UPDATE receiver_addresses SET note = 'edited elsewhere'")
+
+    assert get_addresses_for_receiver(receiver_id)[0]['content_hash'] is None
+
+
+def test_content_hash_depends_only_on_the_values():
+    assert address_content_hash({'note': None}) == address_content_hash({'note': ""})
+    assert address_content_hash({'zone': 5}) == address_content_hash({'zone': "5"})
+    assert address_content_hash({'note': "a"}) != address_content_hash({'note': "b"})
+
+
+def test_dry_run_counts_without_writing(db, address, import_row):
+    receiver_id, _ = add_receiver_identity("Preview", "0800000000")
+    add_receiver_address(receiver_id, address(address_detail="1"))
+    rows = [import_row("Preview", address_detail="1", note="changed"), import_row("Preview", address_detail="2")]
+
+    counts, message = staged_merge_receivers(rows, dry_run=True)
+
+    assert message == "Dry run: nothing was written."
+    assert counts == staged_merge_receivers(rows)[0]
+    assert counts == {'added': 1, 'updated': 1, 'unchanged': 0, 'skipped': 0}
+
+
+def test_dry_run_compares_rows_whose_hash_was_cleared(db, address, import_row):
+    receiver_id, _ = add_receiver_identity("Stale", "0800000000")
+    add_receiver_address(receiver_id, address(address_detail="1"))
+    with db:
+        db.execute("UPDATE receiver_addresses SET note = 'edited elsewhere'")
+
+    counts, _ = staged_merge_receivers([import_row("Stale", address_detail="1", note="edited elsewhere")], dry_run=True)
+
+    assert counts['unchanged'] == 1
+
+
+def test_kept_preview_is_merged_against_the_current_tables(db, address, import_row):
+    receiver_id, _ = add_receiver_identity("Kept", "0800000000")
+    add_receiver_address(receiver_id, address(address_detail="1", note="same"))
+    staged_merge_receivers([import_row("Kept", address_detail="1", note="same")], dry_run=True, keep_staged=True)
+    with db:
+        db.execute("UPDATE receiver_addresses SET note = 'changed since the preview'")
+
+    counts, _ = receiver_queries.merge_staged_receivers()
+
+    assert counts == {'added': 0, 'updated': 1, 'unchanged': 0, 'skipped': 0}
+    assert get_addresses_for_receiver(receiver_id)[0]['note'] == "same"
+    assert not receiver_queries.has_staged_receivers()
+
+
+def test_cancelled_merge_of_a_kept_preview_writes_nothing(db, import_row):
+    staged_merge_receivers([import_row("Cancelled", address_detail="1")], dry_run=True, keep_staged=True)
+    cancel_event = threading.Event()
+    cancel_event.set()
+
+    assert receiver_queries.merge_staged_receivers(cancel_event=cancel_event) == (None, "Import cancelled.")
+    assert db.execute("SELECT COUNT(*) FROM receiver_identities").fetchone()[0] == 0
+    assert receiver_queries.has_staged_receivers()
+
+    receiver_queries.discard_staged_receivers()
+    assert not receiver_queries.has_staged_receivers()
@@ -0,0 +1,142 @@
+import pytest
+
+from src.db import changes
+from src.db.address_hash import address_content_hash
+from src.db.receiver_queries import add_receiver_address, add_receiver_identity, get_addresses_for_receiver
+from src.db.zone_queries import ZoneEngine, add_zone_rule, assign_zones, get_zone_engine
+
+
+def rule(rule_id, zone, province=None, district=None, post_code_from=None, post_code_to=None):
+    return {
+        'id': rule_id, 'zone': zone, 'province': province, 'district': district,
+        'post_code_from': post_code_from, 'post_code_to': post_code_to,
+    }
+
+
+# --- ZoneEngine ---
+
+def test_district_beats_post_code_range_beats_province():
+    engine = ZoneEngine([
+        rule(1, "P", province="ภูเก็ต"),
+        rule(2, "R", post_code_from="83000", post_code_to="83199"),
+        rule(3, "D", province="ภูเก็ต", district="ถลาง"),
+    ])
+
+    assert engine.zone_for("ภูเก็ต", "ถลาง", "83110") == "D"
+    assert engine.zone_for("ภูเก็ต", "เมืองภูเก็ต", "83000") == "R"
+    assert engine.zone_for("ภูเก็ต", "เมืองภูเก็ต", "") == "P"
+    assert engine.zone_for("กระบี่", "เมืองกระบี่", "81000") is None
+
+
+def test_narrowest_range_wins_and_the_older_rule_breaks_ties():
+    engine = ZoneEngine([
+        rule(1, "Wide", post_code_from="10000", post_code_to="19999"),
+        rule(2, "Narrow", post_code_from="10500", post_code_to="10599"),
+        rule(3, "Same width, newer", post_code_from="10500", post_code_to="10599"),
+    ])
+
+    assert engine.zone_for(None, None, "10400") == "Wide"
+    assert engine.zone_for(None, None, "10510") == "Narrow"
+    assert engine.zone_for(None, None, "10600") == "Wide"
+    assert engine.zone_for(None, None, "20000") is None
+
+
+def test_the_older_rule_wins_for_the_same_province():
+    engine = ZoneEngine([rule(1, "First", province="กระบี่"), rule(2, "Second", province="กระบี่")])
+
+    assert engine.zone_for("กระบี่", None, None) == "First"
+
+
+@pytest.mark.parametrize("post_code", ["", None, "8311", "83110a", "ABCDE"])
+def test_malformed_post_codes_match_no_range(post_code):
+    engine = ZoneEngine([rule(1, "R", post_code_from="00000", post_code_to="99999")])
+
+    assert engine.zone_for(None, None, post_code) is None
+
+
+def test_fill_zone_keeps_a_zone_typed_in_by_hand():
+    engine = ZoneEngine([rule(1, "Rule", province="ภูเก็ต")])
+
+    assert engine.fill_zone({'province': "ภูเก็ต", 'zone': " "})['zone'] == "Rule"
+    assert engine.fill_zone({'province': "ภูเก็ต", 'zone': "Manual"})['zone'] == "Manual"
+    assert engine.fill_zone({'province': "กระบี่", 'zone': ""})['zone'] == ""
+
+
+# --- Rules ---
+
+@pytest.mark.parametrize("values, error", [
+    (dict(zone=" ", province="ภูเก็ต"), "Zone cannot be empty."),
+    (dict(zone="A", post_code_from="8311"), "Post codes must have 5 digits."),
+    (dict(zone="A", post_code_from="83200", post_code_to="83100"), "The first post code must not be greater than the last."),
+    (dict(zone="A", province="ภูเก็ต", post_code_from="83000"), "A rule matches a post-code range, a district or a province, not several."),
+    (dict(zone="A", district="ถลาง"), "A district rule needs its province."),
+    (dict(zone="A"), "Enter a post-code range, a district or a province."),
+])
+def test_add_zone_rule_rejects_invalid_rules(db, values, error):
+    assert add_zone_rule(**values) == (False, error)
+    assert db.execute("SELECT COUNT(*) FROM zone_rules").fetchone()[0] == 0
+
+
+def test_a_single_post_code_is_a_one_code_range(db):
+    assert add_zone_rule("A", post_code_to="83110")[0]
+
+    assert get_zone_engine().zone_for(None, None, "83110") == "A"
+    assert get_zone_engine().zone_for(None, None, "83111") is None
+
+
+def test_new_rules_reach_the_compiled_engine(db):
+    add_zone_rule("Old", province="ภูเก็ต")
+    assert get_zone_engine().zone_for("ภูเก็ต", None, None) == "Old"
+
+    add_zone_rule("New", province="ภูเก็ต", district="ถลาง")
+
+    assert get_zone_engine().zone_for("ภูเก็ต", "ถลาง", None) == "New"
+
+
+# --- assign_zones ---
+
+def test_assign_zones_fills_blank_zones_with_a_valid_content_hash(db, address):
+    receiver_id, _ = add_receiver_identity("Zoned", "0800000000")
+    add_receiver_address(receiver_id, address(address_detail="Blank", province="ภูเก็ต"))
+    add_receiver_address(receiver_id, address(address_detail="Manual", province="ภูเก็ต", zone="Manual"))
+    add_receiver_address(receiver_id, address(address_detail="Unmatched", province="กระบี่"))
+    add_zone_rule("Rule", province="ภูเก็ต")
+
+    assert assign_zones() == (1, "Zones assigned to 1 address(es).")
+
+    stored = {row['address_detail']: row for row in get_addresses_for_receiver(receiver_id)}
+    assert {detail: row['zone'] for detail, row in stored.items()} == {"Blank": "Rule", "Manual": "Manual", "Unmatched": ""}
+    assert all(row['content_hash'] == address_content_hash(row) for row in stored.values())
+
+
+def test_assign_zones_with_overwrite_moves_manual_zones(db, address):
+    receiver_id, _ = add_receiver_identity("Zoned", "0800000000")
+    add_receiver_address(receiver_id, address(province="ภูเก็ต", zone="Manual"))
+    add_zone_rule("Rule", province="ภูเก็ต")
+
+    assert assign_zones(overwrite=True)[0] == 1
+    assert get_addresses_for_receiver(receiver_id)[0]['zone'] == "Rule"
+
+
+def test_assign_zones_reports_the_receivers_it_changed(db, address):
+    changed_id, _ = add_receiver_identity("Changed", "0800000000")
+    add_receiver_address(changed_id, address(province="ภูเก็ต"))
+    untouched_id, _ = add_receiver_identity("Untouched", "0800000001")
+    add_receiver_address(untouched_id, address(province="กระบี่"))
+    add_zone_rule("Rule", province="ภูเก็ต")
+    notified = []
+
+    def listener(table, operation, ids):
+        notified.append((table, operation, ids))
+
+    changes.add_listener(listener)
+    try:
+        assign_zones()
+    finally:
+        changes.remove_listener(listener)
+
+    assert ("receiver_identities", changes.UPDATE, frozenset([changed_id])) in notified
+
+
+def test_assign_zones_without_rules_changes_nothing(db):
+    assert assign_zones() == (0, "There are no zone rules to apply.")